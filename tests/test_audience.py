@@ -0,0 +1,167 @@
+"""Тестове за audience.py — предварително изчислени разпределения на гласовете на публиката."""
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from triviador.core.config import JOKER_AUDIENCE
+from triviador.core.models import GameMode, Question, QuestionType
+from triviador.logic.audience import AudienceModel, default_share, to_percentages
+from triviador.logic.calibration import Calibrator
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.joker_system import JokerSystem, RoundJokers
+
+
+def _mc_question(difficulty=2, options=("А", "Б", "В", "Г"), correct="А", question_id=1):
+    return Question(
+        id=question_id,
+        category="Тест",
+        difficulty=difficulty,
+        question_type=QuestionType.MULTIPLE_CHOICE,
+        question_text="Въпрос?",
+        correct_answer=correct,
+        options=list(options),
+    )
+
+
+# ─── Закръгляне ─────────────────────────────────────────────────────
+
+class TestPercentages:
+
+    def test_sums_to_100(self):
+        assert sum(to_percentages([1, 1, 1])) == 100
+        assert to_percentages([2, 1, 1]) == (50, 25, 25)
+
+    def test_largest_remainder(self):
+        assert to_percentages([0.333, 0.333, 0.334]) == (33, 33, 34)
+
+    def test_zero_weights(self):
+        assert to_percentages([0.0, 0.0]) == (50, 50)
+
+
+# ─── Модел ──────────────────────────────────────────────────────────
+
+class TestAudienceModel:
+
+    @pytest.mark.parametrize("difficulty", [1, 2, 3, 4, 5])
+    @pytest.mark.parametrize("option_count", [2, 3, 4, 6])
+    def test_every_vector_sums_to_100(self, difficulty, option_count):
+        model = AudienceModel(table_size=64)
+        table = model.table(difficulty, option_count)
+        assert len(table) == 64
+        assert all(len(votes) == option_count and sum(votes) == 100 for votes in table)
+
+    @pytest.mark.parametrize("difficulty", [1, 3, 5])
+    def test_correct_share_matches_difficulty(self, difficulty):
+        table = AudienceModel().table(difficulty, 4)
+        mean = sum(votes[0] for votes in table) / len(table)
+        assert mean == pytest.approx(default_share(difficulty) * 100, abs=3)
+
+    def test_wrong_options_not_degenerate(self):
+        """Никой грешен отговор не получава систематично „остатъка“."""
+        table = AudienceModel().table(3, 4)
+        means = [sum(votes[i] for votes in table) / len(table) for i in (1, 2, 3)]
+        assert max(means) - min(means) < 3
+
+    def test_tables_are_deterministic(self):
+        assert AudienceModel().table(2, 4) == AudienceModel().table(2, 4)
+
+    def test_table_built_once(self):
+        model = AudienceModel()
+        first = model.table(2, 4)
+        model.sample(2, 4, random.Random(1))
+        assert model.table(2, 4) is first
+
+    def test_votes_map_to_options(self):
+        question = _mc_question(correct="В")
+        votes = AudienceModel().votes(question, random.Random(3))
+        assert set(votes) == set(question.options)
+        assert sum(votes.values()) == 100
+
+    def test_votes_follow_rng(self):
+        model = AudienceModel()
+        question = _mc_question()
+        assert model.votes(question, random.Random(9)) == model.votes(question, random.Random(9))
+
+    def test_two_options(self):
+        votes = AudienceModel().votes(_mc_question(options=("Да", "Не"), correct="Не"), random.Random(1))
+        assert sum(votes.values()) == 100
+
+    def test_numeric(self):
+        question = Question(
+            id=2, category="Математика", difficulty=3, question_type=QuestionType.NUMERIC,
+            question_text="Колко?", correct_answer=200,
+        )
+        votes = AudienceModel().votes(question, random.Random(1))
+        assert 190 <= votes["suggested_value"] <= 210
+        assert 60 <= votes["confidence"] <= 85
+
+
+# ─── Пакетно обслужване ─────────────────────────────────────────────
+
+class TestBatch:
+
+    def test_sample_batch(self):
+        model = AudienceModel()
+        batch = model.sample_batch(4, 4, 5000, random.Random(1))
+        table = set(model.table(4, 4))
+        assert len(batch) == 5000
+        assert all(votes in table for votes in batch)
+
+    def test_votes_batch(self):
+        questions = [_mc_question(difficulty=1 + i % 5, question_id=i) for i in range(100)]
+        results = AudienceModel().votes_batch(questions, random.Random(1))
+        assert len(results) == 100
+        assert all(sum(votes.values()) == 100 for votes in results)
+
+    def test_batch_matches_single_calls(self):
+        model = AudienceModel()
+        single_rng = random.Random(5)
+        singles = [model.sample(3, 4, single_rng) for _ in range(20)]
+        assert model.sample_batch(3, 4, 20, random.Random(5)) == singles
+
+
+# ─── Напасване към статистика ───────────────────────────────────────
+
+class TestFitting:
+
+    def test_from_accuracy_clamps(self):
+        model = AudienceModel.from_accuracy({1: 0.99, 5: 0.1, 3: 0.55})
+        assert model.share(1) == 0.95
+        assert model.share(5) == 0.25
+        assert model.share(3) == 0.55
+        assert model.share(2) == default_share(2)
+
+    def test_fitted_share_used(self):
+        model = AudienceModel.from_accuracy({3: 0.8})
+        mean = sum(votes[0] for votes in model.table(3, 4)) / model.table_size
+        assert mean == pytest.approx(80, abs=3)
+
+    def test_from_calibration(self):
+        calibrator = Calibrator()
+        hard = _mc_question(difficulty=2, question_id=1)
+        for _ in range(200):
+            calibrator.record("Иван", hard, False)
+        model = AudienceModel.from_calibration(calibrator, [hard, _mc_question(difficulty=4, question_id=2)])
+        assert model.share(2) < default_share(2)
+        assert model.share(4) == default_share(4)
+
+    def test_joker_system_accepts_model(self):
+        model = AudienceModel.from_accuracy({2: 0.95}, concentration=400)
+        votes = JokerSystem.apply_audience_help(_mc_question(), random.Random(1), model)
+        assert votes["А"] >= 85
+
+    def test_round_jokers_use_model(self):
+        model = AudienceModel.from_accuracy({2: 0.95}, concentration=400)
+        jokers = RoundJokers(_mc_question(), False, random.Random(1), model)
+        assert jokers.results[JOKER_AUDIENCE]["votes"]["А"] >= 85
+
+    def test_game_logic_uses_model(self):
+        """Жокерът в соло играта гласува по подадения модел, а не по DEFAULT_AUDIENCE."""
+        model = AudienceModel.from_accuracy({2: 0.95}, concentration=400)
+        logic = GameLogic(highscore_manager=MagicMock(), audience=model)
+        state = logic.start_game(GameMode.STANDARD, ["Иван"], seed=1)
+        state.questions[state.current_question_index] = _mc_question()
+        result = logic.use_joker(JOKER_AUDIENCE)
+        assert result["type"] == "audience"
+        assert result["votes"]["А"] >= 85
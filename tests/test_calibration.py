@@ -0,0 +1,225 @@
+"""Тестове за calibration.py — онлайн калибровка на трудността."""
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from triviador.core.clock import VirtualClock
+from triviador.core.config import QUESTIONS_PER_GAME, RATING_BASE
+from triviador.core.models import GameMode, Question, QuestionType
+from triviador.logic.calibration import (
+    Calibrator, difficulty_rating, expected_success, rating_for_success,
+)
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.question_manager import QuestionBank, QuestionManager
+from triviador.logic.sessions import SessionManager
+
+
+def _question(question_id, difficulty=3):
+    return Question(
+        id=question_id,
+        question_text=f"Въпрос {question_id}",
+        question_type=QuestionType.MULTIPLE_CHOICE,
+        category="Тест",
+        difficulty=difficulty,
+        correct_answer="А",
+        options=["А", "Б", "В", "Г"],
+    )
+
+
+@pytest.fixture(scope="module")
+def question_manager():
+    return QuestionManager()
+
+
+# ─── Модел ──────────────────────────────────────────────────────────
+
+class TestModel:
+
+    def test_expected_success(self):
+        assert expected_success(1500, 1500) == pytest.approx(0.5)
+        assert expected_success(1900, 1500) == pytest.approx(10 / 11)
+
+    def test_rating_for_success_inverts_expectation(self):
+        rating = rating_for_success(1600, 0.7)
+        assert expected_success(1600, rating) == pytest.approx(0.7)
+
+    def test_initial_from_difficulty(self):
+        calibrator = Calibrator()
+        assert calibrator.question_rating(_question(1, 1)) == difficulty_rating(1)
+        assert calibrator.player_rating("Нов") == RATING_BASE
+        assert [calibrator.difficulty(_question(i, i)) for i in range(1, 6)] == [1, 2, 3, 4, 5]
+
+    def test_record_moves_both_ratings(self):
+        calibrator = Calibrator()
+        question = _question(1)
+        calibrator.record("Иван", question, True)
+        assert calibrator.player_rating("Иван") > RATING_BASE
+        assert calibrator.question_rating(question) < difficulty_rating(3)
+        calibrator.record("Мария", question, False)
+        assert calibrator.player_rating("Мария") < RATING_BASE
+
+    def test_k_factor_decays(self):
+        calibrator = Calibrator()
+        assert calibrator._k(0) > calibrator._k(100) >= calibrator.k_min
+
+    def test_converges_to_true_difficulty(self):
+        """Въпроси с еднакъв етикет се разделят според реалната си трудност."""
+        rng = random.Random(3)
+        true_ratings = {i: 1100 + i * 80 for i in range(10)}
+        questions = [_question(i) for i in true_ratings]
+        players = {f"Играч {i}": 1200 + i * 60 for i in range(10)}
+        calibrator = Calibrator()
+        for _ in range(20000):
+            name = rng.choice(list(players))
+            question = rng.choice(questions)
+            correct = rng.random() < expected_success(players[name], true_ratings[question.id])
+            calibrator.record(name, question, correct)
+
+        ranked = sorted(questions, key=calibrator.question_rating)
+        assert [q.id for q in ranked[:3]] == sorted(q.id for q in ranked[:3])
+        assert calibrator.question_rating(questions[0]) < calibrator.question_rating(questions[-1]) - 400
+        assert calibrator.player_rating("Играч 9") > calibrator.player_rating("Играч 0") + 300
+
+
+# ─── Избор на въпроси ───────────────────────────────────────────────
+
+class TestSampling:
+
+    def test_pick_matches_skill(self):
+        calibrator = Calibrator()
+        questions = [_question(i, 1 + i % 5) for i in range(50)]
+        rng = random.Random(1)
+        strong = [calibrator.pick(2300, questions, rng).difficulty for _ in range(50)]
+        weak = [calibrator.pick(900, questions, rng).difficulty for _ in range(50)]
+        assert min(strong) == 5
+        assert max(weak) == 1
+
+    def test_pick_empty(self):
+        assert Calibrator().pick(1500, [], random.Random(1)) is None
+
+    def test_ladder_gets_harder(self):
+        calibrator = Calibrator()
+        questions = [_question(i, 1 + i % 5) for i in range(50)]
+        ladder = calibrator.ladder(1500, questions, 10, random.Random(1))
+        assert len({q.id for q in ladder}) == 10
+        ratings = [calibrator.question_rating(q) for q in ladder]
+        assert ratings[0] < ratings[-1]
+
+    @pytest.mark.parametrize("count", [3, 7, QUESTIONS_PER_GAME])
+    def test_fresh_ladder_matches_legacy(self, question_manager, count):
+        """Некалибрирана банка дава същата стълба 1→5 като старата логика."""
+        legacy = question_manager.get_questions_with_increasing_difficulty(count, rng=random.Random(1))
+        calibrated = question_manager.get_questions_with_increasing_difficulty(
+            count, rng=random.Random(1), calibrator=Calibrator(), skill=RATING_BASE)
+        bank = QuestionBank(question_manager.questions).increasing_difficulty(
+            count, None, random.Random(1), Calibrator(), RATING_BASE)
+        assert [q.difficulty for q in calibrated] == [q.difficulty for q in legacy]
+        assert [q.difficulty for q in bank] == [q.difficulty for q in legacy]
+
+    @pytest.mark.parametrize("score, expected", [(0, {1, 2}), (4000, {4, 5})])
+    def test_fresh_endless_matches_bands(self, question_manager, score, expected):
+        calibrator = Calibrator()
+        bank = QuestionBank(question_manager.questions)
+        rng = random.Random(4)
+        picked = {question_manager.get_endless_mode_question(score, rng=rng, calibrator=calibrator,
+                                                             skill=RATING_BASE).difficulty
+                  for _ in range(100)}
+        banked = {bank.endless(score, None, set(), rng, calibrator=calibrator, skill=RATING_BASE).difficulty
+                  for _ in range(100)}
+        assert picked == banked == expected
+
+    def test_game_logic_uses_calibrator(self, question_manager):
+        calibrator = Calibrator()
+        logic = GameLogic(question_manager, MagicMock(), clock=VirtualClock(), calibrator=calibrator)
+        state = logic.start_game(GameMode.STANDARD, ["Иван"], seed=5)
+        assert len(state.questions) == QUESTIONS_PER_GAME
+        logic.submit_answer(state.current_question.correct_answer)
+        assert calibrator.player_rating("Иван") > RATING_BASE
+
+    def test_endless_follows_skill(self, question_manager):
+        calibrator = Calibrator()
+        calibrator.player_ratings["Силен"] = 2600
+        logic = GameLogic(question_manager, MagicMock(), clock=VirtualClock(), calibrator=calibrator)
+        logic.start_game(GameMode.ENDLESS, ["Силен"], seed=5)
+        assert logic.get_current_question().difficulty >= 4
+
+    def test_sessions_use_calibrator(self, question_manager):
+        calibrator = Calibrator()
+        manager = SessionManager(question_manager, MagicMock(), clock=VirtualClock(), calibrator=calibrator)
+        session = manager.create(GameMode.STANDARD, ["Иван"], seed=5)
+        assert len(session.question_ids) == QUESTIONS_PER_GAME
+        manager.submit_answer(session.session_id, "__грешно__")
+        assert calibrator.player_rating("Иван") < RATING_BASE
+
+
+# ─── Съхранение ─────────────────────────────────────────────────────
+
+class TestPersistence:
+
+    def _trained(self):
+        calibrator = Calibrator()
+        rng = random.Random(2)
+        for i in range(500):
+            calibrator.record(f"Играч {i % 7}", _question(i % 40, 1 + i % 5), rng.random() < 0.5)
+        calibrator.record("Ёж Щъркелов", _question(1), True)
+        return calibrator
+
+    def test_roundtrip(self):
+        calibrator = self._trained()
+        loaded = Calibrator.from_bytes(calibrator.to_bytes())
+        assert loaded.question_counts == calibrator.question_counts
+        assert loaded.player_counts == calibrator.player_counts
+        for question_id, rating in calibrator.question_ratings.items():
+            assert loaded.question_ratings[question_id] == pytest.approx(rating, abs=0.01)
+        assert loaded.player_rating("Ёж Щъркелов") == pytest.approx(calibrator.player_rating("Ёж Щъркелов"), abs=0.01)
+
+    def test_header_matches_snapshot(self):
+        """Запис, дошъл по време на сериализацията, не разминава заглавието."""
+        calibrator = self._trained()
+
+        class Growing(dict):
+            def items(self):
+                calibrator.record("Нов", _question(999), True)
+                return super().items()
+
+        calibrator.question_ratings = Growing(calibrator.question_ratings)
+        loaded = Calibrator.from_bytes(calibrator.to_bytes())
+        assert set(loaded.question_ratings) == set(calibrator.question_ratings)
+        assert set(loaded.player_ratings) <= set(calibrator.player_ratings)
+
+    def test_compact(self):
+        data = self._trained().to_bytes()
+        assert len(data) < 40 * 12 + 8 * 30 + 20
+
+    def test_save_and_load(self, tmp_path):
+        path = tmp_path / "calibration.bin"
+        calibrator = self._trained()
+        calibrator.save(path)
+        loaded = Calibrator.load(path)
+        assert loaded.path == path
+        assert loaded.get_stats()["questions"] == len(calibrator.question_ratings)
+
+    def test_missing_file(self, tmp_path):
+        calibrator = Calibrator.load(tmp_path / "няма.bin")
+        assert calibrator.get_stats() == {"questions": 0, "players": 0, "updates": 0}
+
+    @pytest.mark.parametrize("data", [b"", b"XXXXX" + bytes(8), None])
+    def test_corrupt(self, data):
+        if data is None:
+            data = self._trained().to_bytes()[:-3]
+        with pytest.raises(ValueError):
+            Calibrator.from_bytes(data)
+
+    def test_corrupt_file_starts_fresh(self, tmp_path):
+        path = tmp_path / "calibration.bin"
+        path.write_bytes("боклук".encode())
+        assert Calibrator.load(path).get_stats()["questions"] == 0
+
+    def test_end_game_saves(self, tmp_path, question_manager):
+        path = tmp_path / "calibration.bin"
+        logic = GameLogic(question_manager, MagicMock(), clock=VirtualClock(), calibrator=Calibrator(path=path))
+        logic.start_game(GameMode.STANDARD, ["Иван"], seed=5)
+        logic.submit_answer("x")
+        logic.end_game()
+        assert Calibrator.load(path).player_counts == {"Иван": 1}
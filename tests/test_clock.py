@@ -0,0 +1,103 @@
+"""Тестове за clock.py — монотонен и виртуален часовник."""
+import time
+
+from triviador.core.clock import Clock, VirtualClock, DEFAULT_CLOCK
+from triviador.core.config import DEFAULT_TIME_LIMIT, ROUND_DEADLINE_GRACE
+from triviador.core.models import GameMode
+from triviador.logic.game_logic import GameLogic
+from triviador.network.network import GameLobby, GameServer, OnlinePlayer
+from triviador.network.scheduler import TimerWheel
+
+
+# ─── Часовници ──────────────────────────────────────────────────────
+
+class TestClock:
+
+    def test_default_is_monotonic(self):
+        assert isinstance(DEFAULT_CLOCK, Clock)
+        first = DEFAULT_CLOCK()
+        assert DEFAULT_CLOCK() >= first
+
+    def test_virtual_advance(self):
+        clock = VirtualClock(10.0)
+        clock.advance(2.5)
+        assert clock() == 12.5
+
+    def test_virtual_sleep_does_not_block(self):
+        clock = VirtualClock()
+        started = time.perf_counter()
+        clock.sleep(3600)
+        assert clock() == 3600
+        assert time.perf_counter() - started < 1.0
+
+
+# ─── GameLogic ──────────────────────────────────────────────────────
+
+class TestGameLogicClock:
+
+    def test_drives_game_timer(self):
+        clock = VirtualClock(100.0)
+        logic = GameLogic(clock=clock)
+        logic.start_game(GameMode.STANDARD, ["Тестов"])
+        clock.advance(5.0)
+        assert logic.get_remaining_time() == DEFAULT_TIME_LIMIT - 5.0
+
+    def test_time_up(self):
+        clock = VirtualClock()
+        logic = GameLogic(clock=clock)
+        logic.start_game(GameMode.STANDARD, ["Тестов"])
+        clock.advance(DEFAULT_TIME_LIMIT + 1)
+        assert logic.is_time_up() is True
+        assert logic.submit_answer("А")["is_correct"] is False
+
+
+# ─── Лоби и таймери ─────────────────────────────────────────────────
+
+class TestLobbyClock:
+
+    def _host(self, clock, wheel):
+        lobby = GameLobby(is_host=True, clock=clock, scheduler=wheel)
+        lobby.server = GameServer()
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby.completed = []
+        lobby.on_round_complete = lobby.completed.append
+        return lobby
+
+    def test_answer_time_from_clock(self):
+        clock = VirtualClock()
+        lobby = self._host(clock, TimerWheel(clock=clock))
+        lobby.send_question({"text": "Въпрос?", "correct_answer": "А"})
+        clock.advance(7.25)
+        lobby.submit_answer("А")
+        assert lobby.players["host"].answer_time == 7.25
+        lobby.close()
+
+    def test_wheel_catches_up_with_virtual_time(self):
+        clock = VirtualClock()
+        wheel = TimerWheel(tick=0.5, slots=8, clock=clock)
+        fired = []
+        wheel.schedule(3.0, fired.append, "a")
+        clock.advance(2.9)
+        assert wheel.catch_up() == 0
+        clock.advance(0.1)
+        assert wheel.catch_up() == 1
+        assert fired == ["a"]
+
+    def test_thousand_rounds_without_sleeping(self):
+        clock = VirtualClock()
+        wheel = TimerWheel(tick=0.5, slots=64, clock=clock)
+        lobby = self._host(clock, wheel)
+        started = time.perf_counter()
+        for _ in range(1000):
+            lobby.send_question({"text": "Въпрос?", "correct_answer": "А"})
+            clock.advance(4.0)
+            lobby.submit_answer("А")
+            clock.advance(DEFAULT_TIME_LIMIT + ROUND_DEADLINE_GRACE)
+            wheel.catch_up()
+            lobby.pump()
+        assert len(lobby.completed) == 1000
+        assert lobby.players["host"].answer_time == 4.0
+        assert lobby.players["p1"].answer_time == DEFAULT_TIME_LIMIT
+        assert time.perf_counter() - started < 10.0
+        lobby.close()
@@ -0,0 +1,107 @@
+"""Тестове за discovery.py — UDP обявяване и откриване на игри."""
+import socket
+import time
+
+from triviador.network.discovery import (
+    BeaconBroadcaster, LobbyBrowser, encode_beacon, decode_beacon,
+    get_local_addresses, get_local_ip
+)
+
+
+def _free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+INFO = {"name": "Иван", "port": 5555, "players": 2, "max": 4, "mode": "standard", "started": False}
+
+
+# ─── Формат на обявата ──────────────────────────────────────────────
+
+class TestBeaconFormat:
+
+    def test_roundtrip(self):
+        assert decode_beacon(encode_beacon(INFO)) == INFO
+
+    def test_small(self):
+        assert len(encode_beacon(INFO)) < 128
+
+    def test_rejects_foreign_packets(self):
+        assert decode_beacon(b"hello") is None
+        assert decode_beacon(b"TRVB1{not json") is None
+        assert decode_beacon(b"TRVB1[]") is None
+        assert decode_beacon(b'TRVB1{"port": "x"}') is None
+
+
+# ─── Локален адрес ──────────────────────────────────────────────────
+
+class TestLocalAddress:
+
+    def test_local_ip_is_ipv4(self):
+        socket.inet_aton(get_local_ip())
+
+    def test_loopback_sorted_last(self):
+        addresses = get_local_addresses()
+        loopback = [a.startswith("127.") for a in addresses]
+        assert loopback == sorted(loopback)
+
+
+# ─── Кеш с изтичане ─────────────────────────────────────────────────
+
+class TestLobbyBrowser:
+
+    def test_cache_and_expiry(self):
+        browser = LobbyBrowser(ttl=2.0)
+        browser.update("10.0.0.5", INFO, now=100.0)
+        lobbies = browser.get_lobbies(now=101.0)
+        assert len(lobbies) == 1
+        assert lobbies[0].name == "Иван"
+        assert lobbies[0].joinable
+        assert browser.get_lobbies(now=103.0) == []
+
+    def test_update_refreshes_entry(self):
+        browser = LobbyBrowser(ttl=2.0)
+        browser.update("10.0.0.5", INFO, now=100.0)
+        browser.update("10.0.0.5", dict(INFO, players=4), now=101.5)
+        lobbies = browser.get_lobbies(now=103.0)
+        assert len(lobbies) == 1
+        assert lobbies[0].full
+        assert not lobbies[0].joinable
+
+    def test_closed_beacon_removes_entry(self):
+        browser = LobbyBrowser()
+        browser.update("10.0.0.5", INFO)
+        browser.update("10.0.0.5", dict(INFO, closed=True))
+        assert browser.get_lobbies() == []
+
+    def test_beacons_over_loopback(self):
+        port = _free_udp_port()
+        browser = LobbyBrowser(port=port)
+        info = dict(INFO)
+        beacon = BeaconBroadcaster(lambda: info, interval=5.0, targets=[("127.0.0.1", port)])
+        assert browser.start()
+        try:
+            assert beacon.start()
+            deadline = time.time() + 1.0
+            while not browser.get_lobbies() and time.time() < deadline:
+                time.sleep(0.01)
+            lobbies = browser.get_lobbies()
+            assert [(l.address, l.port) for l in lobbies] == [("127.0.0.1", 5555)]
+
+            # announce() изпраща обновлението веднага, без да чака интервала
+            info["players"] = 3
+            beacon.announce()
+            deadline = time.time() + 1.0
+            while browser.get_lobbies()[0].players != 3 and time.time() < deadline:
+                time.sleep(0.01)
+            assert browser.get_lobbies()[0].players == 3
+
+            beacon.stop()
+            deadline = time.time() + 1.0
+            while browser.get_lobbies() and time.time() < deadline:
+                time.sleep(0.01)
+            assert browser.get_lobbies() == []
+        finally:
+            beacon.stop()
+            browser.stop()
@@ -0,0 +1,273 @@
+"""Тестове за events.py — пръстеновиден буфер със събития и фонови консуматори."""
+import json
+import time
+from unittest.mock import MagicMock
+
+from triviador.core.clock import VirtualClock
+from triviador.core.models import GameMode
+from triviador.logic.calibration import Calibrator
+from triviador.logic.events import (
+    EVENT_ANSWER, EVENT_GAME_END, EVENT_GAME_START, EVENT_JOKER, EVENT_QUESTION, EVENT_ROUND_END,
+    EVENT_SNAPSHOT,
+    AnalyticsWriter, EventLog, persist_calibration, persist_highscores, write_journal,
+)
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.snapshot import SnapshotJournal, decode_snapshot, load_latest
+from triviador.network.network import GameLobby, GameServer, OnlinePlayer
+
+
+def _logic(events, **kwargs):
+    highscore_manager = MagicMock()
+    highscore_manager.add_score.return_value = 1
+    return GameLogic(highscore_manager=highscore_manager, clock=VirtualClock(), events=events, **kwargs)
+
+
+# ─── Буфер ──────────────────────────────────────────────────────────
+
+class TestEventLog:
+
+    def test_emit_and_read(self):
+        log = EventLog(capacity=8, clock=VirtualClock(5.0))
+        log.emit(EVENT_GAME_START, mode="standard")
+        log.emit(EVENT_ANSWER, player="Иван", correct=True)
+        events, cursor, dropped = log.read(0)
+        assert [e.kind for e in events] == [EVENT_GAME_START, EVENT_ANSWER]
+        assert [e.seq for e in events] == [0, 1]
+        assert events[1].data == {"player": "Иван", "correct": True}
+        assert events[0].at == 5.0
+        assert (cursor, dropped) == (2, 0)
+        assert log.read(cursor) == ([], 2, 0)
+
+    def test_overflow_counts_dropped(self):
+        log = EventLog(capacity=4)
+        for i in range(10):
+            log.emit(EVENT_QUESTION, index=i)
+        events, cursor, dropped = log.read(0)
+        assert [e.data["index"] for e in events] == [6, 7, 8, 9]
+        assert (cursor, dropped) == (10, 6)
+
+    def test_to_dict(self):
+        log = EventLog()
+        log.emit(EVENT_JOKER, joker="50_50")
+        event = log.read(0)[0][0]
+        assert event.to_dict()["event"] == "joker"
+        assert event.name == "joker"
+        assert "source" not in event.to_dict()
+
+    def test_emit_overhead(self):
+        """Добавянето на събитие трябва да струва няколко микросекунди."""
+        log = EventLog()
+        count = 50000
+        started = time.perf_counter()
+        for i in range(count):
+            log.emit(EVENT_ANSWER, player="Иван", question_id=i, correct=True, points=120, time=3.2)
+        per_event = (time.perf_counter() - started) / count
+        assert per_event < 20e-6
+
+
+# ─── Консуматори ────────────────────────────────────────────────────
+
+class TestConsumers:
+
+    def test_drain_in_order(self):
+        log = EventLog()
+        seen = []
+        consumer = log.subscribe(lambda e: seen.append(e.seq), "test")
+        for _ in range(5):
+            log.emit(EVENT_QUESTION)
+        assert consumer.drain() == 5
+        assert seen == [0, 1, 2, 3, 4]
+        assert consumer.get_stats() == {"handled": 5, "lag": 0, "dropped": 0, "errors": 0}
+
+    def test_starts_at_current_position(self):
+        log = EventLog()
+        log.emit(EVENT_QUESTION)
+        consumer = log.subscribe(MagicMock())
+        assert consumer.drain() == 0
+
+    def test_handler_errors_do_not_stop_consumer(self):
+        log = EventLog()
+        handler = MagicMock(side_effect=[RuntimeError("диск"), None])
+        consumer = log.subscribe(handler, "failing")
+        log.emit(EVENT_QUESTION)
+        log.emit(EVENT_QUESTION)
+        consumer.drain()
+        assert consumer.errors == 1
+        assert handler.call_count == 2
+
+    def test_slow_consumer_reports_drops(self):
+        log = EventLog(capacity=4)
+        consumer = log.subscribe(MagicMock())
+        for _ in range(6):
+            log.emit(EVENT_QUESTION)
+        consumer.drain()
+        assert consumer.dropped == 2
+
+    def test_background_thread(self):
+        log = EventLog()
+        seen = []
+        log.subscribe(lambda e: seen.append(e.seq), "bg", interval=0.01)
+        log.start()
+        for _ in range(3):
+            log.emit(EVENT_QUESTION)
+        deadline = time.monotonic() + 2
+        while len(seen) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        log.emit(EVENT_QUESTION)
+        log.close()
+        assert seen == [0, 1, 2, 3]
+
+    def test_close_drains_without_thread(self):
+        log = EventLog()
+        handler = MagicMock()
+        log.subscribe(handler)
+        log.emit(EVENT_GAME_END)
+        log.close()
+        handler.assert_called_once()
+
+    def test_stats(self):
+        log = EventLog()
+        log.subscribe(MagicMock(), "a")
+        log.emit(EVENT_QUESTION)
+        stats = log.get_stats()
+        assert stats["emitted"] == 1
+        assert stats["consumers"]["a"]["lag"] == 1
+
+
+# ─── Игрова логика ──────────────────────────────────────────────────
+
+class TestGameLogicEvents:
+
+    def _play(self, logic):
+        state = logic.start_game(GameMode.STANDARD, ["Иван"], seed=3)
+        logic.submit_answer(state.current_question.correct_answer)
+        logic.next_question()
+        if not state.is_special_round:
+            logic.use_joker("50_50")
+        return logic.end_game()
+
+    def test_emits_typed_events(self):
+        log = EventLog()
+        logic = _logic(log)
+        self._play(logic)
+        kinds = [e.kind for e in log.read(0)[0]]
+        assert kinds[0] == EVENT_GAME_START
+        assert kinds[1:3] == [EVENT_ANSWER, EVENT_QUESTION]
+        assert kinds[-1] == EVENT_GAME_END
+        assert EVENT_SNAPSHOT not in kinds
+
+    def test_end_game_does_no_io(self):
+        log = EventLog()
+        logic = _logic(log)
+        calibrator = MagicMock()
+        logic.calibrator = calibrator
+        logic.start_game(GameMode.STANDARD, ["Иван"], seed=3)
+        logic.end_game()
+        _, kwargs = logic.highscore_manager.add_score.call_args
+        assert kwargs == {"save": False}
+        assert not calibrator.save.called
+
+        log.subscribe(persist_highscores(logic.highscore_manager))
+        log.subscribe(persist_calibration(calibrator))
+        log.emit(EVENT_GAME_END)
+        log.flush()
+        logic.highscore_manager.save.assert_called_once()
+        calibrator.save.assert_called_once()
+
+    def test_without_log_saves_inline(self, tmp_path):
+        calibrator = Calibrator(path=tmp_path / "calibration.bin")
+        logic = _logic(None, calibrator=calibrator)
+        logic.start_game(GameMode.STANDARD, ["Иван"], seed=3)
+        logic.end_game()
+        assert (tmp_path / "calibration.bin").exists()
+        _, kwargs = logic.highscore_manager.add_score.call_args
+        assert kwargs == {"save": True}
+
+    def test_journal_written_by_consumer(self, tmp_path):
+        path = tmp_path / "session.snap"
+        log = EventLog()
+        logic = _logic(log)
+        journal = SnapshotJournal(path)
+        logic.attach_journal(journal)
+        consumer = log.subscribe(write_journal(journal), "journal")
+
+        state = logic.start_game(GameMode.STANDARD, ["Иван"], seed=3)
+        logic.submit_answer(state.current_question.correct_answer)
+        assert load_latest(path) is None
+
+        consumer.drain()
+        snapshot = decode_snapshot(load_latest(path))
+        assert snapshot.answered
+        assert snapshot.players[0].score == state.players[0].score
+
+        logic.end_game()
+        consumer.drain()
+        assert load_latest(path) is None
+        journal.close()
+
+    def test_analytics_file(self, tmp_path):
+        path = tmp_path / "events.log"
+        log = EventLog()
+        writer = AnalyticsWriter(path)
+        log.subscribe(writer, "analytics")
+        logic = _logic(log)
+        logic.attach_journal(SnapshotJournal(tmp_path / "session.snap"))
+        self._play(logic)
+        log.close()
+        writer.close()
+
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert lines[0]["event"] == "game_start"
+        assert lines[-1]["event"] == "game_end"
+        assert lines[-1]["players"][0]["name"] == "Иван"
+        assert all(line["event"] != "snapshot" for line in lines)
+
+
+# ─── Онлайн хост ────────────────────────────────────────────────────
+
+class TestLobbyEvents:
+
+    def test_host_emits(self):
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        lobby.events = EventLog()
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        assert lobby.start_game()
+        lobby.send_question({"id": 4, "text": "?", "correct_answer": "А"})
+        lobby._process_player_answer("p1", {"answer": "А", "time": 2.0})
+        lobby.send_answer_results({"eliminated_this_round": []})
+        lobby.send_game_end([{"name": "А", "score": 100}])
+
+        kinds = [e.kind for e in lobby.events.read(0)[0]]
+        assert kinds == [EVENT_GAME_START, EVENT_QUESTION, EVENT_ANSWER, EVENT_ROUND_END, EVENT_GAME_END]
+        lobby.close()
+
+    def test_own_log_keeps_solo_journal(self, tmp_path):
+        """Краят на онлайн игра не чисти соло журнала, но стига до общите анализи."""
+        solo, online = EventLog(), EventLog(source="online")
+        writer = AnalyticsWriter(tmp_path / "events.log")
+        journal = MagicMock()
+        solo.subscribe(write_journal(journal), "journal")
+        solo.subscribe(writer, "analytics")
+        online.subscribe(writer, "analytics")
+
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        lobby.events = online
+        lobby.send_game_end([{"name": "А", "score": 100}])
+        solo.close()
+        online.close()
+        writer.close()
+        lobby.close()
+
+        journal.clear.assert_not_called()
+        lines = [json.loads(line) for line in (tmp_path / "events.log").read_text(encoding="utf-8").splitlines()]
+        assert [(line["event"], line["source"]) for line in lines] == [("game_end", "online")]
+
+    def test_no_log_no_events(self):
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        lobby.send_game_end([])
+        assert lobby.events is None
+        lobby.close()
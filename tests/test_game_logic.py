@@ -174,7 +174,7 @@ class TestSubmitAnswer:
         started_game.game_state.questions = [q]
         started_game.game_state.current_question_index = 0
         # Симулираме изтекло време
-        started_game.question_start_time = time.time() - DEFAULT_TIME_LIMIT - 1
+        started_game.question_start_time = started_game.clock() - DEFAULT_TIME_LIMIT - 1
 
         result = started_game.submit_answer("А")
         assert result["is_correct"] is False
@@ -225,7 +225,7 @@ class TestTimer:
         assert 0 < remaining <= DEFAULT_TIME_LIMIT
 
     def test_time_up(self, started_game):
-        started_game.question_start_time = time.time() - DEFAULT_TIME_LIMIT - 1
+        started_game.question_start_time = started_game.clock() - DEFAULT_TIME_LIMIT - 1
         assert started_game.is_time_up() is True
 
     def test_time_not_up(self, started_game):
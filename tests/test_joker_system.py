@@ -1,7 +1,9 @@
 """Тестове за joker_system.py — JokerSystem."""
+import random
+
 import pytest
 
-from triviador.logic.joker_system import JokerSystem
+from triviador.logic.joker_system import JokerSystem, RoundJokers
 from triviador.core.models import Question, Player, QuestionType
 from triviador.core.config import JOKER_5050, JOKER_AUDIENCE
 
@@ -134,6 +136,26 @@ class TestCanUseJoker:
         assert ok is True
 
 
+# ─── RoundJokers ────────────────────────────────────────────────────
+
+class TestRoundJokers:
+
+    def test_precomputes_both(self):
+        cached = RoundJokers(_mc_question(correct="Б"), False, random.Random(1))
+        assert "Б" in cached.results[JOKER_5050]["remaining_options"]
+        assert sum(cached.results[JOKER_AUDIENCE]["votes"].values()) == 100
+        assert cached.results[JOKER_5050]["joker_type"] == JOKER_5050
+
+    def test_special_round_has_no_results(self):
+        cached = RoundJokers(_mc_question(), True, random.Random(1))
+        assert cached.results == {}
+
+    def test_deterministic(self):
+        a = RoundJokers(_numeric_question(), False, random.Random(7))
+        b = RoundJokers(_numeric_question(), False, random.Random(7))
+        assert a.results == b.results
+
+
 # ─── helpers ────────────────────────────────────────────────────────
 
 class TestJokerHelpers:
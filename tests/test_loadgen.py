@@ -0,0 +1,45 @@
+"""Тестове за loadgen.py — синтетични ботове срещу локален сървър."""
+import pytest
+
+from triviador.network.loadgen import BotProfile, percentile, summarize, run_load
+
+
+class TestPercentiles:
+
+    def test_percentile_interpolates(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert percentile(values, 50) == 3.0
+        assert percentile(values, 90) == pytest.approx(4.6)
+        assert percentile(values, 100) == 5.0
+
+    def test_empty(self):
+        assert percentile([], 99) == 0.0
+        assert summarize([])["count"] == 0
+
+    def test_summary_in_ms(self):
+        summary = summarize([0.010, 0.020])
+        assert summary["max_ms"] == pytest.approx(20.0)
+        assert summary["p50_ms"] == pytest.approx(15.0)
+
+
+class TestSwarm:
+
+    def test_small_swarm(self):
+        """Ботовете довършват всички рундове, преди да се построи отчетът."""
+        profile = BotProfile(latency_mean=0.02, latency_jitter=0.0, accuracy=1.0,
+                             accuracy_spread=0.0, joker_rate=1.0)
+        report = run_load(bot_count=5, rounds=2, port=0, profile=profile, seed=1)
+        assert report["bots"] == 5
+        assert report["errors"] == {}
+        assert report["join_latency"]["count"] == 5
+        assert report["answers"] == 10
+        assert report["result_latency"]["count"] == 10
+        assert report["fanout_skew"]["count"] == 4
+        assert report["joker_latency"]["count"] > 0
+
+    def test_lobby_size(self):
+        profile = BotProfile(latency_mean=0.01, latency_jitter=0.0, joker_rate=0.0)
+        report = run_load(bot_count=6, rounds=1, port=0, profile=profile, seed=2, lobby_size=7)
+        assert report["errors"] == {}
+        assert report["answers"] == 6
+        assert report["fanout_skew"]["count"] == 1
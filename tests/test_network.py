@@ -1,8 +1,14 @@
 """Тестове за network.py — NetworkMessage, OnlinePlayer, GameLobby."""
 import pytest
+import socket
+import threading
 import time
 
-from triviador.network.network import NetworkMessage, OnlinePlayer, GameLobby
+from triviador.network.network import NetworkMessage, OnlinePlayer, GameLobby, GameServer, Connection
+from triviador.network.benchmark import broadcast_allocations
+from triviador.network.protocol import CODEC_BINARY, COMPRESSION_ZLIB, FrameDecoder, MessageTypes, encode_message
+from triviador.network.timesync import LinkEstimator
+from triviador.core.config import DEFAULT_TIME_LIMIT
 from triviador.core.config import JOKER_5050, JOKER_AUDIENCE
 
 
@@ -115,3 +121,908 @@ class TestGameLobby:
         ip = lobby.get_local_ip()
         assert isinstance(ip, str)
         assert len(ip) > 0
+
+
+# ─── Компенсация на закъснението ────────────────────────────────────
+
+class TestAnswerCompensation:
+
+    def _lobby(self, offset=0.0, rtt=0.1):
+        lobby = GameLobby(is_host=True)
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby.outstanding = {"p1"}
+        lobby.question_start_time = 1000.0
+        link = LinkEstimator()
+        link.add_sample(990.0, 990.0 + rtt / 2 + offset, 990.0 + rtt)
+        lobby.links["p1"] = link
+        return lobby
+
+    def test_uses_client_timestamp_in_host_clock(self):
+        lobby = self._lobby(offset=3.0)
+        lobby._process_player_answer("p1", {"answer": "А", "time": 99, "answered_at": 1007.0}, 1004.05)
+        assert lobby.players["p1"].answer_time == pytest.approx(4.0)
+
+    def test_client_cannot_claim_earlier_answer(self):
+        lobby = self._lobby()
+        lobby._process_player_answer("p1", {"answer": "А", "answered_at": 1000.0}, 1010.0)
+        assert lobby.players["p1"].answer_time > 9.5
+
+    def test_without_timestamp_uses_half_rtt(self):
+        lobby = self._lobby(rtt=0.2)
+        lobby._process_player_answer("p1", {"answer": "А", "time": 1.0}, 1005.1)
+        assert lobby.players["p1"].answer_time == pytest.approx(5.0)
+
+    def test_clamped_to_time_limit(self):
+        lobby = self._lobby()
+        lobby._process_player_answer("p1", {"answer": "А"}, 2000.0)
+        assert lobby.players["p1"].answer_time == DEFAULT_TIME_LIMIT
+
+    def test_legacy_without_link(self):
+        lobby = GameLobby(is_host=True)
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby.outstanding = {"p1"}
+        lobby._process_player_answer("p1", {"answer": "А", "time": 7.5}, 5.0)
+        assert lobby.players["p1"].answer_time == 7.5
+
+
+# ─── Възстановяване на сесия ────────────────────────────────────────
+
+class TestSessionState:
+
+    def _host(self):
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А", score=50)
+        lobby.game_started = True
+        return lobby
+
+    def test_disconnect_mid_game_keeps_seat(self):
+        lobby = self._host()
+        lobby._reset_answers(set())
+        lobby.submit_answer("Б")
+        lobby._on_client_disconnected("p1")
+        assert "p1" in lobby.players
+        assert not lobby.players["p1"].connected
+        assert lobby.players["p1"].score == 50
+        assert lobby.all_answers_received
+        assert lobby.state_version == 1
+
+    def test_disconnect_in_lobby_removes_player(self):
+        lobby = self._host()
+        lobby.game_started = False
+        lobby._on_client_disconnected("p1")
+        assert "p1" not in lobby.players
+
+    def test_disconnect_in_lobby_forgets_session(self):
+        """Токенът на напуснал преди старта играч не може да възстанови чужда сесия."""
+        lobby = self._host()
+        lobby.game_started = False
+        lobby.sessions = {"t1": "p1", "t0": "host"}
+        lobby._on_client_disconnected("p1")
+        assert lobby.sessions == {"t0": "host"}
+
+    def test_relay_follows_rekey(self):
+        """Релето преименува възстановения играч и го съобщава на зрителите."""
+        from triviador.network.relay import SpectatorRelay
+
+        relay = SpectatorRelay(0)
+        relay.players = [{"id": "host", "name": "Хост"}, {"id": "p1", "name": "А"}]
+        sent = []
+        relay._fan_out = sent.append
+        relay._apply_roster({"rekey": {"p1": "p1b"}, "players": {"p1b": {"connected": True}}})
+        assert relay.players == [{"id": "host", "name": "Хост"}, {"id": "p1b", "name": "А"}]
+        assert [(m.type, m.data) for m in sent] == [
+            (MessageTypes.PLAYER_LEFT, {"player_id": "p1"}),
+            (MessageTypes.PLAYER_JOINED, {"player": {"id": "p1b", "name": "А"}}),
+        ]
+        relay.server.stop()
+
+    def test_snapshot_contains_question_and_time(self):
+        lobby = self._host()
+        lobby.current_question = {"text": "Въпрос?", "correct_answer": "А"}
+        lobby.question_start_time = lobby.clock() - 5
+        snapshot = lobby._build_snapshot("p1")
+        assert snapshot["question"] == {"text": "Въпрос?"}
+        assert 4 < snapshot["time_left"] < DEFAULT_TIME_LIMIT - 4
+        assert snapshot["answered"] is False
+        assert {"id": "p1", "name": "А", "ready": False, "score": 50, "connected": True} in snapshot["players"]
+
+    def test_roster_delta(self):
+        lobby = GameLobby(is_host=False)
+        lobby.players["a"] = OnlinePlayer(id="a", name="А")
+        joined, left = [], []
+        lobby.on_player_joined = joined.append
+        lobby.on_player_left = left.append
+        lobby._apply_delta(1, {"joined": [{"id": "b", "name": "Б", "ready": False}]})
+        lobby._apply_delta(2, {"left": ["a"], "players": {"b": {"ready": True}}})
+        lobby.pump()
+        assert [p.name for p in joined] == ["Б"]
+        assert left == ["a"]
+        assert list(lobby.players) == ["b"]
+        assert lobby.players["b"].ready
+
+    def test_apply_delta_in_order(self):
+        lobby = GameLobby(is_host=False)
+        lobby.players["a"] = OnlinePlayer(id="a", name="А")
+        lobby._apply_delta(1, {"rekey": {"a": "b"}, "players": {"b": {"score": 30}},
+                               "eliminated": ["В"]})
+        assert list(lobby.players) == ["b"]
+        assert lobby.players["b"].id == "b"
+        assert lobby.players["b"].score == 30
+        assert lobby.eliminated == {"В"}
+        lobby._apply_delta(1, {"players": {"b": {"score": 0}}})
+        assert lobby.players["b"].score == 30
+
+    def test_versions_unique_and_in_order(self):
+        """Делти от няколко нишки излизат с уникални версии и в нарастващ ред."""
+
+        class _WireServer:
+            def __init__(self):
+                self.versions = []
+
+            def multicast(self, client_ids, message, exclude=None):
+                time.sleep(0.0002)
+                self.versions.append(message.data["version"])
+
+            def broadcast(self, message, exclude=None):
+                self.multicast([], message, exclude)
+
+        lobby = GameLobby(is_host=True)
+        lobby.server = _WireServer()
+
+        def deltas():
+            for _ in range(25):
+                lobby._broadcast_delta({"players": {}})
+
+        def results():
+            for _ in range(25):
+                lobby.send_answer_results({"eliminated_this_round": []})
+
+        workers = [threading.Thread(target=deltas) for _ in range(3)] + [threading.Thread(target=results)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert lobby.server.versions == list(range(1, 101))
+
+
+# ─── Приключване на рунд ────────────────────────────────────────────
+
+class TestRoundCompletion:
+
+    def _host(self, timeout=DEFAULT_TIME_LIMIT):
+        lobby = GameLobby(is_host=True)
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby.players["p2"] = OnlinePlayer(id="p2", name="Б")
+        lobby.completed = []
+        lobby.on_round_complete = lobby.completed.append
+        lobby._reset_answers({"Б"})
+        if timeout != DEFAULT_TIME_LIMIT:
+            lobby._open_round(timeout)
+        return lobby
+
+    def test_eliminated_not_outstanding(self):
+        lobby = self._host()
+        assert lobby.outstanding == {"host", "p1"}
+        lobby.close()
+
+    def test_completes_once_when_all_answered(self):
+        lobby = self._host()
+        lobby.submit_answer("А")
+        lobby._process_player_answer("p1", {"answer": "В", "time": 3.0})
+        assert lobby.all_answers_received
+        assert lobby.round_deadline is None
+        lobby._mark_answered("p1")
+        lobby.pump()
+        assert lobby.completed == [lobby.round_id]
+
+    def test_late_answer_ignored(self):
+        lobby = self._host()
+        lobby.submit_answer("А")
+        lobby._process_player_answer("p1", {"answer": "В", "time": 3.0})
+        lobby._process_player_answer("p1", {"answer": "А", "time": 4.0})
+        assert lobby.players["p1"].current_answer == "В"
+
+    def test_second_answer_ignored(self):
+        lobby = self._host()
+        lobby._process_player_answer("p1", {"answer": "В", "time": 3.0})
+        lobby._process_player_answer("p1", {"answer": "А", "time": 4.0})
+        assert lobby.players["p1"].current_answer == "В"
+        assert lobby.players["p1"].answer_time == 3.0
+        assert not lobby.all_answers_received
+        lobby.close()
+
+    def test_eliminated_answer_ignored(self):
+        lobby = self._host()
+        lobby._process_player_answer("p2", {"answer": "В", "time": 1.0})
+        assert lobby.players["p2"].current_answer == ""
+        lobby.close()
+
+    def test_deadline_closes_round(self):
+        lobby = self._host(timeout=0.05)
+        lobby.submit_answer("А")
+        deadline = time.time() + 2.0
+        while not lobby.all_answers_received and time.time() < deadline:
+            time.sleep(0.01)
+        assert lobby.all_answers_received
+        assert lobby.players["p1"].current_answer == ""
+        assert lobby.players["p1"].answer_time == DEFAULT_TIME_LIMIT
+        lobby.pump()
+        assert len(lobby.completed) == 1
+
+    def test_stale_deadline_ignored(self):
+        lobby = self._host()
+        stale = lobby.round_id
+        lobby._reset_answers(set())
+        lobby._close_round(stale)
+        assert not lobby.all_answers_received
+        assert lobby.outstanding == {"host", "p1", "p2"}
+        lobby.close()
+
+
+# ─── Жокери от кеша на рунда ────────────────────────────────────────
+
+class _RecordingServer:
+    """Сървър, който само запомня изпратените съобщения."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_to_client(self, client_id, message):
+        self.sent.append((client_id, message))
+        return True
+
+    def broadcast(self, message, exclude=None):
+        pass
+
+    def stop(self):
+        pass
+
+
+class TestJokerCache:
+
+    def _host(self, special=False):
+        lobby = GameLobby(is_host=True)
+        lobby.server = _RecordingServer()
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby.send_question({
+            "text": "Въпрос?",
+            "options": ["А", "Б", "В", "Г"],
+            "question_type": "multiple_choice",
+            "difficulty": 2,
+            "question_number": 1,
+            "correct_answer": "В",
+            "is_special_round": special,
+        })
+        return lobby
+
+    def _last_result(self, lobby):
+        return lobby.server.sent[-1][1].data
+
+    def test_served_from_cache(self):
+        lobby = self._host()
+        lobby._process_joker_use("p1", {"joker_type": JOKER_5050})
+        data = self._last_result(lobby)
+        assert "В" in data["remaining_options"]
+        assert data["remaining_count"] == lobby.players["p1"].jokers[JOKER_5050]
+        assert data == dict(lobby.joker_result(JOKER_5050), remaining_count=data["remaining_count"])
+
+    def test_client_cannot_lie_about_special_round(self):
+        lobby = self._host(special=True)
+        before = dict(lobby.players["p1"].jokers)
+        lobby._process_joker_use("p1", {"joker_type": JOKER_5050, "is_special_round": False})
+        assert "error" in self._last_result(lobby)
+        assert lobby.players["p1"].jokers == before
+
+    def test_normal_round_ignores_client_flag(self):
+        lobby = self._host()
+        lobby._process_joker_use("p1", {"joker_type": JOKER_AUDIENCE, "is_special_round": True})
+        assert "votes" in self._last_result(lobby)
+
+    def test_exhausted(self):
+        lobby = self._host()
+        lobby.players["p1"].jokers[JOKER_AUDIENCE] = 0
+        lobby._process_joker_use("p1", {"joker_type": JOKER_AUDIENCE})
+        assert "error" in self._last_result(lobby)
+
+    def test_unknown_type_does_not_consume(self):
+        lobby = self._host()
+        lobby.players["p1"].jokers["неясен"] = 1
+        lobby._process_joker_use("p1", {"joker_type": "неясен"})
+        assert lobby.players["p1"].jokers["неясен"] == 1
+
+    def test_rejected_after_round_closed(self):
+        lobby = self._host()
+        before = dict(lobby.players["p1"].jokers)
+        lobby.all_answers_received = True
+        lobby._process_joker_use("p1", {"joker_type": JOKER_5050})
+        assert "error" in self._last_result(lobby)
+        assert lobby.players["p1"].jokers == before
+
+    def test_rejected_after_answering(self):
+        lobby = self._host()
+        before = dict(lobby.players["p1"].jokers)
+        lobby._process_player_answer("p1", {"answer": "А", "time": 1.0}, lobby.clock())
+        assert "p1" not in lobby.outstanding
+        lobby._process_joker_use("p1", {"joker_type": JOKER_AUDIENCE})
+        assert "error" in self._last_result(lobby)
+        assert lobby.players["p1"].jokers == before
+
+    def test_prefetched_rounds_cached_until_live(self):
+        lobby = self._host()
+        lobby.prefetch_question(2, {"text": "?", "options": ["X", "Y"], "correct_answer": "Y"})
+        lobby.prefetch_question(3, {"text": "?", "options": ["X", "Y"], "correct_answer": "X"})
+        assert lobby.live_round == 1
+        assert sorted(lobby.round_jokers) == [1, 2, 3]
+        lobby.reveal_question(2)
+        assert lobby.live_round == 2
+        assert sorted(lobby.round_jokers) == [2, 3]
+        assert "Y" in lobby.joker_result(JOKER_5050)["remaining_options"]
+        lobby.close()
+
+    def test_no_live_round(self):
+        lobby = GameLobby(is_host=True)
+        lobby.server = _RecordingServer()
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="А")
+        lobby._process_joker_use("p1", {"joker_type": JOKER_5050})
+        assert lobby.server.sent == []
+        assert lobby.joker_result(JOKER_5050) is None
+
+
+# ─── Изпращане без копиране ─────────────────────────────────────────
+
+class _TrickleSocket:
+    """Сокет, който приема най-много `chunk` байта наведнъж."""
+
+    def __init__(self, chunk=3):
+        self.chunk = chunk
+        self.received = bytearray()
+        self.buffers = []
+
+    def sendmsg(self, buffers):
+        self.buffers.extend(view.obj if isinstance(view, memoryview) else view for view in buffers)
+        sent = 0
+        for view in buffers:
+            take = min(len(view), self.chunk - sent)
+            self.received += view[:take]
+            sent += take
+            if sent == self.chunk:
+                break
+        return sent
+
+    def sendall(self, data):
+        self.received += data
+
+
+class TestScatterGatherSend:
+
+    def _message(self):
+        return NetworkMessage(type="question", data={"text": "Въпрос?" * 20, "options": ["А", "Б"]})
+
+    def test_partial_sends_resumed(self):
+        sock = _TrickleSocket()
+        connection = Connection(sock)
+        connection.codec = CODEC_BINARY
+        assert connection.send(self._message())
+        assert bytes(sock.received) == encode_message(self._message(), CODEC_BINARY)
+        assert connection.stats.bytes_out == len(sock.received)
+
+    def test_broadcast_shares_payload(self):
+        server = GameServer()
+        sockets = [_TrickleSocket(chunk=10 ** 6) for _ in range(3)]
+        for i, sock in enumerate(sockets):
+            server.clients[f"c{i}"] = Connection(sock, f"c{i}")
+            server.clients[f"c{i}"].codec = CODEC_BINARY
+        server.broadcast(self._message(), exclude="c2")
+        assert sockets[2].received == b""
+        assert sockets[0].received == sockets[1].received
+        assert sockets[0].buffers[-1] is sockets[1].buffers[-1]
+
+    def test_compressed_link_not_shared(self):
+        server = GameServer()
+        sockets = [_TrickleSocket(chunk=10 ** 6) for _ in range(2)]
+        for i, sock in enumerate(sockets):
+            server.clients[f"c{i}"] = Connection(sock, f"c{i}")
+        server.clients["c0"].set_codec(CODEC_BINARY, COMPRESSION_ZLIB)
+        server.clients["c1"].set_codec(CODEC_BINARY)
+        server.broadcast(self._message())
+        assert len(sockets[0].received) < len(sockets[1].received)
+
+    def test_benchmark_counts_shared_buffers(self):
+        report = broadcast_allocations(self._message(), CODEC_BINARY, client_count=8)
+        frame = len(encode_message(self._message(), CODEC_BINARY))
+        assert report["concat"]["wire_bytes"] == frame
+        assert report["shared"]["wire_bytes"] < frame / 4
+
+
+# ─── Опашка за изпращане ────────────────────────────────────────────
+
+class _StalledSocket:
+    """Сокет, чието изпращане блокира, докато тестът не го пусне."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.received = bytearray()
+
+    def sendmsg(self, buffers):
+        self.release.wait(2.0)
+        for view in buffers:
+            self.received += view
+        return sum(len(view) for view in buffers)
+
+    def sendall(self, data):
+        self.received += data
+
+    def close(self):
+        self.release.set()
+
+
+class TestSendQueue:
+
+    def test_post_does_not_block(self):
+        sock = _StalledSocket()
+        connection = Connection(sock, "c0")
+        started = time.perf_counter()
+        assert connection.post(NetworkMessage(type="ping", data={"t": 1.0}))
+        assert time.perf_counter() - started < 0.1
+        sock.release.set()
+        deadline = time.time() + 2.0
+        while not sock.received and time.time() < deadline:
+            time.sleep(0.01)
+        assert sock.received
+        connection.close()
+
+    def test_overflow_disconnects(self):
+        sock = _StalledSocket()
+        connection = Connection(sock, "c0")
+        connection.outbox_limit = 3
+        message = NetworkMessage(type="ping", data={})
+        results = [connection.post(message) for _ in range(5)]
+        assert results[:3] == [True, True, True]
+        assert results[-1] is False
+        assert connection.closed
+        assert connection.close_reason == "send_overflow"
+
+    def test_relay_fan_out_skips_stalled_spectator(self):
+        from triviador.network.relay import SpectatorRelay
+
+        relay = SpectatorRelay(0)
+        stalled, healthy = _StalledSocket(), _StalledSocket()
+        healthy.release.set()
+        for client_id, sock in (("slow", stalled), ("fast", healthy)):
+            relay.server.clients[client_id] = Connection(sock, client_id)
+            relay.spectators[client_id] = "json"
+        relay.server.clients["slow"].outbox_limit = 2
+
+        message = NetworkMessage(type="question", data={"text": "Въпрос?"})
+        started = time.perf_counter()
+        for _ in range(4):
+            relay._fan_out(message)
+        assert time.perf_counter() - started < 0.1
+        assert list(relay.spectators) == ["fast"]
+        assert relay.get_stats()["dropped"] == 1
+
+        deadline = time.time() + 2.0
+        expected = len(encode_message(message, "json")) * 4
+        while len(healthy.received) < expected and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(healthy.received) == expected
+        relay.server.stop()
+
+    def test_pings_from_timer_do_not_wait_for_slow_client(self):
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        sock = _StalledSocket()
+        lobby.server.clients["p1"] = Connection(sock, "p1")
+        lobby.features["p1"] = frozenset({"ping"})
+        started = time.perf_counter()
+        lobby._send_pings()
+        assert time.perf_counter() - started < 0.1
+        lobby.close()
+
+
+# ─── Опашка със събития ─────────────────────────────────────────────
+
+class TestEventPump:
+
+    def test_callbacks_run_only_on_pump(self):
+        lobby = GameLobby()
+        received = []
+        lobby.on_error = received.append
+        worker = threading.Thread(target=lobby._emit, args=("on_error", "грешка"))
+        worker.start()
+        worker.join()
+        assert received == []
+        assert lobby.pump() == 1
+        assert received == ["грешка"]
+
+    def test_callback_resolved_at_dispatch(self):
+        lobby = GameLobby()
+        lobby._emit("on_game_start")
+        started = []
+        lobby.on_game_start = lambda: started.append(True)
+        lobby.pump()
+        assert started == [True]
+
+    def test_budget_limits_dispatch(self):
+        lobby = GameLobby()
+        lobby.on_error = lambda message: time.sleep(0.002)
+        for i in range(10):
+            lobby._emit("on_error", str(i))
+        assert lobby.pump(budget=0.001) == 1
+        assert len(lobby.event_queue) == 9
+        stats = lobby.get_pump_stats()
+        assert stats["max_queue_depth"] == 10
+        assert stats["budget_overruns"] == 1
+        while lobby.event_queue:
+            lobby.pump()
+        assert lobby.get_pump_stats()["events"] == 10
+
+    def test_event_age_measured(self):
+        lobby = GameLobby()
+        lobby._emit("on_error", "x")
+        time.sleep(0.02)
+        lobby.pump()
+        assert lobby.get_pump_stats()["max_age_ms"] >= 15
+
+
+# ─── GameLobby (локална мрежа) ──────────────────────────────────────
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(predicate, *lobbies, timeout=2.0):
+    """Чака условието, като изпомпва събитията на подадените lobby-та."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        for lobby in lobbies:
+            lobby.pump()
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _legacy_client(port, name):
+    """Клиент от стара версия: чист JSON, без кодеци и без възможности."""
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(NetworkMessage(type="join_game", data={"name": name}).to_json().encode("utf-8"))
+    return sock
+
+
+def _read_legacy(sock, timeout=0.3):
+    """Прочита всичко, което е пристигнало до момента на стар клиент."""
+    decoder = FrameDecoder()
+    messages = []
+    sock.settimeout(timeout)
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            messages.extend(decoder.feed(data))
+    except socket.timeout:
+        pass
+    return messages
+
+
+class TestLobbyLoopback:
+
+    def test_binary_codec_negotiated(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            assert client.client.connection.codec == CODEC_BINARY
+            assert host.server.clients[client.my_id].codec == CODEC_BINARY
+            assert _wait_for(lambda: len(client.players) == 2)
+            assert client.client.connection.compressor is not None
+            assert host.server.clients[client.my_id].compressor is not None
+        finally:
+            client.close()
+            host.close()
+
+    def test_compression_opt_out(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False, compression=False)
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            assert client.client.connection.compressor is None
+            assert host.server.clients[client.my_id].compressor is None
+            stats = host.get_network_stats()[client.my_id]
+            assert stats["messages_in"] >= 1
+        finally:
+            client.close()
+            host.close()
+
+    def test_roster_deltas_beyond_four_players(self):
+        port = _free_port()
+        host = GameLobby(is_host=True, max_players=8)
+        clients = [GameLobby(is_host=False) for _ in range(6)]
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            for i, client in enumerate(clients):
+                assert client.join_game(f"Гост {i}", "127.0.0.1", port=port)
+                assert _wait_for(lambda: client.my_id is not None, client)
+            assert _wait_for(lambda: all(len(c.players) == 7 for c in clients), *clients)
+            by_type = host.server.get_totals()["by_type"]
+            assert by_type["player_joined"]["messages_out"] == 6
+            assert by_type["sync_state"]["messages_out"] == sum(range(6))
+
+            clients[0].close()
+            assert _wait_for(lambda: all(len(c.players) == 6 for c in clients[1:]), *clients[1:])
+            assert len({c.state_version for c in clients[1:]} | {host.state_version}) == 1
+        finally:
+            for client in clients:
+                client.close()
+            host.close()
+
+    def test_prefetch_and_reveal(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        host_questions = []
+        client_questions = []
+        host.on_question_received = host_questions.append
+        client.on_question_received = client_questions.append
+        question = {"text": "Колко?", "question_number": 1, "correct_answer": 42}
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            host.prefetch_question(1, question)
+            assert _wait_for(lambda: 1 in client.prefetched)
+            assert client_questions == []
+            assert host.reveal_question(1, lead=0.05)
+            assert _wait_for(lambda: client_questions and host_questions, client, host)
+            assert client_questions[0] == {"text": "Колко?", "question_number": 1}
+            assert host_questions[0]["correct_answer"] == 42
+            assert not host.reveal_question(1)
+        finally:
+            client.close()
+            host.close()
+
+    def test_legacy_question_sent_at_round_start(self):
+        """Стар клиент получава въпроса едва когато хостът започне рунда."""
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        legacy = None
+        question = {"text": "Колко?", "question_number": 1, "correct_answer": 42}
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            legacy = _legacy_client(port, "Стар")
+            assert _wait_for(lambda: len(host.players) == 2)
+            _read_legacy(legacy, timeout=0.1)
+            host.prefetch_question(1, question)
+            assert host.reveal_question(1, lead=0.3)
+            assert _read_legacy(legacy, timeout=0.1) == []
+            assert host.current_question is None
+            received = _read_legacy(legacy, timeout=0.5)
+            assert [m.type for m in received] == ["question"]
+            assert received[0].data == {"text": "Колко?", "question_number": 1}
+            assert host.current_question == question
+        finally:
+            if legacy is not None:
+                legacy.close()
+            host.close()
+
+    def test_ping_measures_rtt(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            host._send_pings()
+            assert _wait_for(lambda: host.get_rtt_ms(client.my_id) is not None)
+            host._send_pings()
+            assert _wait_for(lambda: client.get_rtt_ms("host") is not None)
+            stats = host.get_network_stats()[client.my_id]
+            assert stats["rtt_ms"] >= 0
+            assert stats["clock_offset_ms"] is not None
+        finally:
+            client.close()
+            host.close()
+
+    def test_legacy_client_not_pinged(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        legacy = None
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            legacy = _legacy_client(port, "Стар")
+            assert _wait_for(lambda: len(host.players) == 2)
+            host._send_pings()
+            assert [m.type for m in _read_legacy(legacy)] == ["player_joined"]
+        finally:
+            if legacy is not None:
+                legacy.close()
+            host.close()
+
+    def test_handler_error_drops_client(self):
+        """Изключение в обработката затваря връзката и почиства клиента."""
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        sock = None
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            sock = socket.create_connection(("127.0.0.1", port))
+            message = NetworkMessage(type="join_game", data={"name": "Лош", "codecs": 5})
+            sock.sendall(message.to_json().encode("utf-8"))
+            assert _wait_for(lambda: host.server.get_totals()["disconnects"].get("handler_error") == 1)
+            assert host.server.clients == {}
+            assert list(host.players) == ["host"]
+        finally:
+            if sock is not None:
+                sock.close()
+            host.close()
+
+    def test_legacy_client_sees_roster_changes(self):
+        """Стар клиент получава player_joined/player_left, а новият — делта."""
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        legacy = None
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            legacy = _legacy_client(port, "Стар")
+            assert _wait_for(lambda: len(host.players) == 2)
+            _read_legacy(legacy)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: len(host.players) == 3)
+            joined = _read_legacy(legacy)
+            assert [m.type for m in joined] == ["player_joined"]
+            assert joined[0].data["player"]["name"] == "Гост"
+            assert _wait_for(lambda: len(client.players) == 3)
+            guest_id = client.my_id
+            client.close()
+            assert _wait_for(lambda: guest_id not in host.players)
+            left = _read_legacy(legacy)
+            assert [m.type for m in left] == ["player_left"]
+            assert left[0].data == {"player_id": guest_id, "name": "Гост"}
+        finally:
+            if legacy is not None:
+                legacy.close()
+            client.close()
+            host.close()
+
+    def test_resume_after_drop(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        client_questions = []
+        client.on_question_received = client_questions.append
+        question = {"text": "Колко?", "question_number": 1, "correct_answer": 42}
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            old_id = client.my_id
+            assert client.session_token
+            assert host.start_game()
+            assert _wait_for(lambda: client.game_started)
+            host.prefetch_question(1, question)
+            assert _wait_for(lambda: 1 in client.prefetched)
+            assert host.reveal_question(1, lead=0)
+            assert _wait_for(lambda: client_questions, client)
+            host.players[old_id].score = 120
+
+            client.client.connection.socket.shutdown(socket.SHUT_RDWR)
+            assert _wait_for(lambda: client.my_id != old_id and len(client_questions) == 2, client)
+            new_id = client.my_id
+            assert old_id not in host.players
+            assert host.players[new_id].connected
+            assert host.players[new_id].score == 120
+            assert client.players[new_id].score == 120
+            assert 0 < client_questions[1]["time_left"] <= DEFAULT_TIME_LIMIT
+            client.submit_answer("42")
+            assert _wait_for(lambda: host.players[new_id].current_answer == "42")
+        finally:
+            client.close()
+            host.close()
+
+    def test_unknown_session_rejected(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        errors = []
+        client.on_error = errors.append
+        try:
+            assert host.host_game("Хост", port=port)
+            client.host_address = ("127.0.0.1", port)
+            assert client._connect(session="няма-такава")
+            assert _wait_for(lambda: errors, client)
+            assert client.my_id is None
+        finally:
+            client.close()
+            host.close()
+
+    def test_instrumentation_counters(self):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        client = GameLobby(is_host=False)
+        try:
+            assert host.host_game("Хост", port=port)
+            assert client.join_game("Гост", "127.0.0.1", port=port)
+            assert _wait_for(lambda: client.my_id is not None)
+            host._send_pings()
+            assert _wait_for(lambda: host.get_rtt_ms(client.my_id) is not None)
+            peer = host.get_network_stats()[client.my_id]
+            assert peer["by_type"]["join_game"]["messages_in"] == 1
+            assert peer["by_type"]["player_joined"]["messages_out"] >= 1
+            assert peer["rtt"]["count"] == 1
+            assert peer["send_latency"]["count"] >= 1
+
+            client.close()
+            assert _wait_for(lambda: host.server.get_totals()["disconnects"])
+            totals = host.collect_stats()["totals"]
+            assert totals["disconnects"] == {"eof": 1}
+            assert totals["clients"] == 0
+        finally:
+            client.close()
+            host.close()
+
+    def test_spectator_relay(self):
+        from triviador.network.relay import SpectatorRelay
+        from triviador.network.protocol import ROLE_SPECTATOR
+
+        port = _free_port()
+        relay_port = _free_port()
+        host = GameLobby(is_host=True)
+        player = GameLobby(is_host=False)
+        relay = SpectatorRelay(relay_port)
+        watchers = [GameLobby(is_host=False) for _ in range(3)]
+        seen = [[] for _ in watchers]
+        results = []
+        for watcher, questions in zip(watchers, seen):
+            watcher.on_question_received = questions.append
+        watchers[0].on_answer_result = results.append
+        question = {"text": "Колко?", "question_number": 1, "correct_answer": 42}
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            assert player.join_game("Гост", "127.0.0.1", port=port)
+            assert relay.start("127.0.0.1", port)
+            assert _wait_for(lambda: relay.connected and player.my_id is not None)
+            assert len(host.players) == 2
+
+            for watcher in watchers[:2]:
+                assert watcher.join_game("Зрител", "127.0.0.1", relay_port, role=ROLE_SPECTATOR)
+            assert _wait_for(lambda: len(relay.spectators) == 2)
+            assert host.start_game()
+            host.prefetch_question(1, question)
+            assert host.reveal_question(1, lead=0)
+            assert _wait_for(lambda: seen[0] and seen[1], *watchers)
+            assert seen[0][0] == {"text": "Колко?", "question_number": 1}
+
+            # Късен зрител получава текущия въпрос от кеша на релето
+            assert watchers[2].join_game("Зрител", "127.0.0.1", relay_port, role=ROLE_SPECTATOR)
+            assert _wait_for(lambda: seen[2], *watchers)
+            assert watchers[2].game_started
+
+            host.send_answer_results({"correct_answer": 42, "player_results": []})
+            assert _wait_for(lambda: results, *watchers)
+            assert "version" not in results[0]
+            # Хостът изпраща към релето веднъж, независимо от броя зрители
+            assert len(host.server.clients) == 2
+            stats = relay.get_stats()
+            assert stats["spectators"] == 3
+            assert stats["encodes"] == stats["relayed"]
+        finally:
+            for watcher in watchers:
+                watcher.close()
+            relay.stop()
+            player.close()
+            host.close()
@@ -0,0 +1,46 @@
+"""Тестове за prefetch.py — запечатване и разкриване на въпроси."""
+import pytest
+
+from triviador.network.prefetch import (
+    new_round_key, seal_question, open_question, public_question_data,
+)
+from triviador.network.protocol import ProtocolError
+
+
+QUESTION = {
+    "text": "Коя е най-дългата река в света?",
+    "options": ["Нил", "Амазонка", "Дунав", "Яндзъ"],
+    "question_number": 3,
+    "correct_answer": "Нил",
+}
+
+
+class TestSealQuestion:
+
+    def test_roundtrip(self):
+        key = new_round_key()
+        assert open_question(seal_question(QUESTION, key), key) == QUESTION
+
+    def test_blob_hides_text(self):
+        blob = seal_question(QUESTION, new_round_key())
+        assert "Нил" not in blob
+        assert "text" not in blob
+
+    def test_wrong_key_rejected(self):
+        blob = seal_question(QUESTION, new_round_key())
+        with pytest.raises(ProtocolError):
+            open_question(blob, new_round_key())
+
+    def test_keys_are_unique_and_short(self):
+        keys = {new_round_key() for _ in range(50)}
+        assert len(keys) == 50
+        assert all(len(k) <= 16 for k in keys)
+
+
+class TestPublicQuestionData:
+
+    def test_strips_correct_answer(self):
+        public = public_question_data(QUESTION)
+        assert "correct_answer" not in public
+        assert public["text"] == QUESTION["text"]
+        assert "correct_answer" in QUESTION
@@ -0,0 +1,176 @@
+"""Тестове за protocol.py — бинарен кодек, рамкиране, договаряне."""
+import pytest
+
+from triviador.network.protocol import (
+    NetworkMessage, MessageTypes, FrameDecoder, ProtocolError, Compressor, Decompressor,
+    CODEC_JSON, CODEC_BINARY, COMPRESSION_ZLIB, MAX_FRAME_SIZE, encode_message, encode_parts,
+    negotiate_codec, negotiate_compression,
+)
+from triviador.network.stats import NetworkStats
+
+
+def _question_message():
+    return NetworkMessage(
+        type=MessageTypes.QUESTION,
+        data={
+            "text": "Коя е столицата на България?",
+            "options": ["София", "Пловдив", "Варна", "Бургас"],
+            "question_type": "multiple_choice",
+            "difficulty": 2,
+            "correct_answer": "София",
+            "is_special_round": False,
+            "eliminated_players": [],
+        },
+    )
+
+
+# ─── Бинарен кодек ──────────────────────────────────────────────────
+
+class TestBinaryCodec:
+
+    def test_roundtrip(self):
+        original = _question_message()
+        restored = NetworkMessage.from_binary(original.to_binary())
+        assert restored == original
+
+    def test_roundtrip_scalars(self):
+        original = NetworkMessage(
+            type=MessageTypes.ANSWER,
+            data={"answer": "А", "time": 5.3, "n": -42, "big": 2**40, "none": None},
+            sender_id="player1",
+        )
+        restored = NetworkMessage.from_binary(original.to_binary())
+        assert restored.data == original.data
+        assert restored.sender_id == "player1"
+
+    def test_unknown_type_and_key(self):
+        original = NetworkMessage(type="custom", data={"непознат_ключ": [1, {"x": True}]})
+        restored = NetworkMessage.from_binary(original.to_binary())
+        assert restored == original
+
+    def test_smaller_than_json(self):
+        msg = _question_message()
+        assert len(encode_message(msg, CODEC_BINARY)) < len(encode_message(msg, CODEC_JSON))
+
+    def test_parts_match_frame(self):
+        msg = _question_message()
+        header, payload = encode_parts(msg, CODEC_BINARY)
+        assert header + payload == encode_message(msg, CODEC_BINARY)
+        assert bytes(payload) == msg.to_binary()
+        header, payload = encode_parts(msg, CODEC_JSON)
+        assert header == b""
+        assert payload == encode_message(msg, CODEC_JSON)
+
+    def test_truncated_payload(self):
+        payload = _question_message().to_binary()
+        with pytest.raises(ProtocolError):
+            NetworkMessage.from_binary(payload[:-3])
+
+
+# ─── FrameDecoder ───────────────────────────────────────────────────
+
+class TestFrameDecoder:
+
+    def test_coalesced_frames(self):
+        msg = _question_message()
+        data = encode_message(msg, CODEC_BINARY) * 3
+        assert FrameDecoder().feed(data) == [msg, msg, msg]
+
+    def test_partial_frames(self):
+        msg = _question_message()
+        data = encode_message(msg, CODEC_BINARY)
+        decoder = FrameDecoder()
+        received = []
+        for i in range(len(data)):
+            received.extend(decoder.feed(data[i:i + 1]))
+        assert received == [msg]
+
+    def test_legacy_json(self):
+        msg = NetworkMessage(type=MessageTypes.JOIN_GAME, data={"name": "Иван"})
+        assert FrameDecoder().feed(msg.to_json().encode("utf-8")) == [msg]
+
+    def test_legacy_json_split_multibyte(self):
+        msg = NetworkMessage(type=MessageTypes.JOIN_GAME, data={"name": "Иван"})
+        raw = msg.to_json().encode("utf-8")
+        decoder = FrameDecoder()
+        received = []
+        for i in range(len(raw)):
+            received.extend(decoder.feed(raw[i:i + 1]))
+        assert received == [msg]
+
+    def test_mixed_json_then_binary(self):
+        first = NetworkMessage(type=MessageTypes.PLAYER_JOINED, data={"codec": CODEC_BINARY})
+        second = _question_message()
+        data = encode_message(first, CODEC_JSON) + encode_message(second, CODEC_BINARY)
+        assert FrameDecoder().feed(data) == [first, second]
+
+
+# ─── negotiate_codec ────────────────────────────────────────────────
+
+class TestNegotiateCodec:
+
+    def test_prefers_client_order(self):
+        assert negotiate_codec([CODEC_BINARY, CODEC_JSON]) == CODEC_BINARY
+
+    def test_old_client_falls_back_to_json(self):
+        assert negotiate_codec(None) == CODEC_JSON
+
+    def test_unknown_codec(self):
+        assert negotiate_codec(["msgpack"]) == CODEC_JSON
+
+
+# ─── Компресия ──────────────────────────────────────────────────────
+
+class TestCompression:
+
+    def test_roundtrip_across_frames(self):
+        compressor = Compressor(threshold=0)
+        decoder = FrameDecoder()
+        msg = _question_message()
+        for _ in range(5):
+            assert decoder.feed(encode_message(msg, CODEC_BINARY, compressor)) == [msg]
+
+    def test_stateful_stream_shrinks_repeats(self):
+        compressor = Compressor(threshold=0)
+        msg = _question_message()
+        first = encode_message(msg, CODEC_BINARY, compressor)
+        second = encode_message(msg, CODEC_BINARY, compressor)
+        assert len(second) < len(first) < len(encode_message(msg, CODEC_BINARY))
+
+    def test_below_threshold_not_compressed(self):
+        compressor = Compressor(threshold=10_000)
+        msg = _question_message()
+        assert encode_message(msg, CODEC_BINARY, compressor) == encode_message(msg, CODEC_BINARY)
+
+    def test_stats_record_ratio(self):
+        stats = NetworkStats()
+        compressor = Compressor(threshold=0)
+        decoder = FrameDecoder(stats)
+        msg = _question_message()
+        decoder.feed(encode_message(msg, CODEC_BINARY, compressor, stats))
+        snapshot = stats.snapshot()
+        assert snapshot["compressed_messages"] == 1
+        assert 0 < snapshot["compression_ratio"] < 1
+        assert snapshot["compress_us_per_message"] > 0
+        assert snapshot["decompress_us_per_message"] > 0
+
+    def test_corrupted_stream(self):
+        frame = bytearray(encode_message(_question_message(), CODEC_BINARY, Compressor(threshold=0)))
+        frame[-2] ^= 0xFF
+        frame[-5] ^= 0xFF
+        with pytest.raises(ProtocolError):
+            FrameDecoder().feed(bytes(frame))
+
+    def test_decompressed_size_bounded(self):
+        """Малка компресирана рамка не може да се разгъне над MAX_FRAME_SIZE."""
+        compressor = Compressor(threshold=0)
+        assert len(Decompressor().decompress(compressor.compress(bytes(MAX_FRAME_SIZE)))) == MAX_FRAME_SIZE
+        bomb = Compressor(threshold=0).compress(bytes(MAX_FRAME_SIZE + 1))
+        assert len(bomb) < MAX_FRAME_SIZE // 100
+        with pytest.raises(ProtocolError):
+            Decompressor().decompress(bomb)
+
+    def test_negotiation_requires_binary(self):
+        assert negotiate_compression([COMPRESSION_ZLIB], CODEC_BINARY) == COMPRESSION_ZLIB
+        assert negotiate_compression([COMPRESSION_ZLIB], CODEC_JSON) is None
+        assert negotiate_compression(None, CODEC_BINARY) is None
@@ -212,6 +212,11 @@ class TestEndlessMode:
         q = qm_json.get_endless_mode_question(0, exclude_ids=all_ids)
         assert q is None
 
+    def test_custom_bands(self, qm_json):
+        q = qm_json.get_endless_mode_question(600, bands=(100, 200, 300))
+        if q:
+            assert q.difficulty >= 4
+
 
 # ─── Нарастваща трудност ─────────────────────────────────────────────
 
@@ -0,0 +1,148 @@
+"""Тестове за recorder.py — запис и възпроизвеждане на сесии."""
+import pytest
+
+from triviador.network.network import NetworkMessage, GameLobby, GameServer, GameClient
+from triviador.network.protocol import ProtocolError
+from triviador.network.recorder import (
+    SessionRecorder, ReplayDriver, read_session,
+    DIRECTION_IN, DIRECTION_OUT, DIRECTION_HOST, ROLE_HOST, ROLE_CLIENT,
+)
+from tests.test_network import _free_port, _wait_for
+
+
+class TestSessionLog:
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "session.trv"
+        recorder = SessionRecorder(str(path), ROLE_CLIENT)
+        first = NetworkMessage(type="answer", data={"answer": "София", "time": 3.5})
+        second = NetworkMessage(type="custom", data={"x": [1, 2]}, sender_id="p1")
+        recorder.record(DIRECTION_OUT, "127.0.0.1:5555", first)
+        recorder.record(DIRECTION_IN, "127.0.0.1:5555", second)
+        recorder.close()
+        recorder.record(DIRECTION_IN, "x", first)
+
+        role, events = read_session(str(path))
+        assert role == ROLE_CLIENT
+        assert [e.message for e in events] == [first, second]
+        assert [e.direction for e in events] == [DIRECTION_OUT, DIRECTION_IN]
+        assert events[0].conn_id == "127.0.0.1:5555"
+        assert 0 <= events[0].at <= events[1].at
+
+    def test_rejects_foreign_file(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a session")
+        with pytest.raises(ProtocolError):
+            read_session(str(path))
+
+    def test_truncated_log(self, tmp_path):
+        path = tmp_path / "session.trv"
+        recorder = SessionRecorder(str(path))
+        recorder.record(DIRECTION_IN, "c", NetworkMessage(type="answer", data={"answer": "А"}))
+        recorder.close()
+        path.write_bytes(path.read_bytes()[:-2])
+        with pytest.raises(ProtocolError):
+            read_session(str(path))
+
+
+class TestReplay:
+
+    def _record_game(self, path):
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        clients = [GameLobby(is_host=False) for _ in range(2)]
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            host.start_recording(str(path))
+            for i, client in enumerate(clients):
+                assert client.join_game(f"Гост {i}", "127.0.0.1", port=port)
+            assert _wait_for(lambda: len(host.players) == 3, host)
+            assert _wait_for(lambda: all(len(c.players) == 3 for c in clients), *clients)
+            client_id = clients[0].my_id
+        finally:
+            for client in clients:
+                client.close()
+            host.close()
+        return client_id
+
+    def _record_round(self, path):
+        """Записва цял рунд: въпрос, отговори от всички и резултати от хоста."""
+        port = _free_port()
+        host = GameLobby(is_host=True)
+        clients = [GameLobby(is_host=False) for _ in range(2)]
+        try:
+            assert host.host_game("Хост", port=port, announce=False)
+            host.start_recording(str(path))
+            for i, client in enumerate(clients):
+                assert client.join_game(f"Гост {i}", "127.0.0.1", port=port)
+            assert _wait_for(lambda: len(host.players) == 3, host)
+            assert host.start_game()
+            assert _wait_for(lambda: all(c.game_started for c in clients), *clients)
+            host.send_question({"text": "Колко?", "options": ["1", "2"], "question_number": 1,
+                                "correct_answer": "2"})
+            assert _wait_for(lambda: all(c.current_question for c in clients), *clients)
+            clients[0].submit_answer("2")
+            clients[1].submit_answer("1")
+            host.submit_answer("2")
+            assert _wait_for(lambda: host.all_answers_received, host)
+            results = []
+            for player in host.get_players_list():
+                points = 100 if player.current_answer == "2" else 0
+                player.score += points
+                results.append({"player_id": player.id, "name": player.name, "answer": player.current_answer,
+                                "is_correct": points > 0, "points": points, "total_score": player.score})
+            host.send_answer_results({"correct_answer": "2", "player_results": results})
+            scores = {p.name: p.score for p in host.players.values()}
+            host.stop_recording()
+        finally:
+            for client in clients:
+                client.close()
+            host.close()
+        return scores
+
+    def test_host_recording_replays_full_round(self, tmp_path):
+        path = tmp_path / "host.trv"
+        scores = self._record_round(path)
+        assert scores == {"Хост": 100, "Гост 0": 100, "Гост 1": 0}
+        role, events = read_session(str(path))
+        assert role == ROLE_HOST
+        assert {e.message.type for e in events if e.direction == DIRECTION_HOST} >= {
+            "seat", "start_game", "send_question", "answer", "close_round", "send_answer_results"}
+
+        lobby = GameLobby(is_host=True)
+        lobby.server = GameServer()
+        lobby.on_round_complete = lambda round_id: None
+        ReplayDriver(role, events, lobby, speed=0).run()
+        assert lobby.game_started
+        assert lobby.all_answers_received
+        assert {p.name: p.current_answer for p in lobby.players.values()} == {
+            "Хост": "2", "Гост 0": "2", "Гост 1": "1"}
+        assert {p.name: p.score for p in lobby.players.values()} == scores
+        lobby.close()
+
+    def test_client_view_replayed_from_host_recording(self, tmp_path):
+        path = tmp_path / "host.trv"
+        client_id = self._record_game(path)
+        role, events = read_session(str(path))
+
+        lobby = GameLobby(is_host=False)
+        lobby.client = GameClient()
+        ReplayDriver(role, events, lobby, speed=0, conn_id=client_id).run()
+        assert lobby.my_id == client_id
+        assert sorted(p.name for p in lobby.players.values()) == ["Гост 0", "Гост 1", "Хост"]
+
+    def test_real_time_pacing(self, tmp_path):
+        path = tmp_path / "client.trv"
+        recorder = SessionRecorder(str(path), ROLE_CLIENT)
+        recorder.record(DIRECTION_IN, "h", NetworkMessage(type="error", data={"message": "а"}))
+        recorder.last_us -= 50_000
+        recorder.record(DIRECTION_IN, "h", NetworkMessage(type="error", data={"message": "б"}))
+        recorder.close()
+        role, events = read_session(str(path))
+
+        lobby = GameLobby(is_host=False)
+        errors = []
+        lobby.on_error = errors.append
+        report = ReplayDriver(role, events, lobby, speed=1.0).run()
+        assert errors == ["а", "б"]
+        assert report["elapsed"] >= 0.045
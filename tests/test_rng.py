@@ -0,0 +1,74 @@
+"""Тестове за rng.py — възпроизводими случайни потоци на игра."""
+from triviador.core.clock import VirtualClock
+from triviador.core.config import JOKER_5050, JOKER_AUDIENCE
+from triviador.core.models import GameMode
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.rng import GameRandom
+
+
+def _play(seed, mode=GameMode.STANDARD, rounds=10):
+    """Изиграва игра с верни отговори и връща всичко случайно в нея."""
+    logic = GameLogic(clock=VirtualClock())
+    state = logic.start_game(mode, ["Тестов"], seed=seed)
+    trace = []
+    for _ in range(rounds):
+        question = logic.get_current_question()
+        if question is None:
+            break
+        joker = None
+        if not state.is_special_round and question.options:
+            joker_type = JOKER_5050 if state.current_player.has_joker(JOKER_5050) else JOKER_AUDIENCE
+            joker = logic.use_joker(joker_type)
+        trace.append((question.id, state.is_special_round, joker))
+        logic.submit_answer(question.correct_answer)
+        if not logic.next_question():
+            break
+    return trace
+
+
+# ─── Потоци ─────────────────────────────────────────────────────────
+
+class TestGameRandom:
+
+    def test_same_seed_same_streams(self):
+        a, b = GameRandom(42), GameRandom(42)
+        assert [a.questions.random() for _ in range(5)] == [b.questions.random() for _ in range(5)]
+        assert a.jokers.random() == b.jokers.random()
+
+    def test_streams_are_independent(self):
+        rng = GameRandom(42)
+        assert rng.questions.random() != rng.special.random()
+
+    def test_random_seed_when_missing(self):
+        assert GameRandom().seed != GameRandom().seed
+
+
+# ─── Възпроизводимост на игра ───────────────────────────────────────
+
+class TestReproducibleGame:
+
+    def test_seed_reproduces_standard_game(self):
+        assert _play(7) == _play(7)
+
+    def test_seed_reproduces_endless_game(self):
+        assert _play(7, GameMode.ENDLESS) == _play(7, GameMode.ENDLESS)
+
+    def test_different_seeds_differ(self):
+        assert _play(1) != _play(2)
+
+    def test_seed_stored_in_state(self):
+        logic = GameLogic()
+        state = logic.start_game(GameMode.STANDARD, ["Тестов"], seed=99)
+        assert state.seed == 99
+
+    def test_jokers_do_not_shift_questions(self):
+        with_jokers = [question_id for question_id, _, _ in _play(5, GameMode.ENDLESS)]
+        logic = GameLogic(clock=VirtualClock())
+        logic.start_game(GameMode.ENDLESS, ["Тестов"], seed=5)
+        plain = []
+        for _ in range(len(with_jokers)):
+            question = logic.get_current_question()
+            plain.append(question.id)
+            logic.submit_answer(question.correct_answer)
+            logic.next_question()
+        assert plain == with_jokers
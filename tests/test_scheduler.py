@@ -0,0 +1,128 @@
+"""Тестове за scheduler.py — колело с таймери."""
+import threading
+
+from triviador.network.scheduler import TimerWheel
+from triviador.network.network import GameLobby, OnlinePlayer
+
+
+class TestTimerWheel:
+
+    def test_fires_on_due_tick(self):
+        wheel = TimerWheel(tick=0.01, slots=8)
+        fired = []
+        wheel.schedule(0.03, fired.append, "a")
+        wheel.advance()
+        wheel.advance()
+        assert fired == []
+        wheel.advance()
+        assert fired == ["a"]
+        assert wheel.pending == 0
+
+    def test_delay_longer_than_revolution(self):
+        wheel = TimerWheel(tick=0.01, slots=4)
+        fired = []
+        wheel.schedule(0.1, fired.append, "late")
+        wheel.schedule(0.02, fired.append, "early")
+        for _ in range(9):
+            wheel.advance()
+        assert fired == ["early"]
+        wheel.advance()
+        assert fired == ["early", "late"]
+
+    def test_zero_delay_fires_next_tick(self):
+        wheel = TimerWheel(tick=0.01, slots=4)
+        fired = []
+        wheel.schedule(0, fired.append, 1)
+        wheel.advance()
+        assert fired == [1]
+
+    def test_cancel(self):
+        wheel = TimerWheel(tick=0.01, slots=8)
+        fired = []
+        handle = wheel.schedule(0.02, fired.append, "x")
+        handle.cancel()
+        handle.cancel()
+        assert wheel.pending == 0
+        for _ in range(4):
+            wheel.advance()
+        assert fired == []
+
+    def test_many_timers(self):
+        wheel = TimerWheel(tick=0.01, slots=64)
+        handles = [wheel.schedule(i * 0.01, lambda: None) for i in range(5000)]
+        assert wheel.pending == 5000
+        for handle in handles[::2]:
+            handle.cancel()
+        assert wheel.pending == 2500
+        for _ in range(5000):
+            wheel.advance()
+        assert wheel.pending == 0
+        assert wheel.fired == 2500
+
+    def test_callback_error_does_not_stop_wheel(self):
+        wheel = TimerWheel(tick=0.01, slots=4)
+        fired = []
+        wheel.schedule(0.01, lambda: 1 / 0)
+        wheel.schedule(0.01, fired.append, "ok")
+        wheel.advance()
+        assert fired == ["ok"]
+
+    def test_running_wheel(self):
+        wheel = TimerWheel(tick=0.005)
+        done = threading.Event()
+        wheel.start()
+        wheel.schedule(0.02, done.set)
+        assert done.wait(1.0)
+        wheel.stop()
+
+
+class TestLobbyTimers:
+
+    def test_call_later_dispatched_by_pump(self):
+        lobby = GameLobby(is_host=True)
+        lobby.scheduler = TimerWheel(tick=0.01, slots=8)
+        fired = []
+        lobby.call_later(0.01, fired.append, "старт")
+        lobby.scheduler.advance()
+        assert fired == []
+        lobby.pump()
+        assert fired == ["старт"]
+
+    def test_closed_lobby_drops_timer(self):
+        lobby = GameLobby(is_host=True)
+        lobby.scheduler = TimerWheel(tick=0.01, slots=8)
+        lobby.call_later(0.01, lambda: None)
+        lobby.close()
+        lobby.scheduler.advance()
+        assert lobby.pump() == 0
+
+    def test_idle_lobby_closed(self):
+        lobby = GameLobby(is_host=True)
+        lobby.scheduler = TimerWheel(tick=0.01, slots=8)
+        errors = []
+        lobby.on_error = errors.append
+        lobby._touch_lobby()
+        assert lobby.scheduler.pending == 1
+        lobby._touch_lobby()
+        assert lobby.scheduler.pending == 1
+        lobby._on_lobby_idle()
+        lobby.pump()
+        assert lobby.closing
+        assert len(errors) == 1
+
+    def test_seated_players_keep_lobby_open(self):
+        lobby = GameLobby(is_host=True)
+        lobby.scheduler = TimerWheel(tick=0.01, slots=8)
+        lobby.players["host"] = OnlinePlayer(id="host", name="Хост")
+        lobby.players["p1"] = OnlinePlayer(id="p1", name="Гост")
+        lobby._on_lobby_idle()
+        lobby.pump()
+        assert not lobby.closing
+        assert lobby.scheduler.pending == 1
+
+    def test_started_game_has_no_idle_timer(self):
+        lobby = GameLobby(is_host=True)
+        lobby.scheduler = TimerWheel(tick=0.01, slots=8)
+        lobby.game_started = True
+        lobby._touch_lobby()
+        assert lobby.scheduler.pending == 0
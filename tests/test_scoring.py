@@ -0,0 +1,93 @@
+"""Тестове за scoring.py — общото ядро за точкуване."""
+import itertools
+
+import pytest
+
+from triviador.core.config import (
+    BASE_POINTS, TIME_BONUS_MULTIPLIER, DIFFICULTY_MULTIPLIER,
+    SPECIAL_ROUND_MULTIPLIER, DEFAULT_TIME_LIMIT,
+)
+from triviador.logic import scoring
+from triviador.logic.scoring import ScoringRules, DEFAULT_RULES, score_points
+
+
+def _reference_points(is_correct, remaining_time, difficulty, is_special):
+    """Формулата от GameLogic.calculate_points преди обединяването."""
+    if not is_correct:
+        return 0
+    points = BASE_POINTS
+    points += int(remaining_time * TIME_BONUS_MULTIPLIER)
+    points += int(points * (difficulty - 1) * (DIFFICULTY_MULTIPLIER - 1))
+    if is_special:
+        points = int(points * SPECIAL_ROUND_MULTIPLIER)
+    return points
+
+
+def _reference_online(is_correct, answer_time, difficulty, is_special):
+    """Формулата от OnlineGameScreen._calculate_and_send_results преди обединяването."""
+    points = 0
+    if is_correct:
+        points = BASE_POINTS
+        remaining_time = DEFAULT_TIME_LIMIT - answer_time
+        if remaining_time > 0:
+            points += int(remaining_time * TIME_BONUS_MULTIPLIER)
+        points += int(points * (difficulty - 1) * (DIFFICULTY_MULTIPLIER - 1))
+    if is_special and is_correct:
+        points = int(points * SPECIAL_ROUND_MULTIPLIER)
+    return points
+
+
+TIMES = [0.0, 0.01, 0.37, 1.5, 7.99, 10.0, 13.333, 19.9, 20.0]
+GRID = list(itertools.product([True, False], TIMES, range(1, 6), [True, False]))
+
+
+def _columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+
+# ─── Еквивалентност ─────────────────────────────────────────────────
+
+class TestEquivalence:
+
+    def test_python_matches_game_logic_formula(self):
+        expected = [_reference_points(*row) for row in GRID]
+        assert scoring._score_python(*_columns(GRID), DEFAULT_RULES) == expected
+
+    def test_matches_online_formula(self):
+        answer_times = [DEFAULT_TIME_LIMIT - t for t in TIMES] + [DEFAULT_TIME_LIMIT + 3.0]
+        rows = list(itertools.product([True, False], answer_times, range(1, 6), [True, False]))
+        correct, times, levels, special = _columns(rows)
+        remaining = [DEFAULT_TIME_LIMIT - t for t in times]
+        expected = [_reference_online(*row) for row in rows]
+        assert score_points(correct, remaining, levels, special) == expected
+
+    def test_numpy_matches_python(self):
+        pytest.importorskip("numpy")
+        rows = GRID * 3
+        rules = ScoringRules(base_points=120, time_bonus_multiplier=4.5, difficulty_multiplier=1.3,
+                             special_round_multiplier=2.5)
+        expected = scoring._score_python(*_columns(rows), rules)
+        assert scoring._score_numpy(*_columns(rows), rules).tolist() == expected
+
+
+# ─── Интерфейс ──────────────────────────────────────────────────────
+
+class TestScorePoints:
+
+    def test_small_batch_uses_fallback(self, monkeypatch):
+        monkeypatch.setattr(scoring, "np", None)
+        assert score_points([True, False], [10.0, 10.0], [1, 5], [False, True]) == [150, 0]
+
+    def test_negative_remaining_gets_no_bonus(self):
+        assert score_points([True], [-4.0], [1], [False]) == [BASE_POINTS]
+
+    def test_custom_rules(self):
+        rules = ScoringRules(base_points=10, time_bonus_multiplier=0)
+        assert score_points([True], [15.0], [1], [True], rules) == [10 * SPECIAL_ROUND_MULTIPLIER]
+
+    def test_length_mismatch(self):
+        with pytest.raises(ValueError):
+            score_points([True, True], [1.0], [1], [False])
+
+    def test_empty(self):
+        assert score_points([], [], [], []) == []
@@ -0,0 +1,238 @@
+"""Тестове за sessions.py — много леки едновременни игри."""
+import random
+import tracemalloc
+from unittest.mock import MagicMock
+
+import pytest
+
+from triviador.core.clock import VirtualClock
+from triviador.core.config import JOKER_5050, JOKER_AUDIENCE, JOKERS_PER_GAME, QUESTIONS_PER_GAME
+from triviador.core.models import GameMode
+from triviador.logic.question_manager import QuestionManager
+from triviador.logic.sessions import SessionManager
+
+
+@pytest.fixture(scope="module")
+def question_manager():
+    return QuestionManager()
+
+
+def _manager(question_manager, clock=None, **kwargs):
+    return SessionManager(question_manager, MagicMock(), clock=clock or VirtualClock(), **kwargs)
+
+
+def _play(manager, session, answers_correct=True):
+    """Изиграва сесия до края, като отговаря вярно или грешно."""
+    while True:
+        question = manager.current_question(session)
+        answer = question.correct_answer if answers_correct else "__грешно__"
+        manager.submit_answer(session.session_id, answer)
+        if not manager.next_question(session.session_id):
+            return
+
+
+# ─── QuestionBank ───────────────────────────────────────────────────
+
+class TestQuestionBank:
+
+    def test_pool_filters(self, question_manager):
+        bank = question_manager.freeze()
+        category = bank.categories[0]
+        pool = bank.pool((2, 3), [category])
+        assert pool
+        assert all(q.category == category and 2 <= q.difficulty <= 3 for q in pool)
+
+    def test_pool_excludes(self, question_manager):
+        bank = question_manager.freeze()
+        full = bank.pool((1, 5))
+        excluded = {q.id for q in full[:5]}
+        assert len(bank.pool((1, 5), exclude_ids=excluded)) == len(full) - 5
+
+    def test_increasing_difficulty(self, question_manager):
+        bank = question_manager.freeze()
+        questions = bank.increasing_difficulty(10, None, random.Random(1))
+        assert len(questions) == 10
+        assert [q.difficulty for q in questions] == sorted(q.difficulty for q in questions)
+
+    def test_endless_respects_bands(self, question_manager):
+        bank = question_manager.freeze()
+        question = bank.endless(0, None, set(), random.Random(1), (500, 1500, 3000))
+        assert question.difficulty in (1, 2)
+        question = bank.endless(5000, None, set(), random.Random(1), (500, 1500, 3000))
+        assert question.difficulty in (4, 5)
+
+
+# ─── Жизнен цикъл ───────────────────────────────────────────────────
+
+class TestLifecycle:
+
+    def test_standard_game(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.STANDARD, ["Иван"], seed=7)
+        assert len(session.question_ids) == QUESTIONS_PER_GAME
+        _play(manager, session)
+        assert session.game_over
+        player = session.players[0]
+        assert player.correct_answers == player.total_answers == QUESTIONS_PER_GAME
+        assert player.score > 0
+
+        results = manager.end(session.session_id)
+        assert results["players"][0]["score"] == player.score
+        assert manager.highscore_manager.add_score.called
+        assert len(manager) == 0
+
+    def test_endless_ends_on_wrong_answer(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.ENDLESS, ["Иван"], seed=7)
+        result = manager.submit_answer(session.session_id, "__грешно__")
+        assert result["game_over"]
+        assert not manager.next_question(session.session_id)
+
+    def test_endless_draws_more_questions(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.ENDLESS, ["Иван"], seed=7)
+        for _ in range(5):
+            manager.submit_answer(session.session_id, manager.current_question(session).correct_answer)
+            assert manager.next_question(session.session_id)
+        assert len(set(session.question_ids)) == 6
+
+    def test_double_answer_rejected(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.STANDARD, ["Иван"], seed=7)
+        manager.submit_answer(session.session_id, "x")
+        assert "error" in manager.submit_answer(session.session_id, "x")
+
+    def test_unknown_session(self, question_manager):
+        manager = _manager(question_manager)
+        assert "error" in manager.submit_answer(999, "x")
+        assert "error" in manager.end(999)
+        assert not manager.next_question(999)
+
+    def test_end_without_record(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.STANDARD, ["Иван"], seed=7)
+        manager.end(session.session_id, record=False)
+        assert not manager.highscore_manager.add_score.called
+
+    def test_categories_interned(self, question_manager):
+        manager = _manager(question_manager)
+        category = manager.bank.categories[0]
+        a = manager.create(GameMode.STANDARD, ["А"], [category], seed=1)
+        b = manager.create(GameMode.STANDARD, ["Б"], [category], seed=2)
+        assert a.categories is b.categories
+        assert all(manager.bank.by_id[qid].category == category for qid in a.question_ids)
+
+
+# ─── Детерминизъм ───────────────────────────────────────────────────
+
+class TestDeterminism:
+
+    def test_same_seed_same_game(self, question_manager):
+        first = _manager(question_manager).create(GameMode.STANDARD, ["Иван"], seed=42)
+        second = _manager(question_manager).create(GameMode.STANDARD, ["Иван"], seed=42)
+        assert first.question_ids == second.question_ids
+        assert first.is_special_round == second.is_special_round
+
+    def test_interleaving_does_not_matter(self, question_manager):
+        """Редът на обработка на другите сесии не влияе на дадена сесия."""
+        alone = _manager(question_manager)
+        session = alone.create(GameMode.ENDLESS, ["Иван"], seed=42)
+        _play(alone, session)
+
+        crowded = _manager(question_manager)
+        others = [crowded.create(GameMode.ENDLESS, ["Друг"], seed=s) for s in range(20)]
+        target = crowded.create(GameMode.ENDLESS, ["Иван"], seed=42)
+        for other in others:
+            crowded.submit_answer(other.session_id, crowded.current_question(other).correct_answer)
+            crowded.next_question(other.session_id)
+        _play(crowded, target)
+
+        assert target.question_ids == session.question_ids
+
+
+# ─── Жокери ─────────────────────────────────────────────────────────
+
+class TestJokers:
+
+    def _regular_session(self, manager):
+        for seed in range(100):
+            session = manager.create(GameMode.STANDARD, ["Иван"], seed=seed)
+            if not session.is_special_round:
+                return session
+        pytest.fail("Няма сесия без специален рунд")
+
+    def test_5050(self, question_manager):
+        manager = _manager(question_manager)
+        session = self._regular_session(manager)
+        result = manager.use_joker(session.session_id, JOKER_5050)
+        assert result["type"] == "5050"
+        assert session.current_player.joker_count(JOKER_5050) == JOKERS_PER_GAME[JOKER_5050] - 1
+        for _ in range(JOKERS_PER_GAME[JOKER_5050] - 1):
+            manager.use_joker(session.session_id, JOKER_5050)
+        assert "error" in manager.use_joker(session.session_id, JOKER_5050)
+
+    def test_audience(self, question_manager):
+        manager = _manager(question_manager)
+        session = self._regular_session(manager)
+        result = manager.use_joker(session.session_id, JOKER_AUDIENCE)
+        assert result["type"] == "audience"
+        assert session.current_player.joker_count(JOKER_AUDIENCE) == JOKERS_PER_GAME[JOKER_AUDIENCE] - 1
+
+    def test_blocked_in_special_round(self, question_manager):
+        manager = _manager(question_manager)
+        session = manager.create(GameMode.STANDARD, ["Иван"], seed=1)
+        session.is_special_round = True
+        assert "error" in manager.use_joker(session.session_id, JOKER_5050)
+        assert session.current_player.joker_count(JOKER_5050) == JOKERS_PER_GAME[JOKER_5050]
+
+
+# ─── Изтичане ───────────────────────────────────────────────────────
+
+class TestExpiry:
+
+    def test_idle_sessions_expire(self, question_manager):
+        clock = VirtualClock()
+        manager = _manager(question_manager, clock, idle_timeout=60)
+        stale = manager.create(GameMode.STANDARD, ["А"], seed=1)
+        active = manager.create(GameMode.STANDARD, ["Б"], seed=2)
+        clock.advance(50)
+        manager.submit_answer(active.session_id, "x")
+        clock.advance(20)
+
+        assert manager.expire() == [stale.session_id]
+        assert manager.get(active.session_id) is active
+        assert manager.get_stats()["expired"] == 1
+
+    def test_touch_reorders(self, question_manager):
+        clock = VirtualClock()
+        manager = _manager(question_manager, clock, idle_timeout=60)
+        first = manager.create(GameMode.STANDARD, ["А"], seed=1)
+        manager.create(GameMode.STANDARD, ["Б"], seed=2)
+        manager.next_question(first.session_id)
+        assert list(manager.sessions)[-1] == first.session_id
+
+    def test_many_sessions(self, question_manager):
+        clock = VirtualClock()
+        manager = _manager(question_manager, clock, idle_timeout=60)
+        for seed in range(2000):
+            manager.create(GameMode.STANDARD, ["Иван"], seed=seed)
+        clock.advance(61)
+        assert len(manager.expire()) == 2000
+        assert len(manager) == 0
+
+
+# ─── Памет ──────────────────────────────────────────────────────────
+
+class TestMemory:
+
+    def test_idle_session_footprint(self, question_manager):
+        manager = _manager(question_manager)
+        manager.create(GameMode.STANDARD, ["Иван"], seed=0)
+        count = 2000
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for seed in range(1, count + 1):
+            manager.create(GameMode.STANDARD, ["Иван"], seed=seed)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert (after - before) / count < 1000
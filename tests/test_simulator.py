@@ -0,0 +1,68 @@
+"""Тестове за simulator.py — симулация на игри по метода Монте Карло."""
+from dataclasses import replace
+
+from triviador.core.config import QUESTIONS_PER_GAME
+from triviador.core.models import GameMode
+from triviador.logic.scoring import DEFAULT_RULES
+from triviador.logic.simulator import (
+    PlayerModel, PLAYER_MODELS, JOKER_POLICY_NEVER, run_simulation, sweep,
+)
+
+
+PERFECT = PlayerModel("perfect", (1.0,) * 5, 10.0, 0.0, JOKER_POLICY_NEVER)
+NO_SPECIAL = replace(DEFAULT_RULES, special_round_chance=0.0)
+
+
+# ─── Симулация ──────────────────────────────────────────────────────
+
+class TestSimulation:
+
+    def test_perfect_player_standard(self):
+        report = run_simulation(20, model=PERFECT, rules=NO_SPECIAL)
+        assert report.games == 20
+        assert report.accuracy == 100.0
+        assert report.answered == 20 * QUESTIONS_PER_GAME
+        assert report.special_rounds == 0
+        assert report.stdev_score == 0.0
+
+    def test_rules_change_scores(self):
+        base = run_simulation(20, model=PERFECT, rules=NO_SPECIAL)
+        doubled = run_simulation(20, model=PERFECT, rules=replace(NO_SPECIAL, base_points=200))
+        assert doubled.mean_score > base.mean_score
+
+    def test_deterministic_for_seed(self):
+        first = run_simulation(200, seed=7, chunk_size=50)
+        second = run_simulation(200, seed=7, chunk_size=50)
+        assert first.scores == second.scores
+
+    def test_process_pool_matches_inline(self):
+        inline = run_simulation(200, seed=3, chunk_size=50)
+        pooled = run_simulation(200, seed=3, chunk_size=50, workers=2)
+        assert pooled.scores == inline.scores
+        assert pooled.games == 200
+
+    def test_histogram_counts_all_games(self):
+        report = run_simulation(100)
+        assert sum(count for _, count in report.histogram(250)) == 100
+        assert report.percentile(10) <= report.percentile(50) <= report.percentile(90)
+
+
+# ─── Безкраен режим ─────────────────────────────────────────────────
+
+class TestSurvival:
+
+    def test_curve_is_decreasing(self):
+        report = run_simulation(200, mode=GameMode.ENDLESS)
+        curve = report.survival_curve()
+        assert curve[0] == 1.0
+        assert all(a >= b for a, b in zip(curve, curve[1:]))
+
+    def test_expert_survives_longer(self):
+        novice = run_simulation(200, mode=GameMode.ENDLESS, model=PLAYER_MODELS["novice"])
+        expert = run_simulation(200, mode=GameMode.ENDLESS, model=PLAYER_MODELS["expert"])
+        assert sum(expert.survival_curve()) > sum(novice.survival_curve())
+
+    def test_sweep_bands(self):
+        results = sweep("endless_bands", [(500, 1500, 3000), (100, 200, 300)], 50, mode=GameMode.ENDLESS)
+        assert [value for value, _ in results] == [(500, 1500, 3000), (100, 200, 300)]
+        assert all(report.games == 50 for _, report in results)
@@ -0,0 +1,198 @@
+"""Тестове за snapshot.py — моментни снимки на игра."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from triviador.core.clock import VirtualClock
+from triviador.core.config import DEFAULT_TIME_LIMIT, QUESTIONS_PER_GAME
+from triviador.core.models import GameMode
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.snapshot import (
+    GameSnapshot, PlayerSnapshot, SnapshotJournal, encode_snapshot, decode_snapshot, load_latest,
+)
+from triviador.network.network import GameLobby, OnlinePlayer
+
+
+def _snapshot(**overrides):
+    data = dict(
+        mode=GameMode.ENDLESS,
+        question_ids=[3, 1, 7],
+        players=[PlayerSnapshot("Иван", 1234, 5, 6, {"50_50": 1, "audience": 0})],
+        question_index=2,
+        remaining_time=12.345,
+        is_special_round=True,
+        seed=2 ** 62,
+        categories=["Наука", "История"],
+        used_question_ids=[1, 3, 7],
+    )
+    data.update(overrides)
+    return GameSnapshot(**data)
+
+
+def _logic(clock=None):
+    return GameLogic(highscore_manager=MagicMock(), clock=clock or VirtualClock())
+
+
+# ─── Формат ─────────────────────────────────────────────────────────
+
+class TestFormat:
+
+    def test_roundtrip(self):
+        snapshot = _snapshot()
+        assert decode_snapshot(encode_snapshot(snapshot)) == snapshot
+
+    def test_without_seed(self):
+        assert decode_snapshot(encode_snapshot(_snapshot(seed=None))).seed is None
+
+    def test_compact(self):
+        assert len(encode_snapshot(_snapshot(question_ids=list(range(10))))) < 200
+
+    def test_bad_magic(self):
+        with pytest.raises(ValueError):
+            decode_snapshot(b"XXXXX" + encode_snapshot(_snapshot())[5:])
+
+    def test_truncated(self):
+        with pytest.raises(ValueError):
+            decode_snapshot(encode_snapshot(_snapshot())[:-3])
+
+
+# ─── Журнал ─────────────────────────────────────────────────────────
+
+class TestJournal:
+
+    def test_latest_frame_wins(self, tmp_path):
+        path = tmp_path / "s.snap"
+        journal = SnapshotJournal(path)
+        for i in range(5):
+            journal.append(bytes([i]) * 10)
+        journal.close()
+        assert load_latest(path) == bytes([4]) * 10
+
+    def test_torn_tail_ignored(self, tmp_path):
+        path = tmp_path / "s.snap"
+        journal = SnapshotJournal(path)
+        journal.append(b"first")
+        journal.append(b"second")
+        journal.close()
+        data = path.read_bytes()
+        path.write_bytes(data[:-2])
+        assert load_latest(path) == b"first"
+
+    def test_compaction_bounds_size(self, tmp_path):
+        path = tmp_path / "s.snap"
+        journal = SnapshotJournal(path, compact_every=4)
+        for i in range(100):
+            journal.append(b"x" * 20 + bytes([i]))
+        journal.close()
+        assert path.stat().st_size <= 4 * 29
+        assert load_latest(path)[-1] == 99
+
+    def test_missing_file(self, tmp_path):
+        assert load_latest(tmp_path / "none.snap") is None
+
+
+# ─── GameLogic ──────────────────────────────────────────────────────
+
+class TestGameLogicRestore:
+
+    def _play(self, tmp_path, answers=3):
+        clock = VirtualClock()
+        logic = _logic(clock)
+        logic.attach_journal(SnapshotJournal(tmp_path / "s.snap"))
+        logic.start_game(GameMode.STANDARD, ["Иван"], seed=11)
+        for _ in range(answers):
+            clock.advance(2.0)
+            logic.submit_answer(logic.get_current_question().correct_answer)
+            logic.next_question()
+        logic.use_joker("audience")
+        clock.advance(6.0)
+        return logic
+
+    def test_restore_after_crash(self, tmp_path):
+        logic = self._play(tmp_path)
+        restored = _logic()
+        state = restored.restore(decode_snapshot(load_latest(tmp_path / "s.snap")))
+        player = state.current_player
+        assert player.score == logic.game_state.current_player.score
+        assert player.jokers == logic.game_state.current_player.jokers
+        assert [q.id for q in state.questions] == [q.id for q in logic.game_state.questions]
+        assert state.current_question_index == 3
+        assert state.seed == 11
+        assert restored.get_remaining_time() == DEFAULT_TIME_LIMIT
+
+    def test_restore_keeps_random_streams(self):
+        """Възстановената игра продължава със същите специални рундове и жокери."""
+        def play(logic, rounds):
+            trace = []
+            for _ in range(rounds):
+                state = logic.game_state
+                question = logic.get_current_question()
+                joker = None
+                if state.current_question_index >= 4 and not state.is_special_round and question.options:
+                    joker = logic.use_joker("audience").get("votes")
+                trace.append((state.is_special_round, joker))
+                logic.submit_answer(question.correct_answer)
+                logic.next_question()
+            return trace
+
+        full = _logic()
+        full.start_game(GameMode.STANDARD, ["Иван"], seed=7)
+        expected = play(full, QUESTIONS_PER_GAME)
+
+        logic = _logic()
+        logic.start_game(GameMode.STANDARD, ["Иван"], seed=7)
+        trace = play(logic, 4)
+        restored = _logic()
+        restored.restore(logic.snapshot())
+        trace += play(restored, QUESTIONS_PER_GAME - 4)
+        assert trace == expected
+        assert any(joker for _, joker in expected)
+
+    def test_remaining_time_preserved(self, tmp_path):
+        clock = VirtualClock()
+        logic = _logic(clock)
+        logic.start_game(GameMode.STANDARD, ["Иван"])
+        clock.advance(8.0)
+        restored = _logic()
+        restored.restore(logic.snapshot())
+        assert restored.get_remaining_time() == DEFAULT_TIME_LIMIT - 8.0
+
+    def test_answered_question_is_skipped(self, tmp_path):
+        logic = _logic()
+        logic.start_game(GameMode.STANDARD, ["Иван"])
+        logic.submit_answer(logic.get_current_question().correct_answer)
+        restored = _logic()
+        state = restored.restore(logic.snapshot())
+        assert state.current_question_index == 1
+        assert state.current_player.total_answers == 1
+
+    def test_end_game_clears_journal(self, tmp_path):
+        logic = self._play(tmp_path, answers=1)
+        logic.end_game()
+        assert load_latest(tmp_path / "s.snap") is None
+
+
+# ─── Миграция на онлайн игра ────────────────────────────────────────
+
+class TestLobbyMigration:
+
+    def test_players_survive_migration(self):
+        old = GameLobby(is_host=True)
+        old.players["host"] = OnlinePlayer(id="host", name="Хост", score=300)
+        old.players["c1"] = OnlinePlayer(id="c1", name="А", score=150)
+        old.sessions["token-1"] = "c1"
+        old.eliminated = {"А"}
+        old.players["c1"].use_joker("50_50")
+        data = encode_snapshot(_snapshot(players=old.snapshot_players()))
+
+        new = GameLobby(is_host=True)
+        new.restore_players(decode_snapshot(data).players)
+        assert new.game_started
+        assert new.sessions == {"token-1": "c1"}
+        assert new.players["c1"].score == 150
+        assert new.players["c1"].connected is False
+        assert new.players["c1"].jokers == old.players["c1"].jokers
+        assert new.players["host"].connected is True
+        assert new.eliminated == {"А"}
+        old.close()
+        new.close()
@@ -0,0 +1,122 @@
+"""Тестове за stats.py — броячи, хистограми и експорт на статистика."""
+import json
+import socket
+
+import pytest
+
+from triviador.network.protocol import NetworkMessage, FrameDecoder, encode_message, CODEC_BINARY
+from triviador.network.stats import LatencyHistogram, NetworkStats, StatsDumper, StatsSocket
+
+
+# ─── LatencyHistogram ───────────────────────────────────────────────
+
+class TestLatencyHistogram:
+
+    def test_empty(self):
+        hist = LatencyHistogram()
+        assert hist.percentile(99) == 0.0
+        assert hist.snapshot()["count"] == 0
+
+    def test_buckets_and_percentiles(self):
+        hist = LatencyHistogram()
+        for _ in range(90):
+            hist.record(0.0008)
+        for _ in range(10):
+            hist.record(0.040)
+        snap = hist.snapshot()
+        assert snap["count"] == 100
+        assert snap["buckets"]["<=1"] == 90
+        assert snap["buckets"]["<=50"] == 10
+        assert snap["p50_ms"] == 1
+        assert snap["p99_ms"] == 40.0
+        assert snap["max_ms"] == pytest.approx(40.0)
+
+    def test_overflow_bucket(self):
+        hist = LatencyHistogram()
+        hist.record(3.0)
+        assert hist.snapshot()["buckets"][">1000"] == 1
+        assert hist.percentile(50) == pytest.approx(3000.0)
+
+    def test_merge(self):
+        a, b = LatencyHistogram(), LatencyHistogram()
+        a.record(0.001)
+        b.record(0.002)
+        a.merge(b)
+        assert a.count == 2
+        assert a.max == pytest.approx(2.0)
+
+
+# ─── NetworkStats ───────────────────────────────────────────────────
+
+class TestNetworkStats:
+
+    def test_per_type_counters_in(self):
+        stats = NetworkStats()
+        decoder = FrameDecoder(stats)
+        frame = encode_message(NetworkMessage(type="answer", data={"answer": "А"}), CODEC_BINARY)
+        legacy = NetworkMessage(type="ping", data={}).to_json().encode("utf-8")
+        decoder.feed(frame + legacy)
+        snap = stats.snapshot()["by_type"]
+        assert snap["answer"]["messages_in"] == 1
+        assert snap["answer"]["bytes_in"] == len(frame)
+        assert snap["ping"]["bytes_in"] == len(legacy)
+
+    def test_per_type_counters_out_and_latency(self):
+        stats = NetworkStats()
+        stats.record_sent(120, "question", 0.0005)
+        stats.record_sent(30, "answer_result", 0.002)
+        snap = stats.snapshot()
+        assert snap["by_type"]["question"]["bytes_out"] == 120
+        assert snap["send_latency"]["count"] == 2
+
+    def test_pending_sends(self):
+        stats = NetworkStats()
+        stats.send_started()
+        stats.send_started()
+        stats.send_finished()
+        snap = stats.snapshot()
+        assert snap["pending_sends"] == 1
+        assert snap["max_pending_sends"] == 2
+
+    def test_merge_new_fields(self):
+        a, b = NetworkStats(), NetworkStats()
+        b.record_sent(10, "answer", 0.001)
+        b.record_decode_error()
+        b.record_disconnect("eof")
+        b.record_rtt(0.02)
+        a.record_disconnect("eof")
+        a.merge(b)
+        snap = a.snapshot()
+        assert snap["by_type"]["answer"]["messages_out"] == 1
+        assert snap["decode_errors"] == 1
+        assert snap["disconnects"] == {"eof": 2}
+        assert snap["rtt"]["count"] == 1
+
+
+# ─── Експорт ────────────────────────────────────────────────────────
+
+class TestExport:
+
+    def test_dumper_writes_json_lines(self, tmp_path):
+        path = tmp_path / "stats.jsonl"
+        dumper = StatsDumper(lambda: {"x": 1}, str(path), interval=60)
+        dumper.dump_once()
+        dumper.dump_once()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["stats"] == {"x": 1}
+
+    def test_stats_socket(self):
+        stats_socket = StatsSocket(lambda: {"клиенти": 3}, 0)
+        assert stats_socket.start()
+        try:
+            with socket.create_connection(("127.0.0.1", stats_socket.port), timeout=2) as s:
+                data = b""
+                while not data.endswith(b"\n"):
+                    chunk = s.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+            assert json.loads(data)["stats"] == {"клиенти": 3}
+        finally:
+            stats_socket.stop()
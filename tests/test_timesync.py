@@ -0,0 +1,42 @@
+"""Тестове за timesync.py — RTT и отместване на часовника."""
+import pytest
+
+from triviador.network.timesync import LinkEstimator
+
+
+class TestLinkEstimator:
+
+    def test_first_sample(self):
+        link = LinkEstimator()
+        # Клиентът е 5 секунди напред, RTT = 100 ms
+        assert link.add_sample(sent_at=10.0, peer_time=15.05, received_at=10.1)
+        assert link.srtt == pytest.approx(0.1)
+        assert link.offset == pytest.approx(5.0)
+        assert link.synced
+
+    def test_negative_rtt_ignored(self):
+        link = LinkEstimator()
+        assert link.add_sample(10.0, 10.0, 9.0) is False
+        assert not link.synced
+
+    def test_smoothing(self):
+        link = LinkEstimator()
+        link.add_sample(0.0, 0.05, 0.1)
+        for i in range(1, 50):
+            link.add_sample(float(i), i + 0.025, i + 0.05)
+        assert link.srtt == pytest.approx(0.05, abs=0.005)
+        assert link.offset == pytest.approx(0.0, abs=0.005)
+
+    def test_clock_conversion(self):
+        link = LinkEstimator()
+        link.add_sample(100.0, 200.01, 100.02)
+        assert link.to_peer(100.5) == pytest.approx(200.5)
+        assert link.to_local(200.5) == pytest.approx(100.5)
+
+    def test_snapshot_in_ms(self):
+        link = LinkEstimator()
+        assert link.snapshot()["rtt_ms"] is None
+        link.add_sample(0.0, 0.02, 0.04)
+        snap = link.snapshot()
+        assert snap["rtt_ms"] == pytest.approx(40.0)
+        assert snap["samples"] == 1
@@ -4,8 +4,17 @@ import pygame
 import sys
 from typing import Optional
 
-from triviador.core.config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, WHITE
+from triviador.core.config import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, FPS, WHITE, SNAPSHOT_FILE, CALIBRATION_FILE, EVENTS_FILE,
+)
+from triviador.logic.audience import AudienceModel
+from triviador.logic.calibration import Calibrator
+from triviador.logic.events import (
+    AnalyticsWriter, EventLog, persist_calibration, persist_highscores, write_journal,
+)
 from triviador.logic.game_logic import GameLogic
+from triviador.logic.question_manager import BASE_DIR, QuestionManager
+from triviador.logic.snapshot import SnapshotJournal, decode_snapshot, load_latest
 from triviador.ui.screens import (
     Screen, MainMenuScreen, GameSetupScreen,
     GameScreen, GameOverScreen, HighScoresScreen,
@@ -25,11 +34,51 @@ class TriviadorGame:
         self.clock = pygame.time.Clock()
         self.running = True
 
-        self.game_logic = GameLogic()
+        self.events = EventLog()
+        self.online_events = EventLog(source="online")
+        calibrator = Calibrator.load(BASE_DIR / CALIBRATION_FILE)
+        question_manager = QuestionManager()
+        self.audience = AudienceModel.from_calibration(calibrator, question_manager.questions)
+        self.game_logic = GameLogic(
+            question_manager=question_manager, calibrator=calibrator, events=self.events,
+            audience=self.audience,
+        )
+        self.game_logic.attach_journal(SnapshotJournal(BASE_DIR / SNAPSHOT_FILE))
         self.current_screen: Optional[Screen] = None
         self.online_lobby = None
 
-        self._go_to_screen("main_menu")
+        self._start_event_consumers()
+        if self._restore_session():
+            self._go_to_screen("game", {"continue_game": True})
+        else:
+            self._go_to_screen("main_menu")
+
+    def _restore_session(self) -> bool:
+        """Възстановява прекъсната игра от последната моментна снимка."""
+        payload = load_latest(BASE_DIR / SNAPSHOT_FILE)
+        if payload is None:
+            return False
+        try:
+            state = self.game_logic.restore(decode_snapshot(payload))
+        except ValueError:
+            self.game_logic.journal.clear()
+            return False
+        return not state.game_over
+
+    def _start_event_consumers(self) -> None:
+        """Пуска фоновите консуматори — цикълът на играта не пише на диска.
+
+        Онлайн лобито има собствен дневник само за анализите: краят на онлайн игра
+        не бива да чисти журнала на соло играта или да записва рекорди и калибровка.
+        """
+        self.analytics = AnalyticsWriter(BASE_DIR / EVENTS_FILE)
+        self.events.subscribe(persist_highscores(self.game_logic.highscore_manager), "highscores")
+        self.events.subscribe(persist_calibration(self.game_logic.calibrator), "calibration")
+        self.events.subscribe(write_journal(self.game_logic.journal), "journal")
+        self.events.subscribe(self.analytics, "analytics")
+        self.events.start()
+        self.online_events.subscribe(self.analytics, "analytics")
+        self.online_events.start()
 
     def _go_to_screen(self, screen_name: str, data: dict = None) -> None:
 
@@ -76,6 +125,9 @@ class TriviadorGame:
 
             if hasattr(self.current_screen, 'lobby') and self.current_screen.lobby:
                 self.online_lobby = self.current_screen.lobby
+            if self.online_lobby and self.online_lobby.is_host:
+                self.online_lobby.events = self.online_events
+                self.online_lobby.audience = self.audience
 
             self.current_screen = OnlineGameScreen(self.screen)
             self.current_screen.set_lobby(self.online_lobby)
@@ -98,6 +150,10 @@ class TriviadorGame:
                 elif self.current_screen:
                     self.current_screen.handle_event(event)
 
+            lobby = getattr(self.current_screen, "lobby", None)
+            if lobby:
+                lobby.pump()
+
             if self.current_screen:
                 self.current_screen.update(dt)
 
@@ -112,6 +168,9 @@ class TriviadorGame:
 
             pygame.display.flip()
 
+        self.events.close()
+        self.online_events.close()
+        self.analytics.close()
         pygame.quit()
         sys.exit()
 
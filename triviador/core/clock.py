@@ -0,0 +1,37 @@
+import time
+
+
+class Clock :
+
+
+    def __call__ (self )->float :
+
+        return time .monotonic ()
+
+    def sleep (self ,seconds :float )->None :
+
+        if seconds >0 :
+            time .sleep (seconds )
+
+
+class VirtualClock (Clock ):
+
+
+    def __init__ (self ,start :float =0.0 ):
+        self .now =start
+
+    def __call__ (self )->float :
+
+        return self .now
+
+    def advance (self ,seconds :float )->None :
+
+        self .now +=seconds
+
+    def sleep (self ,seconds :float )->None :
+
+        if seconds >0 :
+            self .advance (seconds )
+
+
+DEFAULT_CLOCK =Clock ()
@@ -37,6 +37,14 @@ SPECIAL_ROUND_MULTIPLIER =2
 
 
 SPECIAL_ROUND_CHANCE =0.15
+ENDLESS_SCORE_BANDS =(500 ,1500 ,3000 )
+
+
+RATING_BASE =1500.0
+RATING_DIFFICULTY_STEP =200.0
+RATING_K_FACTOR =32.0
+RATING_K_MIN =8.0
+RATING_TARGET_SUCCESS =0.6
 
 
 JOKER_5050 ="50_50"
@@ -45,10 +53,19 @@ JOKERS_PER_GAME ={
 JOKER_5050 :2 ,
 JOKER_AUDIENCE :1 ,
 }
+AUDIENCE_CONCENTRATION =40.0
+AUDIENCE_TABLE_SIZE =256
+AUDIENCE_TABLE_SEED =2024
 
 
 QUESTIONS_FILE ="questions.json"
 HIGHSCORES_FILE ="highscores.json"
+SNAPSHOT_FILE ="session.snap"
+SNAPSHOT_COMPACT_EVERY =64
+EVENTS_FILE ="events.log"
+EVENT_LOG_CAPACITY =4096
+EVENT_POLL_INTERVAL =0.05
+CALIBRATION_FILE ="calibration.bin"
 
 
 FONT_SMALL =18
@@ -63,7 +80,28 @@ ANIMATION_SPEED =5
 
 
 DEFAULT_PORT =5555
+DISCOVERY_PORT =5556
+BEACON_INTERVAL =0.5
+LOBBY_TTL =2.0
+MAX_PLAYERS =4
+RELAY_PORT =5557
 BUFFER_SIZE =4096
+COMPRESSION_THRESHOLD =160
+COMPRESSION_LEVEL =6
+PREFETCH_DEPTH =2
+REVEAL_LEAD_TIME =0.25
+PING_INTERVAL =1.0
+SEND_QUEUE_LIMIT =256
+ROUND_DEADLINE_GRACE =2.0
+RECONNECT_ATTEMPTS =5
+RECONNECT_DELAY =0.5
+PUMP_BUDGET =0.004
+STATS_DUMP_INTERVAL =5.0
+TIMER_TICK =0.01
+TIMER_SLOTS =512
+LOBBY_IDLE_TIMEOUT =600.0
+SESSION_IDLE_TIMEOUT =900.0
+QUESTION_START_DELAY =1.0
 
 
 MODE_STANDARD ="standard"
@@ -104,6 +104,7 @@ class GameState :
     is_special_round :bool =False
     game_over :bool =False
     start_time :float =field (default_factory =time .time )
+    seed :Optional [int ]=None
 
     @property
     def current_player (self )->Optional [Player ]:
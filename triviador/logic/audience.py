@@ -0,0 +1,109 @@
+import random
+from typing import Optional
+
+from triviador.core.config import AUDIENCE_CONCENTRATION ,AUDIENCE_TABLE_SIZE ,AUDIENCE_TABLE_SEED
+from triviador.core.models import Question ,QuestionType
+from triviador.logic.calibration import Calibrator ,expected_success
+
+
+def default_share (difficulty :int )->float :
+
+    return max (0.3 ,0.9 -0.1 *difficulty )
+
+
+def to_percentages (weights :list [float ])->tuple [int ,...]:
+
+    total =sum (weights )
+    if total <=0 :
+        weights ,total =[1.0 ]*len (weights ),float (len (weights ))
+    raw =[w *100 /total for w in weights ]
+    votes =[int (r )for r in raw ]
+    order =sorted (range (len (raw )),key =lambda i :raw [i ]-votes [i ],reverse =True )
+    for i in order [:100 -sum (votes )]:
+        votes [i ]+=1
+    return tuple (votes )
+
+
+class AudienceModel :
+
+
+    def __init__ (self ,shares :Optional [dict [int ,float ]]=None ,concentration :float =AUDIENCE_CONCENTRATION ,
+    table_size :int =AUDIENCE_TABLE_SIZE ,seed :int =AUDIENCE_TABLE_SEED ):
+        self .shares =dict (shares or {})
+        self .concentration =concentration
+        self .table_size =table_size
+        self .seed =seed
+        self .tables :dict [tuple [int ,int ],tuple [tuple [int ,...],...]]={}
+
+    @classmethod
+    def from_accuracy (cls ,accuracy :dict [int ,float ],**kwargs )->"AudienceModel":
+
+        return cls ({difficulty :min (max (share ,0.25 ),0.95 )for difficulty ,share in accuracy .items ()},**kwargs )
+
+    @classmethod
+    def from_calibration (cls ,calibrator :Calibrator ,questions :list [Question ],skill :Optional [float ]=None ,
+    **kwargs )->"AudienceModel":
+
+        if skill is None :
+            skill =calibrator .team_rating (calibrator .player_ratings )
+        totals :dict [int ,list [float ]]={}
+        for question in questions :
+            if question .id in calibrator .question_ratings :
+                totals .setdefault (question .difficulty ,[]).append (
+                expected_success (skill ,calibrator .question_rating (question ))
+                )
+        return cls .from_accuracy ({difficulty :sum (values )/len (values )for difficulty ,values in totals .items ()},**kwargs )
+
+    def share (self ,difficulty :int )->float :
+
+        return self .shares .get (difficulty ,default_share (difficulty ))
+
+    def table (self ,difficulty :int ,option_count :int )->tuple [tuple [int ,...],...]:
+
+        key =(difficulty ,option_count )
+        table =self .tables .get (key )
+        if table is None :
+            table =self .tables [key ]=self ._build (difficulty ,option_count )
+        return table
+
+    def _build (self ,difficulty :int ,option_count :int )->tuple [tuple [int ,...],...]:
+
+        rng =random .Random (f"{self .seed }:{difficulty }:{option_count }")
+        share =self .share (difficulty )
+        alphas =[self .concentration *share ]+[self .concentration *(1 -share )/max (1 ,option_count -1 )]*(option_count -1 )
+        return tuple (
+        to_percentages ([rng .gammavariate (alpha ,1.0 )for alpha in alphas ])
+        for _ in range (self .table_size )
+        )
+
+    def sample (self ,difficulty :int ,option_count :int ,rng :random .Random )->tuple [int ,...]:
+
+        table =self .table (difficulty ,option_count )
+        return table [rng .randrange (len (table ))]
+
+    def sample_batch (self ,difficulty :int ,option_count :int ,count :int ,
+    rng :random .Random )->list [tuple [int ,...]]:
+
+        table =self .table (difficulty ,option_count )
+        size =len (table )
+        return [table [rng .randrange (size )]for _ in range (count )]
+
+    def votes (self ,question :Question ,rng :random .Random )->dict :
+
+        if question .question_type !=QuestionType .MULTIPLE_CHOICE :
+            correct =float (question .correct_answer )
+            suggested =int (correct +correct *rng .uniform (-0.05 ,0.05 ))
+            return {"suggested_value":suggested ,"confidence":rng .randint (60 ,85 )}
+
+        wrong_options =[opt for opt in question .options if opt !=question .correct_answer ]
+        sample =self .sample (question .difficulty ,len (wrong_options )+1 ,rng )
+        results ={question .correct_answer :sample [0 ]}
+        results .update (zip (wrong_options ,sample [1 :]))
+        return results
+
+    def votes_batch (self ,questions :list [Question ],rng :random .Random )->list [dict ]:
+
+        return [self .votes (question ,rng )for question in questions ]
+
+
+DEFAULT_AUDIENCE =AudienceModel ()
@@ -0,0 +1,200 @@
+import math
+import os
+import random
+import struct
+from typing import Iterable ,Optional
+
+from triviador.core.config import (
+RATING_BASE ,RATING_DIFFICULTY_STEP ,RATING_K_FACTOR ,RATING_K_MIN ,RATING_TARGET_SUCCESS
+)
+from triviador.core.models import Question
+
+
+CALIBRATION_MAGIC =b"TRVC1"
+PICK_WINDOW =4
+K_DECAY =20
+
+_HEADER =struct .Struct ("<5sII")
+_QUESTION =struct .Struct ("<IfI")
+_PLAYER =struct .Struct ("<fI")
+
+
+def difficulty_rating (difficulty :float )->float :
+
+    return RATING_BASE +(difficulty -3 )*RATING_DIFFICULTY_STEP
+
+
+def expected_success (skill :float ,rating :float )->float :
+
+    return 1 /(1 +10 **((rating -skill )/400 ))
+
+
+def rating_for_success (skill :float ,success :float )->float :
+
+    return skill +400 *math .log10 ((1 -success )/success )
+
+
+def ladder_levels (count :int )->list [int ]:
+
+    per_level =max (1 ,count //5 )
+    remainder =count %5
+    return [difficulty for difficulty in range (1 ,6 )
+    for _ in range (per_level +(1 if difficulty <=remainder else 0 ))]
+
+
+class Calibrator :
+
+
+    def __init__ (self ,k_factor :float =RATING_K_FACTOR ,k_min :float =RATING_K_MIN ,
+    path :Optional [str ]=None ):
+        self .k_factor =k_factor
+        self .k_min =k_min
+        self .path =path
+        self .question_ratings :dict [int ,float ]={}
+        self .question_counts :dict [int ,int ]={}
+        self .player_ratings :dict [str ,float ]={}
+        self .player_counts :dict [str ,int ]={}
+        self .updates =0
+
+    def _k (self ,count :int )->float :
+
+        return max (self .k_min ,self .k_factor /(1 +count /K_DECAY ))
+
+    def question_rating (self ,question :Question )->float :
+
+        rating =self .question_ratings .get (question .id )
+        return difficulty_rating (question .difficulty )if rating is None else rating
+
+    def player_rating (self ,name :str )->float :
+
+        return self .player_ratings .get (name ,RATING_BASE )
+
+    def team_rating (self ,names :Iterable [str ])->float :
+
+        ratings =[self .player_rating (name )for name in names ]
+        return sum (ratings )/len (ratings )if ratings else RATING_BASE
+
+    def target_rating (self ,skill :float ,difficulty :float )->float :
+
+        return difficulty_rating (difficulty )+skill -RATING_BASE
+
+    def difficulty (self ,question :Question )->int :
+
+        level =round ((self .question_rating (question )-RATING_BASE )/RATING_DIFFICULTY_STEP )+3
+        return min (max (level ,1 ),5 )
+
+    def record (self ,name :str ,question :Question ,correct :bool )->float :
+
+        skill =self .player_rating (name )
+        rating =self .question_rating (question )
+        surprise =(1.0 if correct else 0.0 )-expected_success (skill ,rating )
+
+        player_count =self .player_counts .get (name ,0 )
+        question_count =self .question_counts .get (question .id ,0 )
+        skill +=self ._k (player_count )*surprise
+        self .player_ratings [name ]=skill
+        self .player_counts [name ]=player_count +1
+        self .question_ratings [question .id ]=rating -self ._k (question_count )*surprise
+        self .question_counts [question .id ]=question_count +1
+        self .updates +=1
+        return skill
+
+    def pick (self ,skill :float ,candidates :list [Question ],rng :random .Random ,
+    success :float =RATING_TARGET_SUCCESS )->Optional [Question ]:
+
+        return self .pick_rating (rating_for_success (skill ,success ),candidates ,rng )
+
+    def pick_rating (self ,target :float ,candidates :list [Question ],rng :random .Random )->Optional [Question ]:
+
+        if not candidates :
+            return None
+        distances =sorted ((abs (self .question_rating (q )-target ),i )for i ,q in enumerate (candidates ))
+        cutoff =distances [min (PICK_WINDOW ,len (distances ))-1 ][0 ]
+        return candidates [rng .choice ([i for distance ,i in distances if distance <=cutoff ])]
+
+    def ladder (self ,skill :float ,candidates :list [Question ],count :int ,rng :random .Random )->list [Question ]:
+
+        remaining =list (candidates )
+        questions =[]
+        for level in ladder_levels (count ):
+            question =self .pick_rating (self .target_rating (skill ,level ),remaining ,rng )
+            if question is None :
+                break
+            remaining .remove (question )
+            questions .append (question )
+        return questions
+
+    def to_bytes (self )->bytes :
+
+        questions =tuple (self .question_ratings .items ())
+        question_counts =dict (self .question_counts )
+        players =tuple (self .player_ratings .items ())
+        player_counts =dict (self .player_counts )
+        out =bytearray (_HEADER .pack (CALIBRATION_MAGIC ,len (questions ),len (players )))
+        for question_id ,rating in questions :
+            out +=_QUESTION .pack (question_id ,rating ,question_counts .get (question_id ,0 ))
+        for name ,rating in players :
+            raw =name .encode ("utf-8")
+            out +=struct .pack ("<H",len (raw ))+raw
+            out +=_PLAYER .pack (rating ,player_counts .get (name ,0 ))
+        return bytes (out )
+
+    @classmethod
+    def from_bytes (cls ,data :bytes ,**kwargs )->"Calibrator":
+
+        calibrator =cls (**kwargs )
+        try :
+            magic ,question_count ,player_count =_HEADER .unpack_from (data ,0 )
+            if magic !=CALIBRATION_MAGIC :
+                raise ValueError ("Невалиден файл с калибровка")
+            pos =_HEADER .size
+            end =pos +question_count *_QUESTION .size
+            if len (data )<end :
+                raise ValueError ("Непълен файл с калибровка")
+            for question_id ,rating ,count in _QUESTION .iter_unpack (data [pos :end ]):
+                calibrator .question_ratings [question_id ]=rating
+                calibrator .question_counts [question_id ]=count
+            pos =end
+            for _ in range (player_count ):
+                (length ,)=struct .unpack_from ("<H",data ,pos )
+                name =data [pos +2 :pos +2 +length ].decode ("utf-8")
+                rating ,count =_PLAYER .unpack_from (data ,pos +2 +length )
+                calibrator .player_ratings [name ]=rating
+                calibrator .player_counts [name ]=count
+                pos +=2 +length +_PLAYER .size
+        except (struct .error ,UnicodeDecodeError )as e :
+            raise ValueError (f"Повреден файл с калибровка: {e }")from e
+        return calibrator
+
+    def save (self ,path :Optional [str ]=None )->None :
+
+        path =path or self .path
+        if not path :
+            return
+        temp_path =f"{path }.tmp"
+        with open (temp_path ,"wb")as f :
+            f .write (self .to_bytes ())
+        os .replace (temp_path ,path )
+
+    @classmethod
+    def load (cls ,path :str ,**kwargs )->"Calibrator":
+
+        try :
+            with open (path ,"rb")as f :
+                data =f .read ()
+        except FileNotFoundError :
+            return cls (path =path ,**kwargs )
+        try :
+            calibrator =cls .from_bytes (data ,**kwargs )
+        except ValueError :
+            return cls (path =path ,**kwargs )
+        calibrator .path =path
+        return calibrator
+
+    def get_stats (self )->dict :
+
+        return {
+        "questions":len (self .question_ratings ),
+        "players":len (self .player_ratings ),
+        "updates":self .updates
+        }
@@ -0,0 +1,230 @@
+import json
+import threading
+from typing import Callable ,Optional
+
+from triviador.core.clock import Clock ,DEFAULT_CLOCK
+from triviador.core.config import EVENT_LOG_CAPACITY ,EVENT_POLL_INTERVAL
+
+
+EVENT_GAME_START =1
+EVENT_QUESTION =2
+EVENT_ANSWER =3
+EVENT_JOKER =4
+EVENT_ROUND_END =5
+EVENT_GAME_END =6
+EVENT_SNAPSHOT =7
+EVENT_NAMES ={
+EVENT_GAME_START :"game_start",
+EVENT_QUESTION :"question",
+EVENT_ANSWER :"answer",
+EVENT_JOKER :"joker",
+EVENT_ROUND_END :"round_end",
+EVENT_GAME_END :"game_end",
+EVENT_SNAPSHOT :"snapshot",
+}
+
+
+class GameEvent :
+
+    __slots__ =("seq","at","kind","data","source")
+
+    def __init__ (self ,seq :int ,at :float ,kind :int ,data :dict ,source :str =""):
+        self .seq =seq
+        self .at =at
+        self .kind =kind
+        self .data =data
+        self .source =source
+
+    @property
+    def name (self )->str :
+
+        return EVENT_NAMES .get (self .kind ,str (self .kind ))
+
+    def to_dict (self )->dict :
+
+        head ={"seq":self .seq ,"at":round (self .at ,6 ),"event":self .name }
+        if self .source :
+            head ["source"]=self .source
+        return {**head ,**self .data }
+
+
+class EventLog :
+
+
+    def __init__ (self ,capacity :int =EVENT_LOG_CAPACITY ,clock :Clock =DEFAULT_CLOCK ,source :str =""):
+        self .capacity =capacity
+        self .clock =clock
+        self .source =source
+        self .buffer :list [Optional [GameEvent ]]=[None ]*capacity
+        self .seq =0
+        self .lock =threading .Lock ()
+        self .consumers :list [EventConsumer ]=[]
+
+    def emit (self ,kind :int ,**data )->None :
+
+        with self .lock :
+            seq =self .seq
+            self .buffer [seq %self .capacity ]=GameEvent (seq ,self .clock (),kind ,data ,self .source )
+            self .seq =seq +1
+
+    def read (self ,cursor :int )->tuple [list [GameEvent ],int ,int ]:
+
+        end =self .seq
+        start =max (cursor ,end -self .capacity )
+        events =[]
+        for seq in range (start ,end ):
+            event =self .buffer [seq %self .capacity ]
+            if event is not None and event .seq ==seq :
+                events .append (event )
+        return events ,end ,end -cursor -len (events )
+
+    def subscribe (self ,handler :Callable [[GameEvent ],None ],name :str ="",
+    interval :float =EVENT_POLL_INTERVAL )->"EventConsumer":
+
+        consumer =EventConsumer (self ,handler ,name ,interval )
+        self .consumers .append (consumer )
+        return consumer
+
+    def start (self )->None :
+
+        for consumer in self .consumers :
+            consumer .start ()
+
+    def flush (self )->None :
+
+        for consumer in self .consumers :
+            consumer .drain ()
+
+    def close (self )->None :
+
+        for consumer in self .consumers :
+            consumer .stop ()
+
+    def get_stats (self )->dict :
+
+        return {
+        "emitted":self .seq ,
+        "capacity":self .capacity ,
+        "consumers":{consumer .name :consumer .get_stats ()for consumer in self .consumers }
+        }
+
+
+class EventConsumer :
+
+
+    def __init__ (self ,log :EventLog ,handler :Callable [[GameEvent ],None ],name :str ="",
+    interval :float =EVENT_POLL_INTERVAL ):
+        self .log =log
+        self .handler =handler
+        self .name =name or getattr (handler ,"__name__",type (handler ).__name__ )
+        self .interval =interval
+        self .cursor =log .seq
+        self .lock =threading .Lock ()
+        self .stopped =threading .Event ()
+        self .thread :Optional [threading .Thread ]=None
+        self .handled =0
+        self .dropped =0
+        self .errors =0
+
+    def drain (self )->int :
+
+        with self .lock :
+            events ,self .cursor ,dropped =self .log .read (self .cursor )
+            self .dropped +=dropped
+            for event in events :
+                try :
+                    self .handler (event )
+                except Exception :
+                    self .errors +=1
+            self .handled +=len (events )
+            return len (events )
+
+    def start (self )->None :
+
+        if self .thread is not None :
+            return
+        self .stopped .clear ()
+        self .thread =threading .Thread (target =self ._run ,name =f"events-{self .name }",daemon =True )
+        self .thread .start ()
+
+    def _run (self )->None :
+
+        while not self .stopped .wait (self .interval ):
+            self .drain ()
+        self .drain ()
+
+    def stop (self )->None :
+
+        self .stopped .set ()
+        if self .thread is not None :
+            self .thread .join ()
+            self .thread =None
+        else :
+            self .drain ()
+
+    def get_stats (self )->dict :
+
+        return {
+        "handled":self .handled ,
+        "lag":self .log .seq -self .cursor ,
+        "dropped":self .dropped ,
+        "errors":self .errors
+        }
+
+
+def persist_highscores (highscore_manager )->Callable [[GameEvent ],None ]:
+
+    def handler (event :GameEvent )->None :
+
+        if event .kind ==EVENT_GAME_END :
+            highscore_manager .save ()
+
+    return handler
+
+
+def persist_calibration (calibrator )->Callable [[GameEvent ],None ]:
+
+    def handler (event :GameEvent )->None :
+
+        if event .kind ==EVENT_GAME_END :
+            calibrator .save ()
+
+    return handler
+
+
+def write_journal (journal )->Callable [[GameEvent ],None ]:
+
+    def handler (event :GameEvent )->None :
+
+        if event .kind ==EVENT_SNAPSHOT :
+            journal .append (event .data ["payload"])
+        elif event .kind ==EVENT_GAME_END :
+            journal .clear ()
+
+    return handler
+
+
+class AnalyticsWriter :
+
+
+    def __init__ (self ,path :str ):
+        self .path =path
+        self .file =open (path ,"a",encoding ="utf-8")
+        self .lock =threading .Lock ()
+        self .written =0
+
+    def __call__ (self ,event :GameEvent )->None :
+
+        if event .kind ==EVENT_SNAPSHOT :
+            return
+        line =json .dumps (event .to_dict (),ensure_ascii =False ,separators =(",",":"))+"\n"
+        with self .lock :
+            self .file .write (line )
+            self .written +=1
+            if event .kind ==EVENT_GAME_END :
+                self .file .flush ()
+
+    def close (self )->None :
+
+        with self .lock :
+            self .file .close ()
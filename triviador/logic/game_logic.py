@@ -1,36 +1,52 @@
-import random
-import time
 from typing import Optional
 
+from triviador.core.clock import Clock ,DEFAULT_CLOCK
 from triviador.core.models import Question ,Player ,GameState ,GameMode ,QuestionType
 from triviador.logic.question_manager import QuestionManager
 from triviador.logic.highscore_manager import HighScoreManager
 from triviador.logic.joker_system import JokerSystem
-from triviador.core.config import (
-BASE_POINTS ,TIME_BONUS_MULTIPLIER ,DIFFICULTY_MULTIPLIER ,
-SPECIAL_ROUND_MULTIPLIER ,SPECIAL_ROUND_CHANCE ,DEFAULT_TIME_LIMIT ,
-QUESTIONS_PER_GAME ,NUMERIC_TOLERANCE
+from triviador.logic.audience import AudienceModel
+from triviador.logic.calibration import Calibrator
+from triviador.logic.events import (
+EventLog ,EVENT_GAME_START ,EVENT_QUESTION ,EVENT_ANSWER ,EVENT_JOKER ,EVENT_GAME_END ,EVENT_SNAPSHOT
 )
+from triviador.logic.rng import GameRandom ,derive_stream
+from triviador.logic.snapshot import GameSnapshot ,PlayerSnapshot ,SnapshotJournal ,encode_snapshot
+from triviador.logic.scoring import ScoringRules ,DEFAULT_RULES ,score_points
+from triviador.core.config import DEFAULT_TIME_LIMIT ,QUESTIONS_PER_GAME ,NUMERIC_TOLERANCE
 
 
 class GameLogic :
 
 
-    def __init__ (self ):
-        self .question_manager =QuestionManager ()
-        self .highscore_manager =HighScoreManager ()
+    def __init__ (self ,question_manager :Optional [QuestionManager ]=None ,
+    highscore_manager :Optional [HighScoreManager ]=None ,rules :ScoringRules =DEFAULT_RULES ,
+    clock :Clock =DEFAULT_CLOCK ,calibrator :Optional [Calibrator ]=None ,events :Optional [EventLog ]=None ,
+    audience :Optional [AudienceModel ]=None ):
+        self .question_manager =question_manager or QuestionManager ()
+        self .highscore_manager =highscore_manager or HighScoreManager ()
+        self .rules =rules
+        self .clock =clock
+        self .calibrator =calibrator
+        self .events =events
+        self .audience =audience
         self .joker_system =JokerSystem ()
+        self .random =GameRandom ()
         self .game_state :Optional [GameState ]=None
         self .question_start_time :float =0
         self .used_question_ids :set [int ]=set ()
+        self .answered =False
+        self .journal :Optional [SnapshotJournal ]=None
 
     def start_game (
     self ,
     mode :GameMode ,
     player_names :list [str ],
-    categories :Optional [list [str ]]=None
+    categories :Optional [list [str ]]=None ,
+    seed :Optional [int ]=None
     )->GameState :
 
+        self .random =GameRandom (seed )
         players =[Player (name =name )for name in player_names ]
 
         if categories is None or len (categories )==0 :
@@ -40,7 +56,10 @@ class GameLogic :
         if mode ==GameMode .STANDARD :
             questions =self .question_manager .get_questions_with_increasing_difficulty (
             count =QUESTIONS_PER_GAME ,
-            categories =categories
+            categories =categories ,
+            rng =self .random .questions ,
+            calibrator =self .calibrator ,
+            skill =self .calibrator .team_rating (player_names )if self .calibrator else None
             )
         else :
             questions =[]
@@ -49,25 +68,34 @@ class GameLogic :
         mode =mode ,
         players =players ,
         questions =questions ,
-        selected_categories =categories
+        selected_categories =categories ,
+        seed =self .random .seed
         )
 
         self .used_question_ids =set ()
+        self .answered =False
         self ._start_question_timer ()
 
 
         self ._check_special_round ()
+        if self .events :
+            self .events .emit (
+            EVENT_GAME_START ,mode =mode .value ,players =list (player_names ),seed =self .random .seed ,
+            question_ids =[q .id for q in questions ]
+            )
+        self ._checkpoint ()
 
         return self .game_state
 
     def _start_question_timer (self )->None :
 
-        self .question_start_time =time .time ()
+        self .question_start_time =self .clock ()
 
     def _check_special_round (self )->None :
 
         if self .game_state :
-            self .game_state .is_special_round =random .random ()<SPECIAL_ROUND_CHANCE
+            rng =derive_stream (self .random .seed ,"special",self .game_state .current_question_index )
+            self .game_state .is_special_round =rng .random ()<self .rules .special_round_chance
 
     def get_current_question (self )->Optional [Question ]:
 
@@ -86,12 +114,17 @@ class GameLogic :
         if not self .game_state :
             return
 
-        current_score =self .game_state .current_player .score if self .game_state .current_player else 0
+        player =self .game_state .current_player
+        current_score =player .score if player else 0
 
         question =self .question_manager .get_endless_mode_question (
         current_score =current_score ,
         categories =self .game_state .selected_categories ,
-        exclude_ids =self .used_question_ids
+        exclude_ids =self .used_question_ids ,
+        bands =self .rules .endless_bands ,
+        rng =derive_stream (self .random .seed ,"questions",len (self .game_state .questions )),
+        calibrator =self .calibrator ,
+        skill =self .calibrator .player_rating (player .name )if self .calibrator and player else None
         )
 
         if question :
@@ -100,7 +133,7 @@ class GameLogic :
 
     def get_remaining_time (self )->float :
 
-        elapsed =time .time ()-self .question_start_time
+        elapsed =self .clock ()-self .question_start_time
         remaining =DEFAULT_TIME_LIMIT -elapsed
         return max (0 ,remaining )
 
@@ -110,25 +143,8 @@ class GameLogic :
 
     def calculate_points (self ,is_correct :bool ,remaining_time :float ,difficulty :int )->int :
 
-        if not is_correct :
-            return 0
-
-
-        points =BASE_POINTS
-
-
-        time_bonus =int (remaining_time *TIME_BONUS_MULTIPLIER )
-        points +=time_bonus
-
-
-        difficulty_bonus =int (points *(difficulty -1 )*(DIFFICULTY_MULTIPLIER -1 ))
-        points +=difficulty_bonus
-
-
-        if self .game_state and self .game_state .is_special_round :
-            points =int (points *SPECIAL_ROUND_MULTIPLIER )
-
-        return points
+        is_special_round =bool (self .game_state and self .game_state .is_special_round )
+        return score_points ((is_correct ,),(remaining_time ,),(difficulty ,),(is_special_round ,),self .rules )[0 ]
 
     def submit_answer (self ,answer :str |int |float )->dict :
 
@@ -148,6 +164,9 @@ class GameLogic :
         if remaining_time <=0 :
             is_correct =False
 
+        if self .calibrator :
+            self .calibrator .record (player .name ,question ,is_correct )
+
         points =self .calculate_points (is_correct ,remaining_time ,question .difficulty )
 
 
@@ -170,6 +189,13 @@ class GameLogic :
             self .game_state .game_over =True
             result ["game_over"]=True
 
+        if self .events :
+            self .events .emit (
+            EVENT_ANSWER ,player =player .name ,question_id =question .id ,correct =is_correct ,points =points ,
+            time =result ["time_taken"]
+            )
+        self .answered =True
+        self ._checkpoint ()
         return result
 
     def next_question (self )->bool :
@@ -186,11 +212,18 @@ class GameLogic :
                 has_next =True
 
         if has_next :
+            self .answered =False
             self ._start_question_timer ()
             self ._check_special_round ()
+            if self .events :
+                self .events .emit (
+                EVENT_QUESTION ,index =self .game_state .current_question_index ,
+                special =self .game_state .is_special_round
+                )
         else :
             self .game_state .game_over =True
 
+        self ._checkpoint ()
         return has_next
 
     def use_joker (self ,joker_type :str )->dict :
@@ -213,15 +246,19 @@ class GameLogic :
 
         player .use_joker (joker_type )
         question =self .game_state .current_question
+        if self .events :
+            self .events .emit (EVENT_JOKER ,player =player .name ,joker =joker_type ,question_id =question .id )
+        self ._checkpoint ()
 
         from triviador.core.config import JOKER_5050 ,JOKER_AUDIENCE
 
+        rng =derive_stream (self .random .seed ,"jokers",self .game_state .current_question_index ,joker_type )
         if joker_type ==JOKER_5050 :
-            result =self .joker_system .apply_5050 (question )
+            result =self .joker_system .apply_5050 (question ,rng )
             return {"type":"5050","remaining_options":result }
 
         elif joker_type ==JOKER_AUDIENCE :
-            result =self .joker_system .apply_audience_help (question )
+            result =self .joker_system .apply_audience_help (question ,rng ,self .audience )
             return {"type":"audience","votes":result }
 
         return {"error":"Непознат тип жокер"}
@@ -256,14 +293,82 @@ class GameLogic :
             }
 
 
-            highscore_rank =self .highscore_manager .add_score (player ,self .game_state .mode )
+            highscore_rank =self .highscore_manager .add_score (
+            player ,self .game_state .mode ,save =self .events is None
+            )
             if highscore_rank :
                 player_result ["highscore_rank"]=highscore_rank
 
             results ["players"].append (player_result )
 
+        if self .events :
+            self .events .emit (EVENT_GAME_END ,mode =results ["mode"],players =results ["players"])
+            return results
+        if self .journal :
+            self .journal .clear ()
+        if self .calibrator :
+            self .calibrator .save ()
         return results
 
+    def attach_journal (self ,journal :Optional [SnapshotJournal ])->None :
+
+        self .journal =journal
+
+    def _checkpoint (self )->None :
+
+        if not self .journal or not self .game_state :
+            return
+        payload =encode_snapshot (self .snapshot ())
+        if self .events :
+            self .events .emit (EVENT_SNAPSHOT ,payload =payload )
+        else :
+            self .journal .append (payload )
+
+    def snapshot (self )->GameSnapshot :
+
+        state =self .game_state
+        return GameSnapshot (
+        mode =state .mode ,
+        question_ids =[q .id for q in state .questions ],
+        players =[PlayerSnapshot (p .name ,p .score ,p .correct_answers ,p .total_answers ,dict (p .jokers ))
+        for p in state .players ],
+        question_index =state .current_question_index ,
+        player_index =state .current_player_index ,
+        remaining_time =self .get_remaining_time (),
+        is_special_round =state .is_special_round ,
+        answered =self .answered ,
+        game_over =state .game_over ,
+        seed =state .seed ,
+        categories =list (state .selected_categories ),
+        used_question_ids =sorted (self .used_question_ids )
+        )
+
+    def restore (self ,snapshot :GameSnapshot )->GameState :
+
+        questions =self .question_manager .get_questions_by_ids (snapshot .question_ids )
+        players =[Player (name =p .name ,score =p .score ,correct_answers =p .correct_answers ,
+        total_answers =p .total_answers ,jokers =dict (p .jokers ))for p in snapshot .players ]
+
+        self .random =GameRandom (snapshot .seed )
+        self .game_state =GameState (
+        mode =snapshot .mode ,
+        players =players ,
+        current_player_index =snapshot .player_index ,
+        current_question_index =snapshot .question_index ,
+        questions =questions ,
+        selected_categories =list (snapshot .categories ),
+        is_special_round =snapshot .is_special_round ,
+        game_over =snapshot .game_over ,
+        seed =self .random .seed
+        )
+        self .used_question_ids =set (snapshot .used_question_ids )
+        self .answered =snapshot .answered
+        self .question_start_time =self .clock ()-(DEFAULT_TIME_LIMIT -snapshot .remaining_time )
+
+        if self .answered and not self .game_state .game_over :
+            self .next_question ()
+        return self .game_state
+
     def get_highscores (self )->list :
 
         return self .highscore_manager .get_top_scores ()
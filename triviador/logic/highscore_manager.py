@@ -39,7 +39,11 @@ class HighScoreManager :
         with open (self .highscores_file ,"w",encoding ="utf-8")as f :
             json .dump (data ,f ,ensure_ascii =False ,indent =4 )
 
-    def add_score (self ,player :Player ,mode :GameMode )->Optional [int ]:
+    def save (self )->None :
+
+        self ._save_highscores ()
+
+    def add_score (self ,player :Player ,mode :GameMode ,save :bool =True )->Optional [int ]:
 
         highscore =HighScore (
         player_name =player .name ,
@@ -50,12 +54,12 @@ class HighScoreManager :
         date =datetime .now ().strftime ("%Y-%m-%d %H:%M")
         )
 
-        self .highscores .append (highscore )
-        self .highscores .sort (key =lambda x :x .score ,reverse =True )
+        highscores =sorted (self .highscores +[highscore ],key =lambda x :x .score ,reverse =True )
 
 
-        self .highscores =self .highscores [:self .MAX_HIGHSCORES ]
-        self ._save_highscores ()
+        self .highscores =highscores [:self .MAX_HIGHSCORES ]
+        if save :
+            self ._save_highscores ()
 
 
         for i ,hs in enumerate (self .highscores ):
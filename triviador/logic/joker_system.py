@@ -3,14 +3,34 @@ from typing import Optional
 
 from triviador.core.models import Question ,QuestionType ,Player
 from triviador.core.config import JOKER_5050 ,JOKER_AUDIENCE
+from triviador.logic.audience import AudienceModel ,DEFAULT_AUDIENCE
+
+
+class RoundJokers :
+
+    __slots__ =("question","is_special_round","results")
+
+    def __init__ (self ,question :Question ,is_special_round :bool ,rng :Optional [random .Random ]=None ,
+    audience :Optional [AudienceModel ]=None ):
+        self .question =question
+        self .is_special_round =is_special_round
+        self .results :dict [str ,dict ]={}
+        if not is_special_round :
+            self .results [JOKER_5050 ]={
+            "type":"5050","remaining_options":JokerSystem .apply_5050 (question ,rng ),"joker_type":JOKER_5050
+            }
+            self .results [JOKER_AUDIENCE ]={
+            "type":"audience","votes":JokerSystem .apply_audience_help (question ,rng ,audience ),"joker_type":JOKER_AUDIENCE
+            }
 
 
 class JokerSystem :
 
 
     @staticmethod
-    def apply_5050 (question :Question )->list [str ]:
+    def apply_5050 (question :Question ,rng :Optional [random .Random ]=None )->list [str ]:
 
+        rng =rng or random
         if question .question_type ==QuestionType .MULTIPLE_CHOICE :
 
             correct =question .correct_answer
@@ -18,9 +38,9 @@ class JokerSystem :
 
             if len (wrong_options )>=1 :
 
-                kept_wrong =random .choice (wrong_options )
+                kept_wrong =rng .choice (wrong_options )
                 remaining =[correct ,kept_wrong ]
-                random .shuffle (remaining )
+                rng .shuffle (remaining )
                 return remaining
             return question .options
 
@@ -35,47 +55,10 @@ class JokerSystem :
         return []
 
     @staticmethod
-    def apply_audience_help (question :Question )->dict [str ,int ]:
-
-        if question .question_type !=QuestionType .MULTIPLE_CHOICE :
-
-            correct =float (question .correct_answer )
-
-            noise =correct *random .uniform (-0.05 ,0.05 )
-            suggested =int (correct +noise )
-            return {"suggested_value":suggested ,"confidence":random .randint (60 ,85 )}
-
-        correct =question .correct_answer
-        options =question .options
-
-
-        difficulty =question .difficulty
-
-        base_correct_percent =max (30 ,90 -(difficulty *10 ))
-
-
-        results ={}
-        remaining =100
-
-
-        correct_votes =random .randint (base_correct_percent -10 ,base_correct_percent +10 )
-        correct_votes =min (correct_votes ,95 )
-        results [correct ]=correct_votes
-        remaining -=correct_votes
-
-
-        wrong_options =[opt for opt in options if opt !=correct ]
-
-        for i ,opt in enumerate (wrong_options ):
-            if i ==len (wrong_options )-1 :
-
-                results [opt ]=remaining
-            else :
-                votes =random .randint (0 ,remaining )
-                results [opt ]=votes
-                remaining -=votes
+    def apply_audience_help (question :Question ,rng :Optional [random .Random ]=None ,
+    model :Optional [AudienceModel ]=None )->dict [str ,int ]:
 
-        return results
+        return (model or DEFAULT_AUDIENCE ).votes (question ,rng or random )
 
     @staticmethod
     def can_use_joker (player :Player ,joker_type :str ,is_special_round :bool )->tuple [bool ,str ]:
@@ -1,3 +1,4 @@
+import bisect
 import json
 import random
 import re
@@ -5,7 +6,8 @@ from pathlib import Path
 from typing import Optional
 
 from triviador.core.models import Question ,QuestionType
-from triviador.core.config import QUESTIONS_FILE
+from triviador.core.config import QUESTIONS_FILE ,ENDLESS_SCORE_BANDS
+from triviador.logic.calibration import Calibrator
 
 
 BASE_DIR =Path (__file__ ).resolve ().parent .parent /"data"
@@ -14,6 +16,63 @@ BASE_DIR =Path (__file__ ).resolve ().parent .parent /"data"
 QUESTIONS_TXT_FILE ="questions.txt"
 
 
+class QuestionBank :
+
+    __slots__ =("questions","by_id","by_level","categories")
+
+    def __init__ (self ,questions :list [Question ]):
+        self .questions =tuple (questions )
+        self .by_id ={q .id :q for q in self .questions }
+        self .categories =tuple (sorted ({q .category for q in self .questions }))
+        levels :dict [int ,dict [str ,list [Question ]]]={}
+        for q in self .questions :
+            levels .setdefault (q .difficulty ,{}).setdefault (q .category ,[]).append (q )
+        self .by_level ={
+        difficulty :{category :tuple (items )for category ,items in by_category .items ()}
+        for difficulty ,by_category in levels .items ()
+        }
+
+    def pool (self ,difficulty_range :tuple [int ,int ],categories :Optional [list [str ]]=None ,
+    exclude_ids :Optional [set [int ]]=None )->list [Question ]:
+
+        low ,high =difficulty_range
+        pool =[]
+        for difficulty in range (low ,high +1 ):
+            by_category =self .by_level .get (difficulty ,{})
+            for category in categories or by_category :
+                pool .extend (by_category .get (category ,()))
+        if exclude_ids :
+            pool =[q for q in pool if q .id not in exclude_ids ]
+        return pool
+
+    def increasing_difficulty (self ,count :int ,categories :Optional [list [str ]],rng :random .Random ,
+    calibrator :Optional [Calibrator ]=None ,skill :Optional [float ]=None )->list [Question ]:
+
+        if calibrator is not None and skill is not None :
+            return calibrator .ladder (skill ,self .pool ((1 ,5 ),categories ),count ,rng )
+        questions =[]
+        questions_per_level =max (1 ,count //5 )
+        remainder =count %5
+        for difficulty in range (1 ,6 ):
+            pool =self .pool ((difficulty ,difficulty ),categories )
+            wanted =questions_per_level +(1 if difficulty <=remainder else 0 )
+            questions .extend (rng .sample (pool ,min (wanted ,len (pool ))))
+        return questions
+
+    def endless (self ,current_score :int ,categories :Optional [list [str ]],exclude_ids :set [int ],
+    rng :random .Random ,bands :tuple [int ,...]=ENDLESS_SCORE_BANDS ,calibrator :Optional [Calibrator ]=None ,
+    skill :Optional [float ]=None )->Optional [Question ]:
+
+        level =min (bisect .bisect_right (bands ,current_score ),3 )
+        if calibrator is not None and skill is not None :
+            return calibrator .pick_rating (calibrator .target_rating (skill ,level +1.5 ),
+            self .pool ((1 ,5 ),categories ,exclude_ids ),rng )
+        pool =self .pool ((level +1 ,level +2 ),categories ,exclude_ids )
+        if not pool :
+            pool =self .pool ((1 ,5 ),categories ,exclude_ids )
+        return rng .choice (pool )if pool else None
+
+
 class QuestionManager :
 
 
@@ -148,6 +207,18 @@ class QuestionManager :
 
         return [q for q in self .questions if q .category ==category ]
 
+    def freeze (self )->QuestionBank :
+
+        return QuestionBank (self .questions )
+
+    def get_questions_by_ids (self ,question_ids :list [int ])->list [Question ]:
+
+        by_id ={q .id :q for q in self .questions }
+        missing =[question_id for question_id in question_ids if question_id not in by_id ]
+        if missing :
+            raise ValueError (f"Липсващи въпроси: {missing }")
+        return [by_id [question_id ]for question_id in question_ids ]
+
     def get_questions_by_difficulty (self ,difficulty :int )->list [Question ]:
 
         return [q for q in self .questions if q .difficulty ==difficulty ]
@@ -157,7 +228,8 @@ class QuestionManager :
     count :int ,
     categories :Optional [list [str ]]=None ,
     difficulty_range :Optional [tuple [int ,int ]]=None ,
-    exclude_ids :Optional [set [int ]]=None
+    exclude_ids :Optional [set [int ]]=None ,
+    rng :Optional [random .Random ]=None
     )->list [Question ]:
 
         filtered =self .questions .copy ()
@@ -175,14 +247,21 @@ class QuestionManager :
         if len (filtered )<count :
             count =len (filtered )
 
-        return random .sample (filtered ,count )if filtered else []
+        return (rng or random ).sample (filtered ,count )if filtered else []
 
     def get_questions_with_increasing_difficulty (
     self ,
     count :int ,
-    categories :Optional [list [str ]]=None
+    categories :Optional [list [str ]]=None ,
+    rng :Optional [random .Random ]=None ,
+    calibrator :Optional [Calibrator ]=None ,
+    skill :Optional [float ]=None
     )->list [Question ]:
 
+        if calibrator is not None and skill is not None :
+            pool =self .get_random_questions (len (self .questions ),categories ,rng =rng )
+            return calibrator .ladder (skill ,pool ,count ,rng or random )
+
         questions =[]
         used_ids :set [int ]=set ()
 
@@ -199,7 +278,8 @@ class QuestionManager :
             count =num_questions ,
             categories =categories ,
             difficulty_range =(difficulty ,difficulty ),
-            exclude_ids =used_ids
+            exclude_ids =used_ids ,
+            rng =rng
             )
 
             questions .extend (level_questions )
@@ -211,24 +291,26 @@ class QuestionManager :
     self ,
     current_score :int ,
     categories :Optional [list [str ]]=None ,
-    exclude_ids :Optional [set [int ]]=None
+    exclude_ids :Optional [set [int ]]=None ,
+    bands :tuple [int ,...]=ENDLESS_SCORE_BANDS ,
+    rng :Optional [random .Random ]=None ,
+    calibrator :Optional [Calibrator ]=None ,
+    skill :Optional [float ]=None
     )->Optional [Question ]:
 
+        level =min (bisect .bisect_right (bands ,current_score ),3 )
+        if calibrator is not None and skill is not None :
+            pool =self .get_random_questions (len (self .questions ),categories ,exclude_ids =exclude_ids ,rng =rng )
+            return calibrator .pick_rating (calibrator .target_rating (skill ,level +1.5 ),pool ,rng or random )
 
-        if current_score <500 :
-            difficulty_range =(1 ,2 )
-        elif current_score <1500 :
-            difficulty_range =(2 ,3 )
-        elif current_score <3000 :
-            difficulty_range =(3 ,4 )
-        else :
-            difficulty_range =(4 ,5 )
+        difficulty_range =(level +1 ,level +2 )
 
         questions =self .get_random_questions (
         count =1 ,
         categories =categories ,
         difficulty_range =difficulty_range ,
-        exclude_ids =exclude_ids
+        exclude_ids =exclude_ids ,
+        rng =rng
         )
 
 
@@ -236,7 +318,8 @@ class QuestionManager :
             questions =self .get_random_questions (
             count =1 ,
             categories =categories ,
-            exclude_ids =exclude_ids
+            exclude_ids =exclude_ids ,
+            rng =rng
             )
 
         return questions [0 ]if questions else None
@@ -0,0 +1,22 @@
+import random
+import secrets
+from typing import Optional
+
+
+class GameRandom :
+
+
+    def __init__ (self ,seed :Optional [int ]=None ):
+        self .seed =secrets .randbits (63 )if seed is None else seed
+        self .questions =self .stream ("questions")
+        self .special =self .stream ("special")
+        self .jokers =self .stream ("jokers")
+
+    def stream (self ,name :str )->random .Random :
+
+        return derive_stream (self .seed ,name )
+
+
+def derive_stream (seed :int ,*parts )->random .Random :
+
+    return random .Random (":".join (str (part )for part in (seed ,*parts )))
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import Sequence
+
+try :
+    import numpy as np
+except ImportError :
+    np =None
+
+from triviador.core.config import (
+BASE_POINTS ,TIME_BONUS_MULTIPLIER ,DIFFICULTY_MULTIPLIER ,
+SPECIAL_ROUND_MULTIPLIER ,SPECIAL_ROUND_CHANCE ,ENDLESS_SCORE_BANDS
+)
+
+
+NUMPY_MIN_BATCH =64
+
+
+@dataclass (frozen =True )
+class ScoringRules :
+
+    base_points :int =BASE_POINTS
+    time_bonus_multiplier :float =TIME_BONUS_MULTIPLIER
+    difficulty_multiplier :float =DIFFICULTY_MULTIPLIER
+    special_round_multiplier :float =SPECIAL_ROUND_MULTIPLIER
+    special_round_chance :float =SPECIAL_ROUND_CHANCE
+    endless_bands :tuple [int ,...]=ENDLESS_SCORE_BANDS
+
+
+DEFAULT_RULES =ScoringRules ()
+
+
+def score_points (
+correct :Sequence [bool ],
+remaining_time :Sequence [float ],
+difficulty :Sequence [int ],
+special :Sequence [bool ],
+rules :ScoringRules =DEFAULT_RULES
+)->list [int ]:
+
+    if not len (correct )==len (remaining_time )==len (difficulty )==len (special ):
+        raise ValueError ("Масивите за точкуване са с различна дължина")
+    if np is not None and len (correct )>=NUMPY_MIN_BATCH :
+        return _score_numpy (correct ,remaining_time ,difficulty ,special ,rules ).tolist ()
+    return _score_python (correct ,remaining_time ,difficulty ,special ,rules )
+
+
+def _score_python (correct ,remaining_time ,difficulty ,special ,rules :ScoringRules )->list [int ]:
+
+    results =[]
+    for is_correct ,remaining ,level ,is_special in zip (correct ,remaining_time ,difficulty ,special ):
+        if not is_correct :
+            results .append (0 )
+            continue
+        points =rules .base_points +int (max (0 ,remaining )*rules .time_bonus_multiplier )
+        points +=int (points *(level -1 )*(rules .difficulty_multiplier -1 ))
+        if is_special :
+            points =int (points *rules .special_round_multiplier )
+        results .append (points )
+    return results
+
+
+def _score_numpy (correct ,remaining_time ,difficulty ,special ,rules :ScoringRules ):
+
+    remaining =np .maximum (np .asarray (remaining_time ,dtype =np .float64 ),0 )
+    levels =np .asarray (difficulty ,dtype =np .int64 )
+    points =rules .base_points +np .trunc (remaining *rules .time_bonus_multiplier ).astype (np .int64 )
+    points +=np .trunc (points *(levels -1 )*(rules .difficulty_multiplier -1 )).astype (np .int64 )
+    points =np .where (
+    np .asarray (special ,dtype =bool ),
+    np .trunc (points *rules .special_round_multiplier ).astype (np .int64 ),
+    points
+    )
+    return np .where (np .asarray (correct ,dtype =bool ),points ,0 )
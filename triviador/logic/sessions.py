@@ -0,0 +1,274 @@
+import itertools
+import secrets
+from collections import OrderedDict
+from typing import Optional
+
+from triviador.core.clock import Clock ,DEFAULT_CLOCK
+from triviador.core.config import (
+DEFAULT_TIME_LIMIT ,QUESTIONS_PER_GAME ,NUMERIC_TOLERANCE ,JOKERS_PER_GAME ,
+JOKER_5050 ,JOKER_AUDIENCE ,SESSION_IDLE_TIMEOUT
+)
+from triviador.core.models import GameMode ,Player ,Question
+from triviador.logic.calibration import Calibrator
+from triviador.logic.highscore_manager import HighScoreManager
+from triviador.logic.joker_system import JokerSystem
+from triviador.logic.question_manager import QuestionBank ,QuestionManager
+from triviador.logic.rng import derive_stream
+from triviador.logic.scoring import ScoringRules ,DEFAULT_RULES ,score_points
+
+
+JOKER_TYPES =tuple (JOKERS_PER_GAME )
+_INITIAL_JOKERS =tuple (JOKERS_PER_GAME [joker_type ]for joker_type in JOKER_TYPES )
+
+
+class SessionPlayer :
+
+    __slots__ =("name","score","correct_answers","total_answers","jokers")
+
+    def __init__ (self ,name :str ):
+        self .name =name
+        self .score =0
+        self .correct_answers =0
+        self .total_answers =0
+        self .jokers =_INITIAL_JOKERS
+
+    def joker_count (self ,joker_type :str )->int :
+
+        return self .jokers [JOKER_TYPES .index (joker_type )]if joker_type in JOKER_TYPES else 0
+
+    def use_joker (self ,joker_type :str )->None :
+
+        index =JOKER_TYPES .index (joker_type )
+        self .jokers =self .jokers [:index ]+(self .jokers [index ]-1 ,)+self .jokers [index +1 :]
+
+
+class GameSession :
+
+    __slots__ =(
+    "session_id","mode","players","question_ids","question_index","player_index",
+    "categories","seed","started_at","last_active","is_special_round","answered","game_over"
+    )
+
+    def __init__ (self ,session_id :int ,mode :GameMode ,players :list [SessionPlayer ],
+    categories :Optional [tuple [str ,...]],seed :int ,now :float ):
+        self .session_id =session_id
+        self .mode =mode
+        self .players =players
+        self .question_ids :tuple [int ,...]=()
+        self .question_index =0
+        self .player_index =0
+        self .categories =categories
+        self .seed =seed
+        self .started_at =now
+        self .last_active =now
+        self .is_special_round =False
+        self .answered =False
+        self .game_over =False
+
+    @property
+    def current_player (self )->SessionPlayer :
+
+        return self .players [self .player_index ]
+
+
+class SessionManager :
+
+
+    def __init__ (self ,question_manager :Optional [QuestionManager ]=None ,
+    highscore_manager :Optional [HighScoreManager ]=None ,rules :ScoringRules =DEFAULT_RULES ,
+    clock :Clock =DEFAULT_CLOCK ,idle_timeout :float =SESSION_IDLE_TIMEOUT ,
+    calibrator :Optional [Calibrator ]=None ):
+        self .bank :QuestionBank =(question_manager or QuestionManager ()).freeze ()
+        self .highscore_manager =highscore_manager or HighScoreManager ()
+        self .rules =rules
+        self .clock =clock
+        self .idle_timeout =idle_timeout
+        self .calibrator =calibrator
+        self .sessions :OrderedDict [int ,GameSession ]=OrderedDict ()
+        self .ids =itertools .count (1 )
+        self .categories :dict [tuple [str ,...],tuple [str ,...]]={}
+        self .expired =0
+
+    def __len__ (self )->int :
+
+        return len (self .sessions )
+
+    def create (self ,mode :GameMode ,player_names :list [str ],categories :Optional [list [str ]]=None ,
+    seed :Optional [int ]=None )->GameSession :
+
+        key =tuple (categories )if categories else None
+        if key is not None :
+            key =self .categories .setdefault (key ,key )
+        session =GameSession (
+        next (self .ids ),mode ,[SessionPlayer (name )for name in player_names ],key ,
+        secrets .randbits (63 )if seed is None else seed ,self .clock ()
+        )
+        if mode ==GameMode .STANDARD :
+            rng =derive_stream (session .seed ,"questions")
+            session .question_ids =tuple (
+            q .id for q in self .bank .increasing_difficulty (
+            QUESTIONS_PER_GAME ,key ,rng ,self .calibrator ,
+            self .calibrator .team_rating (player_names )if self .calibrator else None
+            )
+            )
+        else :
+            self ._draw_endless (session )
+        self ._start_question (session )
+        self .sessions [session .session_id ]=session
+        return session
+
+    def get (self ,session_id :int )->Optional [GameSession ]:
+
+        return self .sessions .get (session_id )
+
+    def _touch (self ,session :GameSession )->None :
+
+        session .last_active =self .clock ()
+        self .sessions .move_to_end (session .session_id )
+
+    def _draw_endless (self ,session :GameSession )->None :
+
+        rng =derive_stream (session .seed ,"questions",len (session .question_ids ))
+        question =self .bank .endless (
+        session .current_player .score ,session .categories ,set (session .question_ids ),rng ,
+        self .rules .endless_bands ,self .calibrator ,
+        self .calibrator .player_rating (session .current_player .name )if self .calibrator else None
+        )
+        if question is not None :
+            session .question_ids +=(question .id ,)
+
+    def _start_question (self ,session :GameSession )->None :
+
+        session .started_at =self .clock ()
+        session .answered =False
+        rng =derive_stream (session .seed ,"special",session .question_index )
+        session .is_special_round =rng .random ()<self .rules .special_round_chance
+
+    def current_question (self ,session :GameSession )->Optional [Question ]:
+
+        if session .question_index <len (session .question_ids ):
+            return self .bank .by_id [session .question_ids [session .question_index ]]
+        return None
+
+    def remaining_time (self ,session :GameSession )->float :
+
+        return max (0 ,DEFAULT_TIME_LIMIT -(self .clock ()-session .started_at ))
+
+    def submit_answer (self ,session_id :int ,answer :str |int |float )->dict :
+
+        session =self .sessions .get (session_id )
+        question =self .current_question (session )if session else None
+        if question is None or session .answered :
+            return {"error":"Няма активна игра или въпрос"}
+
+        self ._touch (session )
+        player =session .current_player
+        remaining_time =self .remaining_time (session )
+        is_correct =remaining_time >0 and question .check_answer (answer ,NUMERIC_TOLERANCE )
+        if self .calibrator :
+            self .calibrator .record (player .name ,question ,is_correct )
+        points =score_points (
+        (is_correct ,),(remaining_time ,),(question .difficulty ,),(session .is_special_round ,),self .rules
+        )[0 ]
+
+        player .total_answers +=1
+        if is_correct :
+            player .correct_answers +=1
+            player .score +=points
+        session .answered =True
+
+        result ={
+        "is_correct":is_correct ,
+        "correct_answer":question .correct_answer ,
+        "points":points ,
+        "total_score":player .score ,
+        "time_taken":DEFAULT_TIME_LIMIT -remaining_time ,
+        "is_special_round":session .is_special_round
+        }
+        if session .mode ==GameMode .ENDLESS and not is_correct :
+            session .game_over =True
+            result ["game_over"]=True
+        return result
+
+    def next_question (self ,session_id :int )->bool :
+
+        session =self .sessions .get (session_id )
+        if session is None or session .game_over :
+            return False
+
+        self ._touch (session )
+        session .question_index +=1
+        if session .mode ==GameMode .ENDLESS :
+            self ._draw_endless (session )
+        if session .question_index >=len (session .question_ids ):
+            session .game_over =True
+            return False
+        self ._start_question (session )
+        return True
+
+    def use_joker (self ,session_id :int ,joker_type :str )->dict :
+
+        session =self .sessions .get (session_id )
+        question =self .current_question (session )if session else None
+        if question is None :
+            return {"error":"Няма активна игра или въпрос"}
+        if session .is_special_round :
+            return {"error":"Жокерите не могат да се използват в специален рунд!"}
+
+        player =session .current_player
+        if player .joker_count (joker_type )<=0 :
+            return {"error":f"Нямате повече жокери от тип {JokerSystem .get_joker_name (joker_type )}!"}
+
+        self ._touch (session )
+        player .use_joker (joker_type )
+        rng =derive_stream (session .seed ,"jokers",session .question_index ,joker_type )
+        if joker_type ==JOKER_5050 :
+            return {"type":"5050","remaining_options":JokerSystem .apply_5050 (question ,rng )}
+        if joker_type ==JOKER_AUDIENCE :
+            return {"type":"audience","votes":JokerSystem .apply_audience_help (question ,rng )}
+        return {"error":"Непознат тип жокер"}
+
+    def end (self ,session_id :int ,record :bool =True )->dict :
+
+        session =self .sessions .pop (session_id ,None )
+        if session is None :
+            return {"error":"Няма активна игра"}
+
+        results ={"mode":session .mode .value ,"players":[]}
+        ranked =sorted (session .players ,key =lambda p :p .score ,reverse =True )
+        for rank ,player in enumerate (ranked ,start =1 ):
+            player_result ={
+            "rank":rank ,
+            "name":player .name ,
+            "score":player .score ,
+            "correct_answers":player .correct_answers ,
+            "total_answers":player .total_answers ,
+            "accuracy":player .correct_answers /player .total_answers *100 if player .total_answers else 0.0
+            }
+            if record :
+                highscore_rank =self .highscore_manager .add_score (
+                Player (player .name ,player .score ,player .correct_answers ,player .total_answers ,
+                dict (zip (JOKER_TYPES ,player .jokers ))),
+                session .mode
+                )
+                if highscore_rank :
+                    player_result ["highscore_rank"]=highscore_rank
+            results ["players"].append (player_result )
+        return results
+
+    def expire (self )->list [int ]:
+
+        cutoff =self .clock ()-self .idle_timeout
+        expired =[]
+        while self .sessions :
+            session =next (iter (self .sessions .values ()))
+            if session .last_active >cutoff :
+                break
+            self .sessions .popitem (last =False )
+            expired .append (session .session_id )
+        self .expired +=len (expired )
+        return expired
+
+    def get_stats (self )->dict :
+
+        return {"active":len (self .sessions ),"expired":self .expired ,"questions":len (self .bank .questions )}
@@ -0,0 +1,351 @@
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass ,field ,replace
+from typing import Optional
+
+from triviador.core.clock import VirtualClock
+from triviador.core.config import JOKER_5050 ,JOKER_AUDIENCE
+from triviador.core.models import GameMode ,Player ,Question ,QuestionType
+from triviador.logic.game_logic import GameLogic
+from triviador.logic.highscore_manager import HighScoreManager
+from triviador.logic.question_manager import QuestionManager
+from triviador.logic.scoring import ScoringRules ,DEFAULT_RULES
+
+
+JOKER_POLICY_NEVER ="never"
+JOKER_POLICY_HARD ="hard"
+JOKER_POLICY_EAGER ="eager"
+CHUNK_SIZE =2000
+
+
+@dataclass (frozen =True )
+class PlayerModel :
+
+    name :str ="average"
+    accuracy :tuple [float ,...]=(0.9 ,0.75 ,0.6 ,0.45 ,0.3 )
+    time_mean :float =8.0
+    time_sd :float =3.0
+    joker_policy :str =JOKER_POLICY_HARD
+    joker_difficulty :int =4
+    audience_trust :float =0.7
+
+    def knows (self ,question :Question ,rng :random .Random )->bool :
+
+        index =min (max (question .difficulty ,1 ),len (self .accuracy ))-1
+        return rng .random ()<self .accuracy [index ]
+
+    def answer_time (self ,rng :random .Random )->float :
+
+        return max (0.5 ,rng .gauss (self .time_mean ,self .time_sd ))
+
+    def pick_joker (self ,question :Question ,player :Player )->Optional [str ]:
+
+        if self .joker_policy ==JOKER_POLICY_NEVER :
+            return None
+        if self .joker_policy ==JOKER_POLICY_HARD and question .difficulty <self .joker_difficulty :
+            return None
+        for joker_type in (JOKER_5050 ,JOKER_AUDIENCE ):
+            if player .has_joker (joker_type ):
+                return joker_type
+        return None
+
+    def answer (self ,question :Question ,known :bool ,hint :dict ,rng :random .Random )->str |float :
+
+        if known :
+            return question .correct_answer
+
+        if hint .get ("type")=="audience"and rng .random ()<self .audience_trust :
+            votes =hint ["votes"]
+            if "suggested_value"in votes :
+                return votes ["suggested_value"]
+            return max (votes ,key =votes .get )
+
+        options =hint .get ("remaining_options",question .options )
+        if question .question_type ==QuestionType .NUMERIC :
+            if options :
+                low ,_ ,high =options [0 ].partition (" - ")
+                return rng .uniform (float (low ),float (high ))
+            return float (question .correct_answer )*rng .uniform (0.5 ,1.5 )
+        return rng .choice (options )
+
+
+PLAYER_MODELS ={
+"novice":PlayerModel ("novice",(0.7 ,0.5 ,0.35 ,0.2 ,0.1 ),11.0 ,4.0 ,JOKER_POLICY_EAGER ),
+"average":PlayerModel (),
+"expert":PlayerModel ("expert",(0.98 ,0.92 ,0.85 ,0.75 ,0.6 ),5.0 ,2.0 ,JOKER_POLICY_HARD ,5 ),
+}
+
+
+@dataclass
+class SimulationTask :
+
+    games :int
+    mode :GameMode
+    model :PlayerModel
+    rules :ScoringRules
+    seed :int
+
+
+@dataclass
+class SimulationReport :
+
+    mode :GameMode
+    model :PlayerModel
+    rules :ScoringRules
+    games :int =0
+    scores :Counter =field (default_factory =Counter )
+    survival :Counter =field (default_factory =Counter )
+    answered :int =0
+    correct :int =0
+    special_rounds :int =0
+    jokers_used :int =0
+    elapsed :float =0.0
+
+    def merge (self ,chunk :dict )->None :
+
+        self .games +=chunk ["games"]
+        self .scores .update (chunk ["scores"])
+        self .survival .update (chunk ["survival"])
+        self .answered +=chunk ["answered"]
+        self .correct +=chunk ["correct"]
+        self .special_rounds +=chunk ["special_rounds"]
+        self .jokers_used +=chunk ["jokers_used"]
+
+    @property
+    def mean_score (self )->float :
+
+        if not self .games :
+            return 0.0
+        return sum (score *count for score ,count in self .scores .items ())/self .games
+
+    @property
+    def stdev_score (self )->float :
+
+        if self .games <2 :
+            return 0.0
+        mean =self .mean_score
+        spread =sum (count *(score -mean )**2 for score ,count in self .scores .items ())
+        return (spread /(self .games -1 ))**0.5
+
+    @property
+    def accuracy (self )->float :
+
+        return self .correct /self .answered *100 if self .answered else 0.0
+
+    @property
+    def games_per_second (self )->float :
+
+        return self .games /self .elapsed if self .elapsed >0 else 0.0
+
+    def percentile (self ,q :float )->int :
+
+        target =q /100 *self .games
+        seen =0
+        for score in sorted (self .scores ):
+            seen +=self .scores [score ]
+            if seen >=target :
+                return score
+        return 0
+
+    def histogram (self ,bin_width :int =100 )->list [tuple [int ,int ]]:
+
+        bins :Counter =Counter ()
+        for score ,count in self .scores .items ():
+            bins [score //bin_width *bin_width ]+=count
+        return sorted (bins .items ())
+
+    def survival_curve (self )->list [float ]:
+
+        if not self .games :
+            return []
+        curve =[]
+        alive =self .games
+        for rounds in range (max (self .survival )+1 ):
+            curve .append (alive /self .games )
+            alive -=self .survival .get (rounds ,0 )
+        return curve
+
+
+_shared :Optional [tuple [QuestionManager ,HighScoreManager ]]=None
+
+
+def _init_worker ()->None :
+
+    global _shared
+    if _shared is None :
+        _shared =(QuestionManager (),HighScoreManager ())
+
+
+def play_game (logic :GameLogic ,clock :VirtualClock ,model :PlayerModel ,mode :GameMode ,
+rng :random .Random )->dict :
+
+    state =logic .start_game (mode ,[model .name ],seed =rng .getrandbits (63 ))
+    player =state .current_player
+    special_rounds =0
+    jokers_used =0
+
+    while not state .game_over :
+        question =logic .get_current_question ()
+        if question is None :
+            break
+
+        known =model .knows (question ,rng )
+        hint ={}
+        joker_type =None if known else model .pick_joker (question ,player )
+        if joker_type :
+            hint =logic .use_joker (joker_type )
+            if "error"in hint :
+                hint ={}
+            else :
+                jokers_used +=1
+
+        special_rounds +=state .is_special_round
+        clock .advance (model .answer_time (rng ))
+        logic .submit_answer (model .answer (question ,known ,hint ,rng ))
+        if not logic .next_question ():
+            break
+
+    return {
+    "score":player .score ,
+    "correct":player .correct_answers ,
+    "answered":player .total_answers ,
+    "special_rounds":special_rounds ,
+    "jokers_used":jokers_used
+    }
+
+
+def _run_chunk (task :SimulationTask )->dict :
+
+    _init_worker ()
+    question_manager ,highscore_manager =_shared
+    rng =random .Random (task .seed )
+    clock =VirtualClock ()
+    logic =GameLogic (question_manager ,highscore_manager ,task .rules ,clock )
+
+    chunk ={
+    "games":task .games ,
+    "scores":Counter (),
+    "survival":Counter (),
+    "answered":0 ,
+    "correct":0 ,
+    "special_rounds":0 ,
+    "jokers_used":0
+    }
+    for _ in range (task .games ):
+        game =play_game (logic ,clock ,task .model ,task .mode ,rng )
+        chunk ["scores"][game ["score"]]+=1
+        chunk ["survival"][game ["correct"]]+=1
+        for key in ("answered","correct","special_rounds","jokers_used"):
+            chunk [key ]+=game [key ]
+    return chunk
+
+
+def run_simulation (
+games :int ,
+mode :GameMode =GameMode .STANDARD ,
+model :PlayerModel =PLAYER_MODELS ["average"],
+rules :ScoringRules =DEFAULT_RULES ,
+workers :int =1 ,
+seed :int =0 ,
+chunk_size :int =CHUNK_SIZE
+)->SimulationReport :
+
+    tasks =[
+    SimulationTask (min (chunk_size ,games -start ),mode ,model ,rules ,seed *1_000_003 +index )
+    for index ,start in enumerate (range (0 ,games ,chunk_size ))
+    ]
+    report =SimulationReport (mode =mode ,model =model ,rules =rules )
+
+    started =time .perf_counter ()
+    if workers <=1 or len (tasks )==1 :
+        for chunk in map (_run_chunk ,tasks ):
+            report .merge (chunk )
+    else :
+        with ProcessPoolExecutor (max_workers =workers ,initializer =_init_worker )as pool :
+            for chunk in pool .map (_run_chunk ,tasks ):
+                report .merge (chunk )
+    report .elapsed =time .perf_counter ()-started
+    return report
+
+
+def sweep (parameter :str ,values :list ,games :int ,**kwargs )->list [tuple [object ,SimulationReport ]]:
+
+    rules =kwargs .pop ("rules",DEFAULT_RULES )
+    return [
+    (value ,run_simulation (games ,rules =replace (rules ,**{parameter :value }),**kwargs ))
+    for value in values
+    ]
+
+
+def _parse_value (parameter :str ,raw :str )->object :
+
+    if parameter =="endless_bands":
+        return tuple (int (band )for band in raw .split ("/"))
+    return type (getattr (DEFAULT_RULES ,parameter ))(raw )
+
+
+def _print_report (label :str ,report :SimulationReport ,bin_width :int )->None :
+
+    print (f"── {label }: {report .games } игри за {report .elapsed :.1f} с ({report .games_per_second :.0f}/с)")
+    print (f"   точки: средно {report .mean_score :.1f}, σ {report .stdev_score :.1f}, "
+    f"p10 {report .percentile (10 )}, p50 {report .percentile (50 )}, p90 {report .percentile (90 )}")
+    print (f"   точност: {report .accuracy :.1f}%, специални рундове: {report .special_rounds }, "
+    f"жокери: {report .jokers_used }")
+
+    histogram =report .histogram (bin_width )
+    peak =max ((count for _ ,count in histogram ),default =1 )
+    for start ,count in histogram :
+        print (f"   {start :>6} {count / report .games * 100 :6.2f}% {'█' * max (1 , count * 40 // peak )}")
+
+    if report .mode ==GameMode .ENDLESS :
+        curve =report .survival_curve ()
+        print ("   оцеляване: "+" ".join (f"{rounds }:{alive :.2f}"for rounds ,alive in enumerate (curve )))
+
+
+def main ()->None :
+
+    parser =argparse .ArgumentParser (description ="Симулация на игри по метода Монте Карло")
+    parser .add_argument ("--games",type =int ,default =100_000 )
+    parser .add_argument ("--mode",choices =[mode .value for mode in GameMode ],default =GameMode .STANDARD .value )
+    parser .add_argument ("--model",choices =sorted (PLAYER_MODELS ),default ="average")
+    parser .add_argument ("--workers",type =int ,default =os .cpu_count ()or 1 )
+    parser .add_argument ("--seed",type =int ,default =0 )
+    parser .add_argument ("--bin",type =int ,default =100 ,help ="ширина на интервала в хистограмата")
+    parser .add_argument ("--base-points",type =int )
+    parser .add_argument ("--time-bonus",type =float )
+    parser .add_argument ("--difficulty-multiplier",type =float )
+    parser .add_argument ("--special-chance",type =float )
+    parser .add_argument ("--bands",help ="прагове за безкраен режим, напр. 500/1500/3000")
+    parser .add_argument ("--sweep",help ="параметър=стойност1,стойност2,... (напр. time_bonus_multiplier=3,5,7)")
+    args =parser .parse_args ()
+
+    overrides ={
+    "base_points":args .base_points ,
+    "time_bonus_multiplier":args .time_bonus ,
+    "difficulty_multiplier":args .difficulty_multiplier ,
+    "special_round_chance":args .special_chance ,
+    "endless_bands":_parse_value ("endless_bands",args .bands )if args .bands else None
+    }
+    rules =replace (DEFAULT_RULES ,**{key :value for key ,value in overrides .items ()if value is not None })
+    options ={
+    "mode":GameMode (args .mode ),
+    "model":PLAYER_MODELS [args .model ],
+    "workers":args .workers ,
+    "seed":args .seed
+    }
+
+    if args .sweep :
+        parameter ,_ ,raw =args .sweep .partition ("=")
+        values =[_parse_value (parameter ,value )for value in raw .split (",")]
+        for value ,report in sweep (parameter ,values ,args .games ,rules =rules ,**options ):
+            _print_report (f"{parameter }={value }",report ,args .bin )
+    else :
+        _print_report (args .model ,run_simulation (args .games ,rules =rules ,**options ),args .bin )
+
+
+if __name__ =="__main__":
+    main ()
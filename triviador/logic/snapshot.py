@@ -0,0 +1,239 @@
+import os
+import struct
+import zlib
+from dataclasses import dataclass ,field
+from typing import Optional
+
+from triviador.core.config import SNAPSHOT_COMPACT_EVERY
+from triviador.core.models import GameMode
+
+
+SNAPSHOT_MAGIC =b"TRVS1"
+FLAG_SPECIAL =1
+FLAG_ANSWERED =2
+FLAG_GAME_OVER =4
+FLAG_SEED =8
+FLAG_ELIMINATED =1
+FLAG_CONNECTED =2
+
+_MODES =(GameMode .STANDARD ,GameMode .ENDLESS )
+_HEADER =struct .Struct ("<5sBBqHBI")
+_PLAYER =struct .Struct ("<iHHB")
+_FRAME =struct .Struct ("<II")
+
+
+@dataclass
+class PlayerSnapshot :
+
+    name :str
+    score :int =0
+    correct_answers :int =0
+    total_answers :int =0
+    jokers :dict =field (default_factory =dict )
+    player_id :str =""
+    session :str =""
+    eliminated :bool =False
+    connected :bool =True
+
+
+@dataclass
+class GameSnapshot :
+
+    mode :GameMode
+    question_ids :list [int ]
+    players :list [PlayerSnapshot ]
+    question_index :int =0
+    player_index :int =0
+    remaining_time :float =0.0
+    is_special_round :bool =False
+    answered :bool =False
+    game_over :bool =False
+    seed :Optional [int ]=None
+    categories :list [str ]=field (default_factory =list )
+    used_question_ids :list [int ]=field (default_factory =list )
+
+
+def _write_str (out :bytearray ,value :str )->None :
+
+    raw =value .encode ("utf-8")
+    out +=struct .pack ("<H",len (raw ))
+    out +=raw
+
+
+def _read_str (view :memoryview ,pos :int )->tuple [str ,int ]:
+
+    (length ,)=struct .unpack_from ("<H",view ,pos )
+    pos +=2
+    return bytes (view [pos :pos +length ]).decode ("utf-8"),pos +length
+
+
+def _write_ids (out :bytearray ,ids :list [int ])->None :
+
+    out +=struct .pack (f"<H{len (ids )}I",len (ids ),*ids )
+
+
+def _read_ids (view :memoryview ,pos :int )->tuple [list [int ],int ]:
+
+    (count ,)=struct .unpack_from ("<H",view ,pos )
+    pos +=2
+    return list (struct .unpack_from (f"<{count }I",view ,pos )),pos +4 *count
+
+
+def encode_snapshot (snapshot :GameSnapshot )->bytes :
+
+    flags =(
+    (FLAG_SPECIAL if snapshot .is_special_round else 0 )
+    |(FLAG_ANSWERED if snapshot .answered else 0 )
+    |(FLAG_GAME_OVER if snapshot .game_over else 0 )
+    |(FLAG_SEED if snapshot .seed is not None else 0 )
+    )
+    out =bytearray (_HEADER .pack (
+    SNAPSHOT_MAGIC ,flags ,_MODES .index (snapshot .mode ),snapshot .seed or 0 ,
+    snapshot .question_index ,snapshot .player_index ,int (max (0.0 ,snapshot .remaining_time )*1000 )
+    ))
+    _write_ids (out ,snapshot .question_ids )
+    _write_ids (out ,snapshot .used_question_ids )
+    out .append (len (snapshot .categories ))
+    for category in snapshot .categories :
+        _write_str (out ,category )
+
+    out .append (len (snapshot .players ))
+    for player in snapshot .players :
+        player_flags =(FLAG_ELIMINATED if player .eliminated else 0 )|(FLAG_CONNECTED if player .connected else 0 )
+        out +=_PLAYER .pack (player .score ,player .correct_answers ,player .total_answers ,player_flags )
+        _write_str (out ,player .name )
+        _write_str (out ,player .player_id )
+        _write_str (out ,player .session )
+        out .append (len (player .jokers ))
+        for joker_type ,count in player .jokers .items ():
+            _write_str (out ,joker_type )
+            out .append (count )
+    return bytes (out )
+
+
+def decode_snapshot (data :bytes )->GameSnapshot :
+
+    view =memoryview (data )
+    try :
+        magic ,flags ,mode ,seed ,question_index ,player_index ,remaining_ms =_HEADER .unpack_from (view ,0 )
+        if magic !=SNAPSHOT_MAGIC :
+            raise ValueError ("Невалидна моментна снимка на игра")
+        pos =_HEADER .size
+        question_ids ,pos =_read_ids (view ,pos )
+        used_question_ids ,pos =_read_ids (view ,pos )
+        categories =[]
+        count =view [pos ]
+        pos +=1
+        for _ in range (count ):
+            category ,pos =_read_str (view ,pos )
+            categories .append (category )
+
+        players =[]
+        count =view [pos ]
+        pos +=1
+        for _ in range (count ):
+            score ,correct ,total ,player_flags =_PLAYER .unpack_from (view ,pos )
+            pos +=_PLAYER .size
+            name ,pos =_read_str (view ,pos )
+            player_id ,pos =_read_str (view ,pos )
+            session ,pos =_read_str (view ,pos )
+            jokers ={}
+            joker_count =view [pos ]
+            pos +=1
+            for _ in range (joker_count ):
+                joker_type ,pos =_read_str (view ,pos )
+                jokers [joker_type ]=view [pos ]
+                pos +=1
+            players .append (PlayerSnapshot (
+            name ,score ,correct ,total ,jokers ,player_id ,session ,
+            bool (player_flags &FLAG_ELIMINATED ),bool (player_flags &FLAG_CONNECTED )
+            ))
+    except (struct .error ,IndexError ,UnicodeDecodeError )as e :
+        raise ValueError (f"Повредена моментна снимка на игра: {e }")from e
+
+    return GameSnapshot (
+    mode =_MODES [mode ],
+    question_ids =question_ids ,
+    players =players ,
+    question_index =question_index ,
+    player_index =player_index ,
+    remaining_time =remaining_ms /1000 ,
+    is_special_round =bool (flags &FLAG_SPECIAL ),
+    answered =bool (flags &FLAG_ANSWERED ),
+    game_over =bool (flags &FLAG_GAME_OVER ),
+    seed =seed if flags &FLAG_SEED else None ,
+    categories =categories ,
+    used_question_ids =used_question_ids
+    )
+
+
+class SnapshotJournal :
+
+
+    def __init__ (self ,path :str ,fsync :bool =False ,compact_every :int =SNAPSHOT_COMPACT_EVERY ):
+        self .path =path
+        self .fsync =fsync
+        self .compact_every =compact_every
+        self .file =open (path ,"ab")
+        self .frames =0
+        self .written =0
+
+    def append (self ,payload :bytes )->None :
+
+        if self .frames >=self .compact_every :
+            self ._compact (payload )
+            return
+        self .file .write (_FRAME .pack (len (payload ),zlib .crc32 (payload ))+payload )
+        self .file .flush ()
+        if self .fsync :
+            os .fsync (self .file .fileno ())
+        self .frames +=1
+        self .written +=1
+
+    def _compact (self ,payload :bytes )->None :
+
+        self .file .close ()
+        temp_path =f"{self .path }.tmp"
+        with open (temp_path ,"wb")as f :
+            f .write (_FRAME .pack (len (payload ),zlib .crc32 (payload ))+payload )
+            f .flush ()
+            if self .fsync :
+                os .fsync (f .fileno ())
+        os .replace (temp_path ,self .path )
+        self .file =open (self .path ,"ab")
+        self .frames =1
+        self .written +=1
+
+    def clear (self )->None :
+
+        self .file .close ()
+        try :
+            os .remove (self .path )
+        except FileNotFoundError :
+            pass
+        self .file =open (self .path ,"ab")
+        self .frames =0
+
+    def close (self )->None :
+
+        self .file .close ()
+
+
+def load_latest (path :str )->Optional [bytes ]:
+
+    try :
+        with open (path ,"rb")as f :
+            data =f .read ()
+    except FileNotFoundError :
+        return None
+
+    latest =None
+    pos =0
+    while pos +_FRAME .size <=len (data ):
+        length ,checksum =_FRAME .unpack_from (data ,pos )
+        payload =data [pos +_FRAME .size :pos +_FRAME .size +length ]
+        if len (payload )<length or zlib .crc32 (payload )!=checksum :
+            break
+        latest =payload
+        pos +=_FRAME .size +length
+    return latest
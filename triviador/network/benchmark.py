@@ -0,0 +1,221 @@
+import time
+import tracemalloc
+from typing import Optional
+
+from triviador.core.models import Question
+from triviador.logic.question_manager import QuestionManager
+from triviador.network.protocol import (
+NetworkMessage ,MessageTypes ,FrameDecoder ,Compressor ,
+CODEC_JSON ,CODEC_BINARY ,encode_message
+)
+from triviador.network.network import Connection
+
+
+BENCH_VARIANTS =[
+(CODEC_JSON ,CODEC_JSON ,False ),
+(CODEC_BINARY ,CODEC_BINARY ,False ),
+("binary+zlib",CODEC_BINARY ,True ),
+]
+
+
+def question_payload (question :Question ,question_number :int =3 ,total_questions :int =10 )->dict :
+
+    return {
+    "text":question .question_text ,
+    "options":question .options ,
+    "question_type":question .question_type .value ,
+    "category":question .category ,
+    "difficulty":question .difficulty ,
+    "question_number":question_number ,
+    "total_questions":total_questions ,
+    "is_special_round":False ,
+    "game_mode":"standard",
+    "eliminated_players":[]
+    }
+
+
+def build_round_messages (question :Question ,player_count :int =4 )->list [tuple [NetworkMessage ,int ]]:
+
+    fanout =player_count -1
+    players =[{"id":f"192.168.1.{10 + i }:{50000 + i }","name":f"Играч {i + 1 }"}
+    for i in range (player_count )]
+
+    question_data =question_payload (question )
+    messages =[(NetworkMessage (type =MessageTypes .QUESTION ,data =question_data ),fanout )]
+
+    answer =question .options [0 ]if question .options else str (question .correct_answer )
+    for i in range (fanout ):
+        messages .append ((NetworkMessage (
+        type =MessageTypes .ANSWER ,
+        data ={"answer":answer ,"time":4.25 +i }
+        ),1 ))
+
+    player_results =[]
+    for i ,player in enumerate (players ):
+        player_results .append ({
+        "player_id":player ["id"],
+        "name":player ["name"],
+        "answer":answer ,
+        "is_correct":i %2 ==0 ,
+        "points":180 if i %2 ==0 else 0 ,
+        "total_score":540 +i *10
+        })
+    messages .append ((NetworkMessage (
+    type =MessageTypes .ANSWER_RESULT ,
+    data ={
+    "correct_answer":question .correct_answer ,
+    "player_results":player_results ,
+    "is_special_round":False
+    }
+    ),fanout ))
+    return messages
+
+
+def bytes_per_round (messages :list [tuple [NetworkMessage ,int ]],codec :str ,
+compressor :Optional [Compressor ]=None )->int :
+
+    return sum (len (encode_message (message ,codec ,compressor ))*fanout for message ,fanout in messages )
+
+
+def time_codec (messages :list [tuple [NetworkMessage ,int ]],codec :str ,repeat :int =1000 ,
+compress :bool =False )->tuple [float ,float ]:
+
+    plain =[message for message ,_ in messages ]
+    compressor =Compressor ()if compress else None
+    frames =[]
+    start =time .perf_counter ()
+    for _ in range (repeat ):
+        for message in plain :
+            frames .append (encode_message (message ,codec ,compressor ))
+    encode_time =time .perf_counter ()-start
+
+    decoder =FrameDecoder ()
+    start =time .perf_counter ()
+    for frame in frames :
+        decoder .feed (frame )
+    decode_time =time .perf_counter ()-start
+
+    count =len (frames )
+    return encode_time /count *1e6 ,decode_time /count *1e6
+
+
+class _SinkSocket :
+
+
+    def __init__ (self ):
+        self .sent :Optional [list ]=None
+
+    def _keep (self ,data )->int :
+
+        if self .sent is not None :
+            self .sent .append (data .obj if isinstance (data ,memoryview )else data )
+        return len (data )
+
+    def sendall (self ,data )->None :
+
+        self ._keep (data )
+
+    def sendmsg (self ,buffers )->int :
+
+        return sum (self ._keep (data )for data in buffers )
+
+
+def _peak_bytes (sends :list )->int :
+
+    tracemalloc .start ()
+    try :
+        total =0
+        for send in sends :
+            current =tracemalloc .get_traced_memory ()[0 ]
+            tracemalloc .reset_peak ()
+            send ()
+            total +=tracemalloc .get_traced_memory ()[1 ]-current
+    finally :
+        tracemalloc .stop ()
+    return total
+
+
+def broadcast_allocations (message :NetworkMessage ,codec :str ,client_count :int =8 )->dict :
+
+    sinks =[_SinkSocket ()for _ in range (client_count )]
+    connections =[Connection (sink )for sink in sinks ]
+    for connection in connections :
+        connection .codec =codec
+        connection .send (message )
+
+    def concatenated ()->list :
+        return [lambda connection =connection :connection .send_parts ((encode_message (message ,codec ),),message .type )
+        for connection in connections ]
+
+    def shared ()->list :
+        cache ={}
+        return [lambda connection =connection :connection .send (message ,cache )for connection in connections ]
+
+    report ={}
+    for label ,sends in (("concat",concatenated ),("shared",shared )):
+        allocated =_peak_bytes (sends ())
+        for sink in sinks :
+            sink .sent =[]
+        for send in sends ():
+            send ()
+        buffers ={id (data ):len (data )for sink in sinks for data in sink .sent }
+        for sink in sinks :
+            sink .sent =None
+        report [label ]={"bytes":allocated /client_count ,"wire_bytes":sum (buffers .values ())/client_count }
+    return report
+
+
+def run_benchmark (player_count :int =4 ,repeat :int =1000 ,question_count :int =20 ,
+question_manager :Optional [QuestionManager ]=None )->dict :
+
+    question_manager =question_manager or QuestionManager ()
+    questions =question_manager .get_random_questions (question_count )
+
+    report ={}
+    for label ,codec ,compress in BENCH_VARIANTS :
+        compressor =Compressor ()if compress else None
+        total_bytes =0
+        encode_us =0.0
+        decode_us =0.0
+        for question in questions :
+            messages =build_round_messages (question ,player_count )
+            total_bytes +=bytes_per_round (messages ,codec ,compressor )
+            enc ,dec =time_codec (messages ,codec ,max (1 ,repeat //len (questions )),compress )
+            encode_us +=enc
+            decode_us +=dec
+        report [label ]={
+        "bytes_per_round":total_bytes /len (questions ),
+        "encode_us":encode_us /len (questions ),
+        "decode_us":decode_us /len (questions )
+        }
+        if not compress :
+            allocations =broadcast_allocations (build_round_messages (questions [0 ],player_count )[0 ][0 ],codec ,
+            max (1 ,player_count -1 ))
+            for path ,row in allocations .items ():
+                report [label ][f"{path }_bytes"]=row ["bytes"]
+                report [label ][f"{path }_wire"]=row ["wire_bytes"]
+    return report
+
+
+def main (player_count :int =4 )->None :
+
+    report =run_benchmark (player_count )
+    print (f"играчи: {player_count }")
+    baseline =report [CODEC_JSON ]["bytes_per_round"]
+    print (f"{'кодек':<14}{'байта/рунд':>14}{'спрямо json':>14}{'encode µs':>12}{'decode µs':>12}")
+    for codec ,row in report .items ():
+        ratio =row ["bytes_per_round"]/baseline
+        print (f"{codec :<14}{row ['bytes_per_round']:>14.0f}{ratio :>14.2f}"
+        f"{row ['encode_us']:>12.2f}{row ['decode_us']:>12.2f}")
+
+    print ()
+    print ("заделени байтове на клиент при broadcast на въпрос (алокации / уникални буфери)")
+    print (f"{'кодек':<14}{'concat B':>12}{'concat буф.':>12}{'shared B':>12}{'shared буф.':>12}")
+    for codec ,row in report .items ():
+        if "shared_bytes"in row :
+            print (f"{codec :<14}{row ['concat_bytes']:>12.0f}{row ['concat_wire']:>12.0f}"
+            f"{row ['shared_bytes']:>12.0f}{row ['shared_wire']:>12.0f}")
+
+
+if __name__ =="__main__":
+    main ()
@@ -0,0 +1,235 @@
+import json
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable ,Optional
+
+try :
+    import fcntl
+except ImportError :
+    fcntl =None
+
+from triviador.core.config import DISCOVERY_PORT ,BEACON_INTERVAL ,LOBBY_TTL
+
+
+BEACON_MAGIC =b"TRVB1"
+MAX_BEACON_SIZE =1024
+
+_SIOCGIFADDR =0x8915
+
+
+def _interface_address (sock :socket .socket ,name :str )->Optional [str ]:
+
+    try :
+        packed =fcntl .ioctl (sock .fileno (),_SIOCGIFADDR ,struct .pack ("256s",name [:15 ].encode ("utf-8")))
+    except OSError :
+        return None
+    return socket .inet_ntoa (packed [20 :24 ])
+
+
+def get_local_addresses ()->list [str ]:
+
+    addresses =[]
+    if fcntl is not None and hasattr (socket ,"if_nameindex"):
+        try :
+            with socket .socket (socket .AF_INET ,socket .SOCK_DGRAM )as sock :
+                for _ ,name in socket .if_nameindex ():
+                    address =_interface_address (sock ,name )
+                    if address :
+                        addresses .append (address )
+        except OSError :
+            pass
+    try :
+        for info in socket .getaddrinfo (socket .gethostname (),None ,socket .AF_INET ):
+            addresses .append (info [4 ][0 ])
+    except OSError :
+        pass
+
+    unique =list (dict .fromkeys (addresses ))
+    return sorted (unique ,key =lambda ip :(ip .startswith ("127."),ip .startswith ("169.254.")))
+
+
+def get_local_ip ()->str :
+
+    for address in get_local_addresses ():
+        if not address .startswith (("127.","169.254.")):
+            return address
+    return "127.0.0.1"
+
+
+def encode_beacon (info :dict )->bytes :
+
+    return BEACON_MAGIC +json .dumps (info ,ensure_ascii =False ,separators =(",",":")).encode ("utf-8")
+
+
+def decode_beacon (data :bytes )->Optional [dict ]:
+
+    if not data .startswith (BEACON_MAGIC )or len (data )>MAX_BEACON_SIZE :
+        return None
+    try :
+        info =json .loads (data [len (BEACON_MAGIC ):].decode ("utf-8"))
+    except ValueError :
+        return None
+    if not isinstance (info ,dict )or not isinstance (info .get ("port"),int ):
+        return None
+    return info
+
+
+@dataclass
+class LobbyInfo :
+
+    address :str
+    port :int
+    name :str
+    players :int
+    max_players :int
+    mode :str
+    started :bool
+    last_seen :float
+
+    @property
+    def full (self )->bool :
+        return self .players >=self .max_players
+
+    @property
+    def joinable (self )->bool :
+        return not self .full and not self .started
+
+
+class BeaconBroadcaster :
+
+
+    def __init__ (self ,source :Callable [[],dict ],port :int =DISCOVERY_PORT ,
+    interval :float =BEACON_INTERVAL ,targets :Optional [list [tuple [str ,int ]]]=None ):
+        self .source =source
+        self .interval =interval
+        self .targets =targets or [("<broadcast>",port )]
+        self .sock :Optional [socket .socket ]=None
+        self .running =False
+        self .wake =threading .Event ()
+
+    def start (self )->bool :
+
+        try :
+            self .sock =socket .socket (socket .AF_INET ,socket .SOCK_DGRAM )
+            self .sock .setsockopt (socket .SOL_SOCKET ,socket .SO_BROADCAST ,1 )
+        except OSError as e :
+            print (f"Грешка при стартиране на обявяването: {e }")
+            return False
+        self .running =True
+        threading .Thread (target =self ._loop ,daemon =True ).start ()
+        return True
+
+    def _send (self ,info :dict )->None :
+
+        data =encode_beacon (info )
+        for target in self .targets :
+            try :
+                self .sock .sendto (data ,target )
+            except OSError :
+                pass
+
+    def _loop (self )->None :
+
+        while self .running :
+            self ._send (self .source ())
+            self .wake .wait (self .interval )
+            self .wake .clear ()
+
+    def announce (self )->None :
+
+        self .wake .set ()
+
+    def stop (self )->None :
+
+        if not self .running :
+            return
+        self .running =False
+        self .wake .set ()
+        self ._send (dict (self .source (),closed =True ))
+        try :
+            self .sock .close ()
+        except OSError :
+            pass
+
+
+class LobbyBrowser :
+
+
+    def __init__ (self ,port :int =DISCOVERY_PORT ,ttl :float =LOBBY_TTL ):
+        self .port =port
+        self .ttl =ttl
+        self .sock :Optional [socket .socket ]=None
+        self .running =False
+        self .lock =threading .Lock ()
+        self .lobbies :dict [tuple [str ,int ],LobbyInfo ]={}
+
+    def start (self )->bool :
+
+        try :
+            self .sock =socket .socket (socket .AF_INET ,socket .SOCK_DGRAM )
+            self .sock .setsockopt (socket .SOL_SOCKET ,socket .SO_REUSEADDR ,1 )
+            if hasattr (socket ,"SO_REUSEPORT"):
+                self .sock .setsockopt (socket .SOL_SOCKET ,socket .SO_REUSEPORT ,1 )
+            self .sock .bind (("",self .port ))
+            self .sock .settimeout (0.5 )
+        except OSError as e :
+            print (f"Грешка при търсене на игри: {e }")
+            return False
+        self .running =True
+        threading .Thread (target =self ._loop ,daemon =True ).start ()
+        return True
+
+    def _loop (self )->None :
+
+        while self .running :
+            try :
+                data ,(address ,_ )=self .sock .recvfrom (MAX_BEACON_SIZE +1 )
+            except socket .timeout :
+                continue
+            except OSError :
+                break
+            info =decode_beacon (data )
+            if info is None :
+                continue
+            try :
+                self .update (address ,info )
+            except (TypeError ,ValueError ):
+                continue
+
+    def update (self ,address :str ,info :dict ,now :Optional [float ]=None )->None :
+
+        key =(address ,info ["port"])
+        with self .lock :
+            if info .get ("closed"):
+                self .lobbies .pop (key ,None )
+                return
+            self .lobbies [key ]=LobbyInfo (
+            address =address ,
+            port =info ["port"],
+            name =str (info .get ("name","")),
+            players =int (info .get ("players",0 )),
+            max_players =int (info .get ("max",0 )),
+            mode =str (info .get ("mode","")),
+            started =bool (info .get ("started",False )),
+            last_seen =time .time ()if now is None else now
+            )
+
+    def get_lobbies (self ,now :Optional [float ]=None )->list [LobbyInfo ]:
+
+        now =time .time ()if now is None else now
+        with self .lock :
+            for key in [key for key ,lobby in self .lobbies .items ()if now -lobby .last_seen >self .ttl ]:
+                del self .lobbies [key ]
+            return sorted (self .lobbies .values (),key =lambda lobby :(lobby .name ,lobby .address ,lobby .port ))
+
+    def stop (self )->None :
+
+        self .running =False
+        if self .sock :
+            try :
+                self .sock .close ()
+            except OSError :
+                pass
@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from triviador.core.config import (
+BASE_POINTS ,BUFFER_SIZE ,DEFAULT_TIME_LIMIT ,JOKERS_PER_GAME ,MAX_PLAYERS
+)
+from triviador.logic.question_manager import QuestionManager
+from triviador.network.benchmark import question_payload
+from triviador.network.network import GameLobby
+from triviador.network.prefetch import open_question
+from triviador.network.protocol import (
+NetworkMessage ,MessageTypes ,FrameDecoder ,Compressor ,ProtocolError ,
+CODEC_JSON ,SUPPORTED_CODECS ,SUPPORTED_COMPRESSION ,COMPRESSION_ZLIB ,
+SUPPORTED_FEATURES ,encode_parts
+)
+
+
+RESULT_GRACE =2.0
+
+
+@dataclass
+class BotProfile :
+
+    latency_mean :float =2.0
+    latency_jitter :float =1.0
+    accuracy :float =0.6
+    accuracy_spread :float =0.2
+    joker_rate :float =0.1
+
+
+def percentile (values :list [float ],p :float )->float :
+
+    if not values :
+        return 0.0
+    ordered =sorted (values )
+    rank =(len (ordered )-1 )*p /100
+    low =int (rank )
+    high =min (low +1 ,len (ordered )-1 )
+    return ordered [low ]+(ordered [high ]-ordered [low ])*(rank -low )
+
+
+def summarize (values :list [float ])->dict :
+
+    return {
+    "count":len (values ),
+    "p50_ms":percentile (values ,50 )*1000 ,
+    "p90_ms":percentile (values ,90 )*1000 ,
+    "p99_ms":percentile (values ,99 )*1000 ,
+    "max_ms":max (values )*1000 if values else 0.0
+    }
+
+
+class LoadReport :
+
+
+    def __init__ (self ):
+        self .lock =threading .Lock ()
+        self .samples :dict [str ,list [float ]]={
+        "join":[],"result":[],"joker":[]
+        }
+        self .question_starts :dict [tuple [int ,int ],list [float ]]={}
+        self .results_sent :dict [tuple [int ,int ],float ]={}
+        self .errors :dict [str ,int ]={}
+        self .bots =0
+        self .answers =0
+
+    def add_sample (self ,metric :str ,value :float )->None :
+
+        with self .lock :
+            self .samples [metric ].append (value )
+
+    def add_question_start (self ,lobby :int ,round_number :int ,started_at :float )->None :
+
+        with self .lock :
+            self .question_starts .setdefault ((lobby ,round_number ),[]).append (started_at )
+
+    def add_error (self ,kind :str )->None :
+
+        with self .lock :
+            self .errors [kind ]=self .errors .get (kind ,0 )+1
+
+    def fanout_skews (self )->list [float ]:
+
+        with self .lock :
+            return [max (starts )-min (starts )for starts in self .question_starts .values ()if len (starts )>1 ]
+
+    def snapshot (self )->dict :
+
+        skews =self .fanout_skews ()
+        with self .lock :
+            error_count =sum (self .errors .values ())
+            return {
+            "bots":self .bots ,
+            "answers":self .answers ,
+            "join_latency":summarize (self .samples ["join"]),
+            "fanout_skew":summarize (skews ),
+            "result_latency":summarize (self .samples ["result"]),
+            "joker_latency":summarize (self .samples ["joker"]),
+            "errors":dict (self .errors ),
+            "error_rate":error_count /self .bots if self .bots else 0.0
+            }
+
+
+class HeadlessHost :
+
+
+    def __init__ (self ,index :int ,port :int ,report :LoadReport ,lobby_size :int =MAX_PLAYERS ):
+        self .index =index
+        self .port =port
+        self .report =report
+        self .lobby =GameLobby (is_host =True ,max_players =lobby_size )
+        self .answer_key :dict [int ,str ]={}
+
+    def start (self )->bool :
+
+        if not self .lobby .host_game (f"Хост {self .index + 1 }",port =self .port ,announce =False ):
+            return False
+        self .port =self .lobby .server .port
+        return True
+
+    def _wait (self ,predicate ,timeout :float )->bool :
+
+        deadline =time .time ()+timeout
+        while time .time ()<deadline :
+            self .lobby .pump ()
+            if predicate ():
+                return True
+            time .sleep (0.005 )
+        return predicate ()
+
+    def run_game (self ,questions :list [dict ],bot_count :int ,join_timeout :float )->None :
+
+        self ._wait (lambda :len (self .lobby .players )>=bot_count +1 ,join_timeout )
+        if not self .lobby .start_game ():
+            self .report .add_error ("lobby_not_started")
+            return
+
+        total =len (questions )
+        for number ,question in enumerate (questions ,start =1 ):
+            self .answer_key [number ]=str (question ["correct_answer"])
+            if number ==1 :
+                self .lobby .prefetch_question (number ,question )
+            self .lobby .reveal_question (number )
+            if number <total :
+                self .answer_key [number +1 ]=str (questions [number ]["correct_answer"])
+                self .lobby .prefetch_question (number +1 ,questions [number ])
+            self .lobby .submit_answer (self .answer_key [number ])
+            if not self ._wait (lambda :self .lobby .all_answers_received ,DEFAULT_TIME_LIMIT +RESULT_GRACE ):
+                self .report .add_error ("round_timeout")
+            self ._send_results (number ,question )
+
+        self .lobby .send_game_end ([{"name":p .name ,"score":p .score }
+        for p in self .lobby .get_players_list ()])
+
+    def _send_results (self ,number :int ,question :dict )->None :
+
+        correct =self .answer_key [number ]
+        player_results =[]
+        for player in self .lobby .get_players_list ():
+            answer =player .current_answer or ""
+            is_correct =answer ==correct
+            points =BASE_POINTS if is_correct else 0
+            player .score +=points
+            player_results .append ({
+            "player_id":player .id ,
+            "name":player .name ,
+            "answer":answer ,
+            "is_correct":is_correct ,
+            "points":points ,
+            "total_score":player .score
+            })
+        with self .report .lock :
+            self .report .results_sent [(self .index ,number )]=time .time ()
+        self .lobby .send_answer_results ({
+        "correct_answer":question ["correct_answer"],
+        "player_results":player_results ,
+        "is_special_round":False
+        })
+
+    def close (self )->None :
+
+        self .lobby .close ()
+
+
+class Bot :
+
+
+    def __init__ (self ,name :str ,lobby :int ,address :tuple [str ,int ],profile :BotProfile ,
+    answer_key :dict [int ,str ],report :LoadReport ,rng :random .Random ):
+        self .name =name
+        self .lobby =lobby
+        self .address =address
+        self .profile =profile
+        self .answer_key =answer_key
+        self .report =report
+        self .rng =rng
+        self .accuracy =min (1.0 ,max (0.0 ,rng .uniform (profile .accuracy -profile .accuracy_spread ,
+        profile .accuracy +profile .accuracy_spread )))
+        self .writer :Optional [asyncio .StreamWriter ]=None
+        self .codec =CODEC_JSON
+        self .compressor :Optional [Compressor ]=None
+        self .prefetched :dict [int ,str ]={}
+        self .jokers =JOKERS_PER_GAME .copy ()
+        self .round =0
+        self .join_started =0.0
+        self .joker_sent_at =0.0
+        self .tasks :set [asyncio .Task ]=set ()
+        self .finished =False
+
+    async def run (self ,timeout :float )->None :
+
+        self .join_started =time .time ()
+        try :
+            reader ,self .writer =await asyncio .open_connection (*self .address )
+        except OSError :
+            self .report .add_error ("connect_failed")
+            return
+
+        await self .send (MessageTypes .JOIN_GAME ,{
+        "name":self .name ,
+        "codecs":SUPPORTED_CODECS ,
+        "compression":SUPPORTED_COMPRESSION ,
+        "features":SUPPORTED_FEATURES
+        })
+        decoder =FrameDecoder ()
+        try :
+            await asyncio .wait_for (self ._read_loop (reader ,decoder ),timeout )
+        except asyncio .TimeoutError :
+            self .report .add_error ("timeout")
+        except (OSError ,ProtocolError ,ValueError ):
+            self .report .add_error ("protocol")
+        finally :
+            for task in list (self .tasks ):
+                task .cancel ()
+            self .writer .close ()
+
+    async def _read_loop (self ,reader :asyncio .StreamReader ,decoder :FrameDecoder )->None :
+
+        while not self .finished :
+            data =await reader .read (BUFFER_SIZE )
+            if not data :
+                self .report .add_error ("disconnected")
+                return
+            for message in decoder .feed (data ):
+                await self .handle (message )
+        if self .tasks :
+            await asyncio .gather (*self .tasks )
+
+    async def send (self ,msg_type :str ,data :dict )->None :
+
+        self .writer .writelines (encode_parts (NetworkMessage (type =msg_type ,data =data ),self .codec ,self .compressor ))
+        await self .writer .drain ()
+
+    def _spawn (self ,coroutine )->None :
+
+        task =asyncio .ensure_future (coroutine )
+        self .tasks .add (task )
+        task .add_done_callback (self .tasks .discard )
+
+    async def handle (self ,message :NetworkMessage )->None :
+
+        data =message .data
+        if message .type ==MessageTypes .PLAYER_JOINED and "your_id"in data :
+            self .report .add_sample ("join",time .time ()-self .join_started )
+            self .codec =data .get ("codec",CODEC_JSON )
+            if data .get ("compression")==COMPRESSION_ZLIB :
+                self .compressor =Compressor ()
+
+        elif message .type ==MessageTypes .QUESTION_PREFETCH :
+            self .prefetched [data ["round"]]=data ["blob"]
+
+        elif message .type ==MessageTypes .QUESTION_REVEAL :
+            round_number =data .get ("round")
+            blob =self .prefetched .pop (round_number ,None )
+            if blob is None :
+                self .report .add_error ("missing_prefetch")
+                return
+            question =open_question (blob ,data .get ("key",""))
+            self ._spawn (self ._play_round (round_number ,question ,data .get ("start_in",0 )/1000 ))
+
+        elif message .type ==MessageTypes .QUESTION :
+            self ._spawn (self ._play_round (data .get ("question_number",self .round +1 ),data ,0 ))
+
+        elif message .type ==MessageTypes .PING :
+            await self .send (MessageTypes .PONG ,{"t":data .get ("t"),"peer":time .time ()})
+
+        elif message .type ==MessageTypes .JOKER_RESULT :
+            if "error"in data :
+                self .report .add_error ("joker_rejected")
+            else :
+                self .report .add_sample ("joker",time .time ()-self .joker_sent_at )
+
+        elif message .type ==MessageTypes .ANSWER_RESULT :
+            sent_at =self .report .results_sent .get ((self .lobby ,self .round ))
+            if sent_at is not None :
+                self .report .add_sample ("result",time .time ()-sent_at )
+
+        elif message .type ==MessageTypes .GAME_END :
+            self .finished =True
+
+        elif message .type ==MessageTypes .ERROR :
+            self .report .add_error ("server_error")
+
+    async def _play_round (self ,round_number :int ,question :dict ,delay :float )->None :
+
+        await asyncio .sleep (max (0.0 ,delay ))
+        self .round =round_number
+        started =time .time ()
+        self .report .add_question_start (self .lobby ,round_number ,started )
+
+        available =[joker for joker ,count in self .jokers .items ()if count >0 ]
+        if available and question .get ("options")and self .rng .random ()<self .profile .joker_rate :
+            joker_type =self .rng .choice (available )
+            self .jokers [joker_type ]-=1
+            self .joker_sent_at =time .time ()
+            await self .send (MessageTypes .USE_JOKER ,{"joker_type":joker_type })
+
+        latency =max (0.0 ,self .rng .gauss (self .profile .latency_mean ,self .profile .latency_jitter ))
+        await asyncio .sleep (min (latency ,DEFAULT_TIME_LIMIT ))
+        correct =self .answer_key .get (round_number ,"")
+        if self .rng .random ()<self .accuracy :
+            answer =correct
+        else :
+            wrong =[option for option in question .get ("options",[])if option !=correct ]
+            answer =self .rng .choice (wrong )if wrong else ""
+        await self .send (MessageTypes .ANSWER ,{
+        "answer":answer ,
+        "time":time .time ()-started ,
+        "answered_at":time .time ()
+        })
+        with self .report .lock :
+            self .report .answers +=1
+
+
+async def run_swarm (bots :list [Bot ],timeout :float )->None :
+
+    await asyncio .gather (*(bot .run (timeout )for bot in bots ))
+
+
+def run_load (bot_count :int =30 ,rounds :int =3 ,port :int =6000 ,profile :Optional [BotProfile ]=None ,
+seed :int =0 ,question_manager :Optional [QuestionManager ]=None ,lobby_size :int =MAX_PLAYERS )->dict :
+
+    profile =profile or BotProfile ()
+    question_manager =question_manager or QuestionManager ()
+    rng =random .Random (seed )
+    report =LoadReport ()
+    report .bots =bot_count
+
+    per_lobby =max (1 ,lobby_size -1 )
+    lobby_count =(bot_count +per_lobby -1 )//per_lobby
+    hosts =[]
+    for index in range (lobby_count ):
+        host =HeadlessHost (index ,port +index if port else 0 ,report ,lobby_size )
+        if not host .start ():
+            report .add_error ("host_failed")
+            continue
+        hosts .append (host )
+
+    bots =[]
+    threads =[]
+    remaining =bot_count
+    for host in hosts :
+        seats =min (per_lobby ,remaining )
+        remaining -=seats
+        questions =[dict (question_payload (q ,number ,rounds ),correct_answer =q .correct_answer )
+        for number ,q in enumerate (question_manager .get_random_questions (rounds ,rng =rng ),start =1 )]
+        for seat in range (seats ):
+            bots .append (Bot (f"Бот {host .index }-{seat }",host .index ,("127.0.0.1",host .port ),
+            profile ,host .answer_key ,report ,random .Random (rng .random ())))
+        thread =threading .Thread (target =host .run_game ,args =(questions ,seats ,10.0 ),daemon =True )
+        thread .start ()
+        threads .append (thread )
+
+    timeout =10.0 +rounds *(DEFAULT_TIME_LIMIT +RESULT_GRACE )
+    try :
+        asyncio .run (run_swarm (bots ,timeout ))
+        for thread in threads :
+            thread .join (RESULT_GRACE )
+    finally :
+        for host in hosts :
+            host .close ()
+    return report .snapshot ()
+
+
+def main ()->None :
+
+    parser =argparse .ArgumentParser (description ="Натоварващ тест за мрежовия сървър")
+    parser .add_argument ("--bots",type =int ,default =30 )
+    parser .add_argument ("--rounds",type =int ,default =3 )
+    parser .add_argument ("--port",type =int ,default =6000 ,help ="първи порт; 0 избира свободни портове")
+    parser .add_argument ("--lobby-size",type =int ,default =MAX_PLAYERS )
+    parser .add_argument ("--latency",type =float ,default =2.0 )
+    parser .add_argument ("--jitter",type =float ,default =1.0 )
+    parser .add_argument ("--accuracy",type =float ,default =0.6 )
+    parser .add_argument ("--joker-rate",type =float ,default =0.1 )
+    parser .add_argument ("--seed",type =int ,default =0 )
+    args =parser .parse_args ()
+
+    profile =BotProfile (args .latency ,args .jitter ,args .accuracy ,joker_rate =args .joker_rate )
+    report =run_load (args .bots ,args .rounds ,args .port ,profile ,args .seed ,lobby_size =args .lobby_size )
+
+    print (f"ботове: {report ['bots']}, отговори: {report ['answers']}, грешки: {report ['error_rate']:.1%}")
+    print (f"{'метрика':<16}{'брой':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for metric in ("join_latency","fanout_skew","result_latency","joker_latency"):
+        row =report [metric ]
+        print (f"{metric :<16}{row ['count']:>8}{row ['p50_ms']:>10.2f}{row ['p90_ms']:>10.2f}"
+        f"{row ['p99_ms']:>10.2f}{row ['max_ms']:>10.2f}")
+    for kind ,count in sorted (report ["errors"].items ()):
+        print (f"  {kind }: {count }")
+
+
+if __name__ =="__main__":
+    main ()
@@ -1,36 +1,44 @@
+import secrets
 import socket
 import threading
-import json
 import time
 from typing import Callable ,Optional
 from dataclasses import dataclass ,field
-from queue import Queue
-
-from triviador.core.config import DEFAULT_PORT ,BUFFER_SIZE
-
-
-@dataclass
-class NetworkMessage :
-
-    type :str
-    data :dict
-    sender_id :Optional [str ]=None
-
-    def to_json (self )->str :
-        return json .dumps ({
-        "type":self .type ,
-        "data":self .data ,
-        "sender_id":self .sender_id
-        })
-
-    @classmethod
-    def from_json (cls ,json_str :str )->"NetworkMessage":
-        data =json .loads (json_str )
-        return cls (
-        type =data ["type"],
-        data =data ["data"],
-        sender_id =data .get ("sender_id")
-        )
+from collections import deque
+
+from triviador.core.config import (
+DEFAULT_PORT ,BUFFER_SIZE ,REVEAL_LEAD_TIME ,PING_INTERVAL ,DEFAULT_TIME_LIMIT ,
+RECONNECT_ATTEMPTS ,RECONNECT_DELAY ,PUMP_BUDGET ,STATS_DUMP_INTERVAL ,MAX_PLAYERS ,MODE_STANDARD ,
+ROUND_DEADLINE_GRACE ,LOBBY_IDLE_TIMEOUT ,SEND_QUEUE_LIMIT
+)
+from triviador.network.protocol import (
+NetworkMessage ,MessageTypes ,FrameDecoder ,ProtocolError ,Compressor ,
+CODEC_JSON ,SUPPORTED_CODECS ,SUPPORTED_COMPRESSION ,COMPRESSION_ZLIB ,
+SUPPORTED_FEATURES ,FEATURE_PREFETCH ,FEATURE_PING ,FEATURE_SYNC ,ROLE_PLAYER ,ROLE_RELAY ,
+encode_parts ,negotiate_codec ,negotiate_compression
+)
+from triviador.network.stats import NetworkStats ,PumpStats ,StatsDumper ,StatsSocket
+from triviador.network.timesync import LinkEstimator
+from triviador.network.discovery import BeaconBroadcaster ,get_local_ip
+from triviador.network.scheduler import TimerHandle ,TimerWheel ,get_scheduler
+from triviador.core.clock import Clock ,DEFAULT_CLOCK
+from triviador.core.models import Question
+from triviador.logic.events import (
+EventLog ,EVENT_GAME_START ,EVENT_QUESTION ,EVENT_ANSWER ,EVENT_JOKER ,EVENT_ROUND_END ,EVENT_GAME_END
+)
+from triviador.logic.audience import AudienceModel
+from triviador.logic.joker_system import RoundJokers
+from triviador.logic.rng import GameRandom
+from triviador.logic.snapshot import PlayerSnapshot
+from triviador.network.recorder import (
+SessionRecorder ,DIRECTION_IN ,DIRECTION_OUT ,DIRECTION_HOST ,ROLE_HOST ,ROLE_CLIENT
+)
+from triviador.network.prefetch import (
+new_round_key ,seal_question ,open_question ,public_question_data ,question_from_data
+)
+
+
+HAS_SENDMSG =hasattr (socket .socket ,"sendmsg")
 
 
 @dataclass
@@ -44,6 +52,7 @@ class OnlinePlayer :
     current_answer :Optional [str ]=None
     answer_time :float =0.0
     jokers :dict =field (default_factory =dict )
+    prefetch :bool =False
 
     def __post_init__ (self ):
         if not self .jokers :
@@ -60,13 +69,192 @@ class OnlinePlayer :
         return False
 
 
+class Connection :
+
+
+    def __init__ (self ,sock :socket .socket ,conn_id :str =""):
+        self .socket =sock
+        self .id =conn_id
+        self .codec =CODEC_JSON
+        self .compressor :Optional [Compressor ]=None
+        self .stats =NetworkStats ()
+        self .decoder =FrameDecoder (self .stats )
+        self .send_lock =threading .Lock ()
+        self .close_reason :Optional [str ]=None
+        self .recorder :Optional [SessionRecorder ]=None
+        self .outbox :deque =deque ()
+        self .outbox_limit =SEND_QUEUE_LIMIT
+        self .outbox_ready =threading .Condition ()
+        self .writer :Optional [threading .Thread ]=None
+        self .closed =False
+
+    def set_codec (self ,codec :str ,compression :Optional [str ]=None )->None :
+
+        with self .send_lock :
+            self .codec =codec
+            if compression ==COMPRESSION_ZLIB and self .compressor is None :
+                self .compressor =Compressor ()
+
+    def send (self ,message :NetworkMessage ,shared :Optional [dict ]=None )->bool :
+
+        start =time .perf_counter ()
+        self .stats .send_started ()
+        try :
+            with self .send_lock :
+                if shared is not None and self .compressor is None :
+                    parts =shared .get (self .codec )
+                    if parts is None :
+                        parts =shared [self .codec ]=encode_parts (message ,self .codec )
+                else :
+                    parts =encode_parts (message ,self .codec ,self .compressor ,self .stats )
+                size =self ._send_buffers (parts )
+            self .stats .record_sent (size ,message .type ,time .perf_counter ()-start )
+            if self .recorder is not None :
+                self .recorder .record (DIRECTION_OUT ,self .id ,message )
+            return True
+        except OSError :
+            return False
+        finally :
+            self .stats .send_finished ()
+
+    def send_parts (self ,parts :tuple ,msg_type :Optional [str ]=None )->bool :
+
+        start =time .perf_counter ()
+        self .stats .send_started ()
+        try :
+            with self .send_lock :
+                size =self ._send_buffers (parts )
+            self .stats .record_sent (size ,msg_type ,time .perf_counter ()-start )
+            return True
+        except OSError :
+            return False
+        finally :
+            self .stats .send_finished ()
+
+    def post (self ,message :NetworkMessage )->bool :
+
+        return self ._enqueue (self .send ,(message ,))
+
+    def post_parts (self ,parts :tuple ,msg_type :Optional [str ]=None )->bool :
+
+        return self ._enqueue (self .send_parts ,(parts ,msg_type ))
+
+    def _enqueue (self ,send :Callable ,args :tuple )->bool :
+
+        with self .outbox_ready :
+            if self .closed :
+                return False
+            if len (self .outbox )<self .outbox_limit :
+                self .outbox .append ((send ,args ))
+                if self .writer is None :
+                    self .writer =threading .Thread (target =self ._write_loop ,daemon =True )
+                    self .writer .start ()
+                self .outbox_ready .notify ()
+                return True
+        self .close ("send_overflow")
+        return False
+
+    def _write_loop (self )->None :
+
+        while True :
+            with self .outbox_ready :
+                while not self .outbox and not self .closed :
+                    self .outbox_ready .wait ()
+                if self .closed :
+                    self .outbox .clear ()
+                    return
+                send ,args =self .outbox .popleft ()
+            if not send (*args ):
+                self .close ("send_failed")
+
+    def _send_buffers (self ,parts :tuple )->int :
+
+        size =sum (len (part )for part in parts )
+        if not HAS_SENDMSG :
+            for part in parts :
+                if part :
+                    self .socket .sendall (part )
+            return size
+        sent =self .socket .sendmsg (parts )
+        if sent <size :
+            views =[memoryview (part )for part in parts if part ]
+            while True :
+                while views and sent >=views [0 ].nbytes :
+                    sent -=views .pop (0 ).nbytes
+                if not views :
+                    break
+                if sent :
+                    views [0 ]=views [0 ][sent :]
+                sent =self .socket .sendmsg (views )
+        return size
+
+    def receive (self )->Optional [list [NetworkMessage ]]:
+
+        data =self .socket .recv (BUFFER_SIZE )
+        if not data :
+            return None
+        try :
+            messages =self .decoder .feed (data )
+        except (ProtocolError ,ValueError ):
+            self .stats .record_decode_error ()
+            raise
+        self .stats .record_received (len (data ),len (messages ))
+        return messages
+
+    def receive_loop (self ,running :Callable [[],bool ],
+    handle :Callable [[NetworkMessage ],None ])->str :
+
+        reason ="stopped"
+        try :
+            while running ()and not self .closed :
+                try :
+                    messages =self .receive ()
+                except (ProtocolError ,ValueError ):
+                    reason ="decode_error"
+                    break
+                except OSError as e :
+                    reason =type (e ).__name__
+                    break
+                if messages is None :
+                    reason ="eof"
+                    break
+                for message in messages :
+                    if self .recorder is not None :
+                        self .recorder .record (DIRECTION_IN ,self .id ,message )
+                    try :
+                        handle (message )
+                    except Exception as e :
+                        print (f"Грешка при обработка на {message .type }: {e }")
+                        self .close ("handler_error")
+                        break
+        finally :
+            reason =self .close_reason or reason
+            self .stats .record_disconnect (reason )
+        return reason
+
+    def close (self ,reason :Optional [str ]=None )->None :
+
+        if reason is not None and self .close_reason is None :
+            self .close_reason =reason
+        with self .outbox_ready :
+            self .closed =True
+            self .outbox_ready .notify ()
+        try :
+            self .socket .close ()
+        except OSError :
+            pass
+
+
 class GameServer :
 
 
     def __init__ (self ,port :int =DEFAULT_PORT ):
         self .port =port
         self .server_socket :Optional [socket .socket ]=None
-        self .clients :dict [str ,socket .socket ]={}
+        self .clients :dict [str ,Connection ]={}
+        self .closed_stats =NetworkStats ()
+        self .accept_errors =0
+        self .recorder :Optional [SessionRecorder ]=None
         self .running =False
         self .on_message :Optional [Callable [[NetworkMessage ,str ],None ]]=None
         self .on_client_connected :Optional [Callable [[str ],None ]]=None
@@ -78,6 +266,7 @@ class GameServer :
             self .server_socket =socket .socket (socket .AF_INET ,socket .SOCK_STREAM )
             self .server_socket .setsockopt (socket .SOL_SOCKET ,socket .SO_REUSEADDR ,1 )
             self .server_socket .bind (('0.0.0.0',self .port ))
+            self .port =self .server_socket .getsockname ()[1 ]
             self .server_socket .listen (5 )
             self .running =True
 
@@ -86,7 +275,7 @@ class GameServer :
             accept_thread .start ()
 
             return True
-        except Exception as e :
+        except OSError as e :
             print (f"Грешка при стартиране на сървъра: {e }")
             return False
 
@@ -96,7 +285,9 @@ class GameServer :
             try :
                 client_socket ,address =self .server_socket .accept ()
                 client_id =f"{address [0 ]}:{address [1 ]}"
-                self .clients [client_id ]=client_socket
+                connection =Connection (client_socket ,client_id )
+                connection .recorder =self .recorder
+                self .clients [client_id ]=connection
 
                 if self .on_client_connected :
                     self .on_client_connected (client_id )
@@ -104,88 +295,139 @@ class GameServer :
 
                 client_thread =threading .Thread (
                 target =self ._handle_client ,
-                args =(client_id ,client_socket ),
+                args =(client_id ,connection ),
                 daemon =True
                 )
                 client_thread .start ()
-            except :
+            except OSError :
+                if self .running :
+                    self .accept_errors +=1
                 break
 
-    def _handle_client (self ,client_id :str ,client_socket :socket .socket )->None :
+    def _handle_client (self ,client_id :str ,connection :Connection )->None :
 
-        while self .running :
-            try :
-                data =client_socket .recv (BUFFER_SIZE )
-                if not data :
-                    break
+        def handle (message :NetworkMessage )->None :
+            message .sender_id =client_id
+            if self .on_message :
+                self .on_message (message ,client_id )
+
+        try :
+            connection .receive_loop (lambda :self .running ,handle )
+        finally :
+            connection .close ()
+            self .closed_stats .merge (connection .stats )
 
-                message =NetworkMessage .from_json (data .decode ('utf-8'))
-                message .sender_id =client_id
+            if self .clients .get (client_id )is connection :
+                del self .clients [client_id ]
+                if self .on_client_disconnected :
+                    self .on_client_disconnected (client_id )
 
-                if self .on_message :
-                    self .on_message (message ,client_id )
-            except :
-                break
+    def set_recorder (self ,recorder :Optional [SessionRecorder ])->None :
+
+        self .recorder =recorder
+        for connection in list (self .clients .values ()):
+            connection .recorder =recorder
 
+    def set_codec (self ,client_id :str ,codec :str ,compression :Optional [str ]=None )->None :
 
         if client_id in self .clients :
-            del self .clients [client_id ]
-            if self .on_client_disconnected :
-                self .on_client_disconnected (client_id )
+            self .clients [client_id ].set_codec (codec ,compression )
+
+    def disconnect_client (self ,client_id :str )->None :
+
+        connection =self .clients .pop (client_id ,None )
+        if connection is not None :
+            connection .close ("replaced")
+
+    def get_stats (self )->dict :
+
+        return {client_id :connection .stats .snapshot ()
+        for client_id ,connection in list (self .clients .items ())}
+
+    def get_totals (self )->dict :
+
+        totals =NetworkStats ()
+        totals .merge (self .closed_stats )
+        for connection in list (self .clients .values ()):
+            totals .merge (connection .stats )
+        snapshot =totals .snapshot ()
+        snapshot ["clients"]=len (self .clients )
+        snapshot ["accept_errors"]=self .accept_errors
+        return snapshot
+
+    def record_rtt (self ,client_id :str ,rtt :float )->None :
+
+        connection =self .clients .get (client_id )
+        if connection is not None :
+            connection .stats .record_rtt (rtt )
 
     def send_to_client (self ,client_id :str ,message :NetworkMessage )->bool :
 
-        if client_id not in self .clients :
+        connection =self .clients .get (client_id )
+        if connection is None :
             return False
 
-        try :
-            self .clients [client_id ].send (message .to_json ().encode ('utf-8'))
-            return True
-        except :
+        return connection .send (message )
+
+    def send_parts (self ,client_id :str ,parts :tuple ,msg_type :Optional [str ]=None )->bool :
+
+        connection =self .clients .get (client_id )
+        if connection is None :
             return False
 
+        return connection .send_parts (parts ,msg_type )
+
+    def post_to_client (self ,client_id :str ,message :NetworkMessage )->bool :
+
+        connection =self .clients .get (client_id )
+        if connection is None :
+            return False
+
+        return connection .post (message )
+
+    def post_parts (self ,client_id :str ,parts :tuple ,msg_type :Optional [str ]=None )->bool :
+
+        connection =self .clients .get (client_id )
+        if connection is None :
+            return False
+
+        return connection .post_parts (parts ,msg_type )
+
     def broadcast (self ,message :NetworkMessage ,exclude :Optional [str ]=None )->None :
 
-        for client_id in list (self .clients .keys ()):
-            if client_id !=exclude :
-                self .send_to_client (client_id ,message )
+        self .multicast (list (self .clients ),message ,exclude )
+
+    def multicast (self ,client_ids ,message :NetworkMessage ,exclude :Optional [str ]=None )->None :
+
+        shared ={}
+        for client_id in client_ids :
+            connection =self .clients .get (client_id )
+            if connection is not None and client_id !=exclude :
+                connection .send (message ,shared )
 
     def stop (self )->None :
 
         self .running =False
 
-        for client_socket in list (self .clients .values ()):
-            try :
-                client_socket .close ()
-            except :
-                pass
+        for connection in list (self .clients .values ()):
+            connection .close ("server_stop")
 
         self .clients .clear ()
 
         if self .server_socket :
             try :
                 self .server_socket .close ()
-            except :
+            except OSError :
                 pass
 
-    def get_local_ip (self )->str :
-
-        try :
-            s =socket .socket (socket .AF_INET ,socket .SOCK_DGRAM )
-            s .connect (("8.8.8.8",80 ))
-            ip =s .getsockname ()[0 ]
-            s .close ()
-            return ip
-        except :
-            return "127.0.0.1"
-
-
 class GameClient :
 
 
     def __init__ (self ):
         self .socket :Optional [socket .socket ]=None
+        self .connection :Optional [Connection ]=None
         self .running =False
+        self .recorder :Optional [SessionRecorder ]=None
         self .on_message :Optional [Callable [[NetworkMessage ],None ]]=None
         self .on_disconnected :Optional [Callable [[],None ]]=None
 
@@ -194,6 +436,8 @@ class GameClient :
         try :
             self .socket =socket .socket (socket .AF_INET ,socket .SOCK_STREAM )
             self .socket .connect ((host ,port ))
+            self .connection =Connection (self .socket ,f"{host }:{port }")
+            self .connection .recorder =self .recorder
             self .running =True
 
 
@@ -201,98 +445,102 @@ class GameClient :
             receive_thread .start ()
 
             return True
-        except Exception as e :
+        except OSError as e :
             print (f"Грешка при свързване: {e }")
             return False
 
     def _receive_messages (self )->None :
 
-        while self .running :
-            try :
-                data =self .socket .recv (BUFFER_SIZE )
-                if not data :
-                    break
+        def handle (message :NetworkMessage )->None :
+            if self .on_message :
+                self .on_message (message )
 
-                message =NetworkMessage .from_json (data .decode ('utf-8'))
+        try :
+            self .connection .receive_loop (lambda :self .running ,handle )
+        finally :
+            if self .on_disconnected :
+                self .on_disconnected ()
 
-                if self .on_message :
-                    self .on_message (message )
-            except :
-                break
+    def set_codec (self ,codec :str ,compression :Optional [str ]=None )->None :
+
+        if self .connection :
+            self .connection .set_codec (codec ,compression )
 
-        if self .on_disconnected :
-            self .on_disconnected ()
+    def get_stats (self )->dict :
+
+        if not self .connection :
+            return {}
+        return self .connection .stats .snapshot ()
 
     def send (self ,message :NetworkMessage )->bool :
 
-        if not self .socket :
+        if not self .connection :
             return False
 
-        try :
-            self .socket .send (message .to_json ().encode ('utf-8'))
-            return True
-        except :
-            return False
+        return self .connection .send (message )
 
     def disconnect (self )->None :
 
         self .running =False
 
-        if self .socket :
-            try :
-                self .socket .close ()
-            except :
-                pass
-
-
-class MessageTypes :
-
-
-    JOIN_GAME ="join_game"
-    PLAYER_JOINED ="player_joined"
-    PLAYER_LEFT ="player_left"
-    GAME_START ="game_start"
-
-
-    QUESTION ="question"
-    ANSWER ="answer"
-    ANSWER_RESULT ="answer_result"
-    ROUND_END ="round_end"
-    GAME_END ="game_end"
-
-
-    USE_JOKER ="use_joker"
-    JOKER_RESULT ="joker_result"
-
-
-    CHAT_MESSAGE ="chat_message"
-
-
-    SYNC_STATE ="sync_state"
-    PING ="ping"
-    PONG ="pong"
+        if self .connection :
+            self .connection .close ("client_stop")
 
 
 class GameLobby :
 
 
-    def __init__ (self ,is_host :bool =False ):
+    def __init__ (self ,is_host :bool =False ,compression :bool =True ,max_players :int =MAX_PLAYERS ,
+    clock :Clock =DEFAULT_CLOCK ,scheduler :Optional [TimerWheel ]=None ):
         self .is_host =is_host
+        self .clock =clock
+        self .compression =compression
+        self .max_players =max_players
         self .players :dict [str ,OnlinePlayer ]={}
         self .my_id :Optional [str ]=None
         self .my_name :str =""
         self .game_started =False
         self .current_question :Optional [dict ]=None
         self .question_start_time :float =0
+        self .random =GameRandom ()
         self .all_answers_received =False
+        self .round_id :int =0
+        self .outstanding :set [str ]=set ()
+        self .round_deadline :Optional [TimerHandle ]=None
+        self .round_lock =threading .RLock ()
         self .round_results :list [dict ]=[]
+        self .prefetched :dict [int ,str ]={}
+        self .round_keys :dict [int ,str ]={}
+        self .round_data :dict [int ,dict ]={}
+        self .links :dict [str ,LinkEstimator ]={}
+        self .features :dict [str ,frozenset ]={}
+        self .host_rtt :Optional [float ]=None
+        self .sessions :dict [str ,str ]={}
+        self .session_token :Optional [str ]=None
+        self .host_address :Optional [tuple [str ,int ]]=None
+        self .state_version :int =0
+        self .state_lock =threading .RLock ()
+        self .eliminated :set [str ]=set ()
+        self .closing =False
 
 
         self .server :Optional [GameServer ]=None
         self .client :Optional [GameClient ]=None
 
 
-        self .message_queue :Queue =Queue ()
+        self .event_queue :deque =deque ()
+        self .pump_stats =PumpStats ()
+        self .stats_exporters :list =[]
+        self .game_mode =MODE_STANDARD
+        self .beacon :Optional [BeaconBroadcaster ]=None
+        self .relays :set [str ]=set ()
+        self .recorder :Optional [SessionRecorder ]=None
+        self .events :Optional [EventLog ]=None
+        self .audience :Optional [AudienceModel ]=None
+        self .round_jokers :dict [int ,RoundJokers ]={}
+        self .live_round =0
+        self .scheduler =scheduler or get_scheduler ()
+        self .idle_timer :Optional [TimerHandle ]=None
 
 
         self .on_player_joined :Optional [Callable [[OnlinePlayer ],None ]]=None
@@ -304,12 +552,48 @@ class GameLobby :
         self .on_game_end :Optional [Callable [[list ],None ]]=None
         self .on_joker_result :Optional [Callable [[dict ],None ]]=None
         self .on_error :Optional [Callable [[str ],None ]]=None
+        self .on_state_synced :Optional [Callable [[dict ],None ]]=None
+        self .on_round_complete :Optional [Callable [[int ],None ]]=None
+
+    def _emit (self ,callback_name :str ,*args )->None :
+
+        self .event_queue .append ((time .monotonic (),callback_name ,args ))
 
-    def host_game (self ,player_name :str ,port :int =DEFAULT_PORT )->bool :
+    def call_later (self ,delay :float ,callback :Callable ,*args )->TimerHandle :
+
+        return self .scheduler .schedule (delay ,self ._fire_timer ,callback ,args )
+
+    def _fire_timer (self ,callback :Callable ,args :tuple )->None :
+
+        if not self .closing :
+            self ._emit (callback ,*args )
+
+    def pump (self ,budget :float =PUMP_BUDGET )->int :
+
+        depth =len (self .event_queue )
+        deadline =time .monotonic ()+budget
+        dispatched =0
+        overrun =False
+        while self .event_queue :
+            queued_at ,callback_name ,args =self .event_queue .popleft ()
+            now =time .monotonic ()
+            self .pump_stats .record_dispatch (now -queued_at )
+            callback =getattr (self ,callback_name )if isinstance (callback_name ,str )else callback_name
+            if callback :
+                callback (*args )
+            dispatched +=1
+            if self .event_queue and time .monotonic ()>=deadline :
+                overrun =True
+                break
+        self .pump_stats .record_pump (depth ,overrun )
+        return dispatched
+
+    def host_game (self ,player_name :str ,port :int =DEFAULT_PORT ,announce :bool =True )->bool :
 
         self .is_host =True
         self .my_name =player_name
         self .server =GameServer (port )
+        self .server .recorder =self .recorder
 
         self .server .on_message =self ._handle_server_message
         self .server .on_client_connected =self ._on_client_connected
@@ -323,115 +607,503 @@ class GameLobby :
         host_player =OnlinePlayer (id ="host",name =player_name ,ready =True )
         self .players ["host"]=host_player
 
+        self .scheduler .schedule (PING_INTERVAL ,self ._ping_tick )
+        self ._touch_lobby ()
+
+        if announce :
+            self .beacon =BeaconBroadcaster (self ._beacon_info )
+            self .beacon .start ()
+
         return True
 
-    def join_game (self ,player_name :str ,host_ip :str ,port :int =DEFAULT_PORT )->bool :
+    def _beacon_info (self )->dict :
+
+        return {
+        "name":self .my_name ,
+        "port":self .server .port ,
+        "players":len (self .players ),
+        "max":self .max_players ,
+        "mode":self .game_mode ,
+        "started":self .game_started
+        }
+
+    def _announce (self )->None :
+
+        if self .beacon :
+            self .beacon .announce ()
+
+    def set_game_mode (self ,mode :str )->None :
+
+        self .game_mode =mode
+        self ._announce ()
+
+    def _ping_tick (self )->None :
+
+        if not self .server or not self .server .running :
+            return
+        self ._send_pings ()
+        self .scheduler .schedule (PING_INTERVAL ,self ._ping_tick )
+
+    def _touch_lobby (self )->None :
+
+        if self .idle_timer is not None :
+            self .idle_timer .cancel ()
+            self .idle_timer =None
+        if not self .game_started and not self .closing :
+            self .idle_timer =self .scheduler .schedule (LOBBY_IDLE_TIMEOUT ,self ._on_lobby_idle )
+
+    def _on_lobby_idle (self )->None :
+
+        if self .game_started or self .closing :
+            return
+        if any (player_id !="host"for player_id in list (self .players )):
+            self ._touch_lobby ()
+            return
+        self ._emit ("on_error","Лобито беше затворено поради неактивност")
+        self ._emit ("close")
+
+    def _send_pings (self )->None :
+
+        now =self .clock ()
+        for client_id in [c for c ,features in list (self .features .items ())if FEATURE_PING in features ]:
+            link =self .links .setdefault (client_id ,LinkEstimator ())
+            self .server .post_to_client (client_id ,NetworkMessage (
+            type =MessageTypes .PING ,
+            data ={"t":now ,"rtt":link .srtt }
+            ))
+
+    def join_game (self ,player_name :str ,host_ip :str ,port :int =DEFAULT_PORT ,
+    role :str =ROLE_PLAYER )->bool :
 
         self .is_host =False
         self .my_name =player_name
-        self .client =GameClient ()
+        self .host_address =(host_ip ,port )
+        return self ._connect (role =role )
 
-        self .client .on_message =self ._handle_client_message
-        self .client .on_disconnected =self ._on_disconnected
+    def _connect (self ,**extra )->bool :
 
-        if not self .client .connect (host_ip ,port ):
+        client =GameClient ()
+        client .recorder =self .recorder
+        client .on_message =self ._handle_client_message
+        client .on_disconnected =self ._on_disconnected
+
+        if not client .connect (*self .host_address ):
             return False
+        self .client =client
 
-
-        self .client .send (NetworkMessage (
-        type =MessageTypes .JOIN_GAME ,
-        data ={"name":player_name }
-        ))
+        data ={
+        "name":self .my_name ,
+        "codecs":SUPPORTED_CODECS ,
+        "compression":SUPPORTED_COMPRESSION if self .compression else [],
+        "features":SUPPORTED_FEATURES
+        }
+        data .update (extra )
+        client .send (NetworkMessage (type =MessageTypes .JOIN_GAME ,data =data ))
 
         return True
 
+    def _reconnect_loop (self )->None :
+
+        for attempt in range (RECONNECT_ATTEMPTS ):
+            if self .closing :
+                return
+            if attempt :
+                time .sleep (RECONNECT_DELAY )
+            if self ._connect (session =self .session_token ):
+                return
+
+        if not self .closing :
+            self ._emit ("on_error","Връзката със сървъра беше прекъсната")
+
     def _on_client_connected (self ,client_id :str )->None :
 
         pass
 
     def _on_client_disconnected (self ,client_id :str )->None :
 
-        if client_id in self .players :
-            player =self .players [client_id ]
-            del self .players [client_id ]
-
-
+        self .links .pop (client_id ,None )
+        self .features .pop (client_id ,None )
+        self .relays .discard (client_id )
+        if self .game_started and client_id in self .players :
+            self ._suspend_player (client_id )
+        elif client_id in self .players :
+            player =self .players .pop (client_id )
+            for token in [t for t ,owner in self .sessions .items ()if owner ==client_id ]:
+                del self .sessions [token ]
             if self .server :
-                self .server .broadcast (NetworkMessage (
+                self ._broadcast_delta ({"left":[client_id ]},legacy =NetworkMessage (
                 type =MessageTypes .PLAYER_LEFT ,
                 data ={"player_id":client_id ,"name":player .name }
                 ))
 
-            if self .on_player_left :
-                self .on_player_left (client_id )
+            self ._emit ("on_player_left",client_id )
+            self ._announce ()
+            self ._touch_lobby ()
+
+    def _suspend_player (self ,client_id :str )->None :
+
+        player =self .players [client_id ]
+        player .connected =False
+        if player .current_answer is None :
+            player .current_answer =""
+            self ._mark_answered (client_id )
+        self ._broadcast_delta ({"players":{client_id :{"connected":False }}})
+
+    def _rekey_player (self ,old_id :str ,new_id :str )->None :
+
+        if old_id ==new_id or old_id not in self .players :
+            return
+        self .players ={(new_id if player_id ==old_id else player_id ):player
+        for player_id ,player in self .players .items ()}
+        self .players [new_id ].id =new_id
+        self .links .pop (old_id ,None )
+        self .features .pop (old_id ,None )
+        with self .round_lock :
+            if old_id in self .outstanding :
+                self .outstanding .discard (old_id )
+                self .outstanding .add (new_id )
+
+    def _broadcast_delta (self ,delta :dict ,exclude :Optional [str ]=None ,
+    legacy :Optional [NetworkMessage ]=None )->None :
+
+        with self .state_lock :
+            self .state_version +=1
+            synced =[c for c in self .players if FEATURE_SYNC in self .features .get (c ,())]
+            self .server .multicast ([*synced ,*self .relays ],NetworkMessage (
+            type =MessageTypes .SYNC_STATE ,
+            data ={"version":self .state_version ,"delta":delta }
+            ),exclude =exclude )
+            if legacy is not None :
+                self .server .multicast ([c for c in self .players if c not in synced ],legacy ,exclude =exclude )
+
+    def snapshot_players (self )->list [PlayerSnapshot ]:
+
+        tokens ={client_id :token for token ,client_id in self .sessions .items ()}
+        return [
+        PlayerSnapshot (
+        name =p .name ,
+        score =p .score ,
+        jokers =dict (p .jokers ),
+        player_id =p .id ,
+        session =tokens .get (p .id ,""),
+        eliminated =p .name in self .eliminated ,
+        connected =p .connected
+        )
+        for p in self .players .values ()
+        ]
+
+    def restore_players (self ,players :list [PlayerSnapshot ])->None :
+
+        for snapshot in players :
+            self .players [snapshot .player_id ]=OnlinePlayer (
+            id =snapshot .player_id ,
+            name =snapshot .name ,
+            score =snapshot .score ,
+            ready =True ,
+            connected =snapshot .player_id =="host",
+            jokers =dict (snapshot .jokers )
+            )
+            if snapshot .session :
+                self .sessions [snapshot .session ]=snapshot .player_id
+            if snapshot .eliminated :
+                self .eliminated .add (snapshot .name )
+        self .game_started =True
+
+    def _build_snapshot (self ,player_id :str ,include_question :bool =True )->dict :
+
+        player =self .players [player_id ]
+        snapshot ={
+        "version":self .state_version ,
+        "game_started":self .game_started ,
+        "players":[{"id":p .id ,"name":p .name ,"ready":p .ready ,"score":p .score ,"connected":p .connected }
+        for p in self .players .values ()],
+        "jokers":player .jokers ,
+        "eliminated":sorted (self .eliminated )
+        }
+        if include_question and self .current_question is not None and not self .all_answers_received :
+            elapsed =self .clock ()-self .question_start_time
+            snapshot ["question"]=public_question_data (self .current_question )
+            snapshot ["time_left"]=min (max (0.0 ,DEFAULT_TIME_LIMIT -elapsed ),float (DEFAULT_TIME_LIMIT ))
+            snapshot ["answered"]=player .current_answer is not None
+        return snapshot
+
+    def _add_relay (self ,client_id :str ,data :dict )->None :
+
+        codec =negotiate_codec (data .get ("codecs"))
+        compression =None
+        if self .compression :
+            compression =negotiate_compression (data .get ("compression"),codec )
+
+        players_data =[{"id":p .id ,"name":p .name ,"ready":p .ready }
+        for p in self .players .values ()]
+        self .server .send_to_client (client_id ,NetworkMessage (
+        type =MessageTypes .PLAYER_JOINED ,
+        data ={
+        "your_id":client_id ,
+        "players":players_data ,
+        "success":True ,
+        "codec":codec ,
+        "compression":compression ,
+        "role":ROLE_RELAY
+        }
+        ))
+        self .server .set_codec (client_id ,codec ,compression )
+
+        if self .game_started :
+            self .server .send_to_client (client_id ,NetworkMessage (
+            type =MessageTypes .GAME_START ,
+            data ={"players":[{"id":p .id ,"name":p .name }for p in self .players .values ()]}
+            ))
+            if self .current_question is not None and not self .all_answers_received :
+                self .server .send_to_client (client_id ,NetworkMessage (
+                type =MessageTypes .QUESTION ,
+                data =public_question_data (self .current_question )
+                ))
+        self .features [client_id ]=frozenset (data .get ("features")or ())
+        self .relays .add (client_id )
+
+    def _resume_session (self ,client_id :str ,token :str ,data :dict )->None :
+
+        old_id =self .sessions .get (token )
+        player =self .players .get (old_id )if old_id else None
+        if player is None :
+            self .server .send_to_client (client_id ,NetworkMessage (
+            type =MessageTypes .ERROR ,
+            data ={"message":"Сесията е невалидна или изтекла"}
+            ))
+            return
+
+        if player .connected :
+            self .server .disconnect_client (old_id )
+        codec =negotiate_codec (data .get ("codecs"))
+        compression =None
+        if self .compression :
+            compression =negotiate_compression (data .get ("compression"),codec )
+
+        self ._rekey_player (old_id ,client_id )
+        self .sessions [token ]=client_id
+        self .features [client_id ]=frozenset (data .get ("features")or ())
+        player .connected =True
+        player .prefetch =FEATURE_PREFETCH in self .features [client_id ]
+        if (player .current_answer ==""and player .name not in self .eliminated
+        and self .current_question is not None ):
+            with self .round_lock :
+                if not self .all_answers_received :
+                    player .current_answer =None
+                    self .outstanding .add (client_id )
+
+        with self .state_lock :
+            self ._broadcast_delta ({
+            "rekey":{old_id :client_id },
+            "players":{client_id :{"connected":True }}
+            },exclude =client_id )
+            self .server .send_to_client (client_id ,NetworkMessage (
+            type =MessageTypes .SYNC_STATE ,
+            data ={
+            "your_id":client_id ,
+            "session":token ,
+            "codec":codec ,
+            "compression":compression ,
+            "snapshot":self ._build_snapshot (client_id )
+            }
+            ))
+            self .server .set_codec (client_id ,codec ,compression )
+
+        if player .prefetch :
+            for round_number in sorted (self .round_data ):
+                self .server .send_to_client (client_id ,self ._prefetch_message (round_number ))
+
+    def _apply_snapshot (self ,data :dict )->None :
+
+        snapshot =data .get ("snapshot",{})
+        self .state_version =snapshot .get ("version",0 )
+        self .game_started =snapshot .get ("game_started",self .game_started )
+        players ={}
+        for p_data in snapshot .get ("players",[]):
+            players [p_data ["id"]]=OnlinePlayer (
+            id =p_data ["id"],
+            name =p_data ["name"],
+            ready =p_data .get ("ready",False ),
+            score =p_data .get ("score",0 ),
+            connected =p_data .get ("connected",True )
+            )
+        self .players =players
+        self .eliminated =set (snapshot .get ("eliminated",[]))
+
+        if "your_id"in data :
+            self .my_id =data ["your_id"]
+            self .session_token =data .get ("session",self .session_token )
+            self .client .set_codec (data .get ("codec",CODEC_JSON ),data .get ("compression"))
+        me =self .players .get (self .my_id )
+        if me is not None and snapshot .get ("jokers"):
+            me .jokers =dict (snapshot ["jokers"])
+
+        self ._emit ("on_state_synced",snapshot )
+
+        question =snapshot .get ("question")
+        if question is not None and not snapshot .get ("answered"):
+            time_left =snapshot .get ("time_left",DEFAULT_TIME_LIMIT )
+            self .current_question =question
+            self .question_start_time =self .clock ()-(DEFAULT_TIME_LIMIT -time_left )
+            self ._emit ("on_question_received",dict (question ,time_left =time_left ))
+
+    def _apply_delta (self ,version :int ,delta :dict )->None :
+
+        if version !=self .state_version +1 :
+            if version >self .state_version :
+                self .client .send (NetworkMessage (type =MessageTypes .SYNC_STATE ,data ={"request":True }))
+            return
+        self .state_version =version
+
+        for p_data in delta .get ("joined",[]):
+            player =OnlinePlayer (id =p_data ["id"],name =p_data ["name"],ready =p_data .get ("ready",False ))
+            self .players [player .id ]=player
+            self ._emit ("on_player_joined",player )
+        for player_id in delta .get ("left",[]):
+            if self .players .pop (player_id ,None )is not None :
+                self ._emit ("on_player_left",player_id )
+        for old_id ,new_id in delta .get ("rekey",{}).items ():
+            self ._rekey_player (old_id ,new_id )
+        for player_id ,fields in delta .get ("players",{}).items ():
+            player =self .players .get (player_id )
+            if player is None :
+                continue
+            if "score"in fields :
+                player .score =fields ["score"]
+            if "connected"in fields :
+                player .connected =fields ["connected"]
+            if "ready"in fields :
+                player .ready =fields ["ready"]
+        self .eliminated .update (delta .get ("eliminated",[]))
+
+    @staticmethod
+    def _results_delta (results :dict )->dict :
+
+        return {
+        "players":{pr ["player_id"]:{"score":pr ["total_score"]}
+        for pr in results .get ("player_results",[])if "player_id"in pr },
+        "eliminated":results .get ("eliminated_this_round",[])
+        }
 
     def _on_disconnected (self )->None :
 
-        if self .on_error :
-            self .on_error ("Връзката със сървъра беше прекъсната")
+        if self .closing :
+            return
+        if self .session_token and self .game_started and self .host_address :
+            threading .Thread (target =self ._reconnect_loop ,daemon =True ).start ()
+            return
+        self ._emit ("on_error","Връзката със сървъра беше прекъсната")
 
     def _handle_server_message (self ,message :NetworkMessage ,client_id :str )->None :
 
         if message .type ==MessageTypes .JOIN_GAME :
 
+            if message .data .get ("role")==ROLE_RELAY :
+                self ._add_relay (client_id ,message .data )
+                return
+
+            if message .data .get ("session")is not None :
+                self ._resume_session (client_id ,message .data ["session"],message .data )
+                return
+
             player_name =message .data .get ("name","Player")
 
-            if len (self .players )>=4 :
+            if len (self .players )>=self .max_players :
                 self .server .send_to_client (client_id ,NetworkMessage (
-                type ="error",
+                type =MessageTypes .ERROR ,
                 data ={"message":"Играта е пълна"}
                 ))
                 return
 
             if self .game_started :
                 self .server .send_to_client (client_id ,NetworkMessage (
-                type ="error",
+                type =MessageTypes .ERROR ,
                 data ={"message":"Играта вече е започнала"}
                 ))
                 return
 
 
-            new_player =OnlinePlayer (id =client_id ,name =player_name )
-            self .players [client_id ]=new_player
-
-
-            players_data =[{"id":p .id ,"name":p .name ,"ready":p .ready }
-            for p in self .players .values ()]
+            features =self .features [client_id ]=frozenset (message .data .get ("features")or ())
+            new_player =OnlinePlayer (
+            id =client_id ,
+            name =player_name ,
+            prefetch =FEATURE_PREFETCH in features
+            )
+            token =secrets .token_urlsafe (16 )
+            self .sessions [token ]=client_id
+            codec =negotiate_codec (message .data .get ("codecs"))
+            compression =None
+            if self .compression :
+                compression =negotiate_compression (message .data .get ("compression"),codec )
+
+
+            with self .state_lock :
+                self .players [client_id ]=new_player
+                players_data =[{"id":p .id ,"name":p .name ,"ready":p .ready }
+                for p in self .players .values ()]
+                self ._broadcast_delta ({"joined":[{"id":client_id ,"name":player_name ,"ready":False }]},
+                exclude =client_id ,legacy =NetworkMessage (
+                type =MessageTypes .PLAYER_JOINED ,
+                data ={"player":{"id":client_id ,"name":player_name },"players":players_data }
+                ))
 
-            self .server .send_to_client (client_id ,NetworkMessage (
-            type =MessageTypes .PLAYER_JOINED ,
-            data ={
-            "your_id":client_id ,
-            "players":players_data ,
-            "success":True
-            }
-            ))
+                self .server .send_to_client (client_id ,NetworkMessage (
+                type =MessageTypes .PLAYER_JOINED ,
+                data ={
+                "your_id":client_id ,
+                "players":players_data ,
+                "success":True ,
+                "codec":codec ,
+                "compression":compression ,
+                "session":token ,
+                "version":self .state_version
+                }
+                ))
+                self .server .set_codec (client_id ,codec ,compression )
 
+            self ._emit ("on_player_joined",new_player )
+            self ._announce ()
+            self ._touch_lobby ()
 
-            self .server .broadcast (NetworkMessage (
-            type =MessageTypes .PLAYER_JOINED ,
-            data ={
-            "player":{"id":client_id ,"name":player_name },
-            "players":players_data
-            }
-            ),exclude =client_id )
+        elif message .type ==MessageTypes .ANSWER :
 
-            if self .on_player_joined :
-                self .on_player_joined (new_player )
+            self ._process_player_answer (client_id ,message .data ,self .clock ())
 
-        elif message .type ==MessageTypes .ANSWER :
+        elif message .type ==MessageTypes .PONG :
 
-            self ._process_player_answer (client_id ,message .data )
+            link =self .links .setdefault (client_id ,LinkEstimator ())
+            received_at =self .clock ()
+            try :
+                sent_at =float (message .data ["t"])
+                if link .add_sample (sent_at ,float (message .data ["peer"]),received_at ):
+                    self .server .record_rtt (client_id ,received_at -sent_at )
+            except (KeyError ,TypeError ,ValueError ):
+                pass
 
         elif message .type ==MessageTypes .USE_JOKER :
 
             self ._process_joker_use (client_id ,message .data )
 
+        elif message .type ==MessageTypes .SYNC_STATE :
+
+            if message .data .get ("request")and client_id in self .players :
+                with self .state_lock :
+                    self .server .send_to_client (client_id ,NetworkMessage (
+                    type =MessageTypes .SYNC_STATE ,
+                    data ={"snapshot":self ._build_snapshot (client_id ,include_question =False )}
+                    ))
+
     def _handle_client_message (self ,message :NetworkMessage )->None :
 
         if message .type ==MessageTypes .PLAYER_JOINED :
             if "your_id"in message .data :
 
+                self .client .set_codec (
+                message .data .get ("codec",CODEC_JSON ),
+                message .data .get ("compression")
+                )
+                self .session_token =message .data .get ("session")
+                self .state_version =message .data .get ("version",0 )
                 self .my_id =message .data ["your_id"]
 
 
@@ -449,127 +1121,191 @@ class GameLobby :
                     player =OnlinePlayer (id =p_data ["id"],name =p_data ["name"])
                     self .players [p_data ["id"]]=player
 
-                    if self .on_player_joined :
-                        self .on_player_joined (player )
+                    self ._emit ("on_player_joined",player )
 
         elif message .type ==MessageTypes .PLAYER_LEFT :
             player_id =message .data .get ("player_id")
             if player_id in self .players :
                 del self .players [player_id ]
-                if self .on_player_left :
-                    self .on_player_left (player_id )
+                self ._emit ("on_player_left",player_id )
 
         elif message .type ==MessageTypes .GAME_START :
             self .game_started =True
-            if self .on_game_start :
-                self .on_game_start ()
+            self ._emit ("on_game_start")
 
         elif message .type ==MessageTypes .QUESTION :
-            self .current_question =message .data
-            self .question_start_time =time .time ()
-            if self .on_question_received :
-                self .on_question_received (message .data )
+            self ._start_question (message .data )
+
+        elif message .type ==MessageTypes .QUESTION_PREFETCH :
+            self .prefetched [message .data ["round"]]=message .data ["blob"]
+
+        elif message .type ==MessageTypes .QUESTION_REVEAL :
+            self ._reveal_prefetched (message .data )
+
+        elif message .type ==MessageTypes .PING :
+            self .host_rtt =message .data .get ("rtt")
+            self .client .send (NetworkMessage (
+            type =MessageTypes .PONG ,
+            data ={"t":message .data .get ("t"),"peer":self .clock ()}
+            ))
+
+        elif message .type ==MessageTypes .SYNC_STATE :
+            if "snapshot"in message .data :
+                self ._apply_snapshot (message .data )
+            else :
+                self ._apply_delta (message .data .get ("version",0 ),message .data .get ("delta",{}))
 
         elif message .type ==MessageTypes .ANSWER_RESULT :
-            if self .on_answer_result :
-                self .on_answer_result (message .data )
+            if "version"in message .data :
+                self ._apply_delta (message .data ["version"],self ._results_delta (message .data ))
+            self ._emit ("on_answer_result",message .data )
 
         elif message .type ==MessageTypes .ROUND_END :
             self .round_results =message .data .get ("results",[])
-            if self .on_round_end :
-                self .on_round_end (self .round_results )
+            self ._emit ("on_round_end",self .round_results )
 
         elif message .type ==MessageTypes .GAME_END :
-            if self .on_game_end :
-                self .on_game_end (message .data .get ("final_scores",[]))
+            self ._emit ("on_game_end",message .data .get ("final_scores",[]))
 
         elif message .type ==MessageTypes .JOKER_RESULT :
-            if self .on_joker_result :
-                self .on_joker_result (message .data )
+            self ._emit ("on_joker_result",message .data )
 
-        elif message .type =="error":
-            if self .on_error :
-                self .on_error (message .data .get ("message","Неизвестна грешка"))
+        elif message .type ==MessageTypes .ERROR :
+            self ._emit ("on_error",message .data .get ("message","Неизвестна грешка"))
 
-    def _process_player_answer (self ,player_id :str ,data :dict )->None :
+    def _process_player_answer (self ,player_id :str ,data :dict ,
+    received_at :Optional [float ]=None )->None :
 
         if player_id not in self .players :
             return
 
         player =self .players [player_id ]
-        player .current_answer =data .get ("answer")
-        player .answer_time =data .get ("time",0 )
+        with self .round_lock :
+            if self .all_answers_received or player_id not in self .outstanding :
+                return
+            player .current_answer =data .get ("answer")
+            player .answer_time =self ._compensated_answer_time (player_id ,data ,received_at )
+            if self .events :
+                self .events .emit (EVENT_ANSWER ,player =player .name ,answer =player .current_answer ,
+                time =player .answer_time )
+            self ._mark_answered (player_id )
+
+    def _open_round (self ,timeout :float )->None :
+
+        with self .round_lock :
+            self .round_id +=1
+            self .all_answers_received =False
+            self .outstanding ={p .id for p in self .players .values ()if p .current_answer is None }
+            if self .round_deadline is not None :
+                self .round_deadline .cancel ()
+            self .round_deadline =self .scheduler .schedule (timeout ,self ._close_round ,self .round_id )
+            if not self .outstanding :
+                self ._close_round (self .round_id )
+
+    def _mark_answered (self ,player_id :str )->None :
+
+        with self .round_lock :
+            if player_id not in self .outstanding :
+                return
+            self .outstanding .discard (player_id )
+            if not self .outstanding :
+                self ._close_round (self .round_id )
 
+    def _close_round (self ,round_id :int )->None :
 
-        all_answered =all (
-        p .current_answer is not None
-        for p in self .players .values ()
+        with self .round_lock :
+            if round_id !=self .round_id or self .all_answers_received :
+                return
+            if self .round_deadline is not None :
+                self .round_deadline .cancel ()
+                self .round_deadline =None
+            for player_id in self .outstanding :
+                player =self .players .get (player_id )
+                if player is not None and player .current_answer is None :
+                    player .current_answer =""
+                    player .answer_time =float (DEFAULT_TIME_LIMIT )
+            self .outstanding .clear ()
+            self .all_answers_received =True
+            self ._record_action ("close_round",round =round_id )
+        self ._emit ("on_round_complete",round_id )
+
+    def _compensated_answer_time (self ,player_id :str ,data :dict ,
+    received_at :Optional [float ])->float :
+
+        link =self .links .get (player_id )
+        if received_at is None or link is None or link .srtt is None :
+            return data .get ("time",0 )
+
+        answered_at =data .get ("answered_at")
+        if link .synced and isinstance (answered_at ,(int ,float )):
+            answered =max (link .to_local (answered_at ),link .earliest_send (received_at ))
+            answered =min (answered ,received_at )
+        else :
+            answered =received_at -link .srtt /2
+
+        return min (max (0.0 ,answered -self .question_start_time ),float (DEFAULT_TIME_LIMIT ))
+
+    def _cache_round (self ,round_number :int ,question_data :dict ,question :Optional [Question ])->None :
+
+        if question is None :
+            question =question_from_data (question_data )
+        self .round_jokers [round_number ]=RoundJokers (
+        question ,bool (question_data .get ("is_special_round")),self .random .jokers ,self .audience
         )
 
-        if all_answered :
-            self .all_answers_received =True
+    def _go_live (self ,round_number :int )->None :
+
+        self .live_round =round_number
+        for stale in [r for r in self .round_jokers if r <round_number ]:
+            del self .round_jokers [stale ]
+
+    def joker_result (self ,joker_type :str )->Optional [dict ]:
+
+        round_jokers =self .round_jokers .get (self .live_round )
+        return round_jokers .results .get (joker_type )if round_jokers else None
 
     def _process_joker_use (self ,player_id :str ,data :dict )->None :
-        from triviador.logic.joker_system import JokerSystem
-        from triviador.core.models import Question ,QuestionType
 
         joker_type =data .get ("joker_type")
         if not joker_type or player_id not in self .players :
             return
 
         player =self .players [player_id ]
-        is_special =data .get ("is_special_round",False )
-
-        if is_special :
-            self .server .send_to_client (player_id ,NetworkMessage (
-            type =MessageTypes .JOKER_RESULT ,
-            data ={"error":"Жокерите не могат да се използват в специален рунд!"}
-            ))
+        round_jokers =self .round_jokers .get (self .live_round )
+        if round_jokers is None :
             return
 
-        if not player .has_joker (joker_type ):
+        error =None
+        with self .round_lock :
+            if self .all_answers_received or player_id not in self .outstanding :
+                error ="Рундът е приключил или вече сте отговорили!"
+            elif round_jokers .is_special_round :
+                error ="Жокерите не могат да се използват в специален рунд!"
+            elif not player .has_joker (joker_type ):
+                error ="Нямате повече такива жокери!"
+            else :
+                result =round_jokers .results .get (joker_type )
+                if result is None :
+                    return
+                player .use_joker (joker_type )
+
+        if error :
             self .server .send_to_client (player_id ,NetworkMessage (
             type =MessageTypes .JOKER_RESULT ,
-            data ={"error":"Нямате повече такива жокери!"}
+            data ={"error":error }
             ))
             return
 
-        player .use_joker (joker_type )
-
-        if not self .current_question :
-            return
-
-        q =self .current_question
-        question =Question (
-            id =0 ,
-            category =q .get ("category",""),
-            difficulty =q .get ("difficulty",1 ),
-            question_type =QuestionType (q .get ("question_type","multiple_choice")),
-            question_text =q .get ("text",""),
-            correct_answer =q .get ("correct_answer",""),
-            options =q .get ("options",[])
-        )
-
-        from triviador.core.config import JOKER_5050 ,JOKER_AUDIENCE
-
-        if joker_type ==JOKER_5050 :
-            result =JokerSystem .apply_5050 (question )
-            result_data ={"type":"5050","remaining_options":result ,
-                "joker_type":joker_type ,"remaining_count":player .jokers .get (joker_type ,0 )}
-        elif joker_type ==JOKER_AUDIENCE :
-            result =JokerSystem .apply_audience_help (question )
-            result_data ={"type":"audience","votes":result ,
-                "joker_type":joker_type ,"remaining_count":player .jokers .get (joker_type ,0 )}
-        else :
-            return
+        if self .events :
+            self .events .emit (EVENT_JOKER ,player =player .name ,joker =joker_type )
 
         self .server .send_to_client (player_id ,NetworkMessage (
         type =MessageTypes .JOKER_RESULT ,
-        data =result_data
+        data =dict (result ,remaining_count =player .jokers .get (joker_type ,0 ))
         ))
 
 
-    def start_game (self )->bool :
+    def start_game (self ,rng :Optional [GameRandom ]=None )->bool :
 
         if not self .is_host :
             return False
@@ -577,7 +1313,14 @@ class GameLobby :
         if len (self .players )<2 :
             return False
 
+        self .random =rng or GameRandom ()
+        self ._record_action ("start_game",seed =self .random .seed )
         self .game_started =True
+        if self .events :
+            self .events .emit (
+            EVENT_GAME_START ,mode =self .game_mode ,players =[p .name for p in self .players .values ()],
+            seed =self .random .seed
+            )
 
 
         self .server .broadcast (NetworkMessage (
@@ -585,56 +1328,168 @@ class GameLobby :
         data ={"players":[{"id":p .id ,"name":p .name }for p in self .players .values ()]}
         ))
 
-        if self .on_game_start :
-            self .on_game_start ()
+        self ._emit ("on_game_start")
+        self ._announce ()
+        self ._touch_lobby ()
 
         return True
 
-    def send_question (self ,question_data :dict ,eliminated :set =None )->None :
+    def _reset_answers (self ,eliminated :set ,lead :float =0 )->None :
 
-        if not self .is_host :
+        with self .round_lock :
+            self .eliminated =set (eliminated )
+            for player in self .players .values ():
+                if player .name in eliminated or not player .connected :
+                    player .current_answer =""
+                    player .answer_time =0
+                else :
+                    player .current_answer =None
+                    player .answer_time =0
+            self ._open_round (lead +DEFAULT_TIME_LIMIT +ROUND_DEADLINE_GRACE )
+
+    def _start_question (self ,question_data :dict )->None :
+
+        self .current_question =question_data
+        self .question_start_time =self .clock ()
+        self ._emit ("on_question_received",question_data )
+
+    def _schedule_question_start (self ,question_data :dict ,delay :float )->None :
+
+        if delay <=0 :
+            self ._start_question (question_data )
             return
+        self .scheduler .schedule (delay ,self ._start_question ,question_data )
 
-        eliminated =eliminated or set ()
+    def _reveal_prefetched (self ,data :dict )->None :
 
-        for player in self .players .values ():
-            if player .name in eliminated :
-                player .current_answer =""
-                player .answer_time =0
-            else :
-                player .current_answer =None
-                player .answer_time =0
+        round_number =data .get ("round")
+        blob =self .prefetched .pop (round_number ,None )
+        for stale in [r for r in self .prefetched if r <round_number ]:
+            del self .prefetched [stale ]
+        if blob is None :
+            self ._emit ("on_error","Липсва предварително изпратен въпрос")
+            return
+        try :
+            question_data =open_question (blob ,data .get ("key",""))
+        except ProtocolError as e :
+            self ._emit ("on_error",str (e ))
+            return
 
-        self .all_answers_received =False
+        if data .get ("start_at")is not None :
+            delay =data ["start_at"]-self .clock ()
+        else :
+            delay =data .get ("start_in",0 )/1000
+        self ._schedule_question_start (question_data ,delay )
+
+    def send_question (self ,question_data :dict ,eliminated :set =None ,
+    question :Optional [Question ]=None )->None :
+
+        if not self .is_host :
+            return
+
+        self ._record_action ("send_question",question =question_data ,eliminated =sorted (eliminated or ()))
+        round_number =question_data .get ("question_number",self .live_round +1 )
+        self ._cache_round (round_number ,question_data ,question )
+        self ._go_live (round_number )
+        self ._reset_answers (eliminated or set ())
         self .current_question =question_data
-        self .question_start_time =time .time ()
+        self .question_start_time =self .clock ()
+        if self .events :
+            self .events .emit (EVENT_QUESTION ,question_id =question_data .get ("id"))
 
         self .server .broadcast (NetworkMessage (
         type =MessageTypes .QUESTION ,
-        data =question_data
+        data =public_question_data (question_data )
         ))
 
-    def submit_answer (self ,answer :str )->None :
+    def prefetch_question (self ,round_number :int ,question_data :dict ,
+    question :Optional [Question ]=None )->None :
 
-        answer_time =time .time ()-self .question_start_time
+        if not self .is_host :
+            return
 
-        if self .is_host :
+        self ._record_action ("prefetch_question",round =round_number ,question =question_data )
+        self ._cache_round (round_number ,question_data ,question )
 
-            self .players ["host"].current_answer =answer
-            self .players ["host"].answer_time =answer_time
+        key =new_round_key ()
+        self .round_keys [round_number ]=key
+        self .round_data [round_number ]=question_data
 
+        message =self ._prefetch_message (round_number )
+        for player in list (self .players .values ()):
+            if player .id !="host"and player .prefetch :
+                self .server .send_to_client (player .id ,message )
 
-            all_answered =all (
-            p .current_answer is not None
-            for p in self .players .values ()
-            )
-            if all_answered :
-                self .all_answers_received =True
+    def _prefetch_message (self ,round_number :int )->NetworkMessage :
+
+        blob =seal_question (public_question_data (self .round_data [round_number ]),self .round_keys [round_number ])
+        return NetworkMessage (
+        type =MessageTypes .QUESTION_PREFETCH ,
+        data ={"round":round_number ,"blob":blob }
+        )
+
+    def reveal_question (self ,round_number :int ,eliminated :set =None ,
+    lead :float =REVEAL_LEAD_TIME )->bool :
+
+        if not self .is_host or round_number not in self .round_data :
+            return False
+
+        self ._record_action ("reveal_question",round =round_number ,eliminated =sorted (eliminated or ()),lead =lead )
+        question_data =self .round_data .pop (round_number )
+        key =self .round_keys .pop (round_number )
+        self ._go_live (round_number )
+        self ._reset_answers (eliminated or set (),lead )
+
+        start_at =self .clock ()+lead
+        reveal_data ={"round":round_number ,"key":key ,"start_in":int (lead *1000 )}
+        legacy_ids =list (self .relays )
+        for player in list (self .players .values ()):
+            if player .id =="host":
+                continue
+            if not player .prefetch :
+                legacy_ids .append (player .id )
+                continue
+            data =reveal_data
+            link =self .links .get (player .id )
+            if link is not None and link .synced :
+                data =dict (reveal_data ,start_at =link .to_peer (start_at ))
+            self .server .send_to_client (player .id ,NetworkMessage (
+            type =MessageTypes .QUESTION_REVEAL ,
+            data =data
+            ))
+
+        if self .events :
+            self .events .emit (EVENT_QUESTION ,question_id =question_data .get ("id"),round =round_number )
+        if lead >0 :
+            self .scheduler .schedule (lead ,self ._start_revealed ,question_data ,legacy_ids ,True )
+        else :
+            self ._start_revealed (question_data ,legacy_ids ,False )
+        return True
+
+    def _start_revealed (self ,question_data :dict ,legacy_ids :list [str ],queued :bool )->None :
+
+        legacy =NetworkMessage (
+        type =MessageTypes .QUESTION ,
+        data =public_question_data (question_data )
+        )
+        send =self .server .post_to_client if queued else self .server .send_to_client
+        self ._start_question (question_data )
+        for client_id in legacy_ids :
+            send (client_id ,legacy )
+
+    def submit_answer (self ,answer :str )->None :
+
+        answer_time =self .clock ()-self .question_start_time
+
+        if self .is_host :
+
+            self ._record_action ("answer",id ="host",answer =answer ,time =answer_time )
+            self ._process_player_answer ("host",{"answer":answer ,"time":answer_time })
         else :
 
             self .client .send (NetworkMessage (
             type =MessageTypes .ANSWER ,
-            data ={"answer":answer ,"time":answer_time }
+            data ={"answer":answer ,"time":answer_time ,"answered_at":self .clock ()}
             ))
 
     def send_answer_results (self ,results :dict )->None :
@@ -642,16 +1497,26 @@ class GameLobby :
         if not self .is_host :
             return
 
-        self .server .broadcast (NetworkMessage (
-        type =MessageTypes .ANSWER_RESULT ,
-        data =results
-        ))
+        self ._record_action ("send_answer_results",results =results )
+        with self .state_lock :
+            self .state_version +=1
+            self .eliminated .update (results .get ("eliminated_this_round",[]))
+            for player_id ,fields in self ._results_delta (results )["players"].items ():
+                if player_id in self .players :
+                    self .players [player_id ].score =fields ["score"]
+            if self .events :
+                self .events .emit (EVENT_ROUND_END ,version =self .state_version ,results =results )
+            self .server .broadcast (NetworkMessage (
+            type =MessageTypes .ANSWER_RESULT ,
+            data =dict (results ,version =self .state_version )
+            ))
 
     def send_round_end (self ,results :list )->None :
 
         if not self .is_host :
             return
 
+        self ._record_action ("send_round_end",results =results )
         self .server .broadcast (NetworkMessage (
         type =MessageTypes .ROUND_END ,
         data ={"results":results }
@@ -662,21 +1527,104 @@ class GameLobby :
         if not self .is_host :
             return
 
+        self ._record_action ("send_game_end",final_scores =final_scores )
         self .server .broadcast (NetworkMessage (
         type =MessageTypes .GAME_END ,
         data ={"final_scores":final_scores }
         ))
+        if self .events :
+            self .events .emit (EVENT_GAME_END ,mode =self .game_mode ,players =final_scores )
 
     def get_local_ip (self )->str :
 
-        try :
-            s =socket .socket (socket .AF_INET ,socket .SOCK_DGRAM )
-            s .connect (("8.8.8.8",80 ))
-            ip =s .getsockname ()[0 ]
-            s .close ()
-            return ip
-        except :
-            return "127.0.0.1"
+        return get_local_ip ()
+
+    def get_network_stats (self )->dict :
+
+        if self .server :
+            stats =self .server .get_stats ()
+            for client_id ,link_stats in self .get_link_stats ().items ():
+                stats .setdefault (client_id ,{}).update (link_stats )
+            return stats
+        if self .client :
+            stats =self .client .get_stats ()
+            stats ["rtt_ms"]=self .host_rtt *1000 if self .host_rtt is not None else None
+            return {"host":stats }
+        return {}
+
+    def get_pump_stats (self )->dict :
+
+        return self .pump_stats .snapshot ()
+
+    def collect_stats (self )->dict :
+
+        stats ={
+        "role":"host"if self .is_host else "client",
+        "peers":self .get_network_stats (),
+        "pump":self .get_pump_stats ()
+        }
+        if self .server :
+            stats ["totals"]=self .server .get_totals ()
+        return stats
+
+    def start_stats_export (self ,path :Optional [str ]=None ,port :Optional [int ]=None ,
+    interval :float =STATS_DUMP_INTERVAL )->bool :
+
+        if path :
+            dumper =StatsDumper (self .collect_stats ,path ,interval )
+            dumper .start ()
+            self .stats_exporters .append (dumper )
+        if port is not None :
+            stats_socket =StatsSocket (self .collect_stats ,port )
+            if not stats_socket .start ():
+                return False
+            self .stats_exporters .append (stats_socket )
+        return True
+
+    def start_recording (self ,path :str )->SessionRecorder :
+
+        self .stop_recording ()
+        self .recorder =SessionRecorder (path ,ROLE_HOST if self .is_host else ROLE_CLIENT )
+        if self .server :
+            self .server .set_recorder (self .recorder )
+            if "host"in self .players :
+                self ._record_action ("seat",id ="host",name =self .players ["host"].name )
+        if self .client :
+            self .client .recorder =self .recorder
+            if self .client .connection :
+                self .client .connection .recorder =self .recorder
+        return self .recorder
+
+    def _record_action (self ,action :str ,**data )->None :
+
+        if self .recorder is not None and self .is_host :
+            self .recorder .record (DIRECTION_HOST ,"host",NetworkMessage (type =action ,data =data ))
+
+    def stop_recording (self )->None :
+
+        if self .recorder is None :
+            return
+        if self .server :
+            self .server .set_recorder (None )
+        if self .client :
+            self .client .recorder =None
+            if self .client .connection :
+                self .client .connection .recorder =None
+        self .recorder .close ()
+        self .recorder =None
+
+    def get_link_stats (self )->dict :
+
+        return {client_id :link .snapshot ()for client_id ,link in list (self .links .items ())}
+
+    def get_rtt_ms (self ,player_id :str )->Optional [float ]:
+
+        if not self .is_host :
+            return self .host_rtt *1000 if self .host_rtt is not None and player_id =="host"else None
+        link =self .links .get (player_id )
+        if link is None or link .srtt is None :
+            return None
+        return link .srtt *1000
 
     def get_players_list (self )->list [OnlinePlayer ]:
 
@@ -684,6 +1632,18 @@ class GameLobby :
 
     def close (self )->None :
 
+        self .closing =True
+        self .stop_recording ()
+        if self .round_deadline is not None :
+            self .round_deadline .cancel ()
+        if self .idle_timer is not None :
+            self .idle_timer .cancel ()
+        for exporter in self .stats_exporters :
+            exporter .stop ()
+        self .stats_exporters =[]
+        if self .beacon :
+            self .beacon .stop ()
+            self .beacon =None
         if self .server :
             self .server .stop ()
         if self .client :
@@ -0,0 +1,75 @@
+import base64
+import hashlib
+import json
+import secrets
+import zlib
+
+from triviador.core.models import Question ,QuestionType
+from triviador.network.protocol import ProtocolError
+
+
+ROUND_KEY_SIZE =12
+_CHECK_SIZE =4
+
+
+def new_round_key ()->str :
+
+    return base64 .urlsafe_b64encode (secrets .token_bytes (ROUND_KEY_SIZE )).decode ("ascii")
+
+
+def _keystream (key :bytes ,length :int )->bytes :
+
+    blocks =[]
+    counter =0
+    while counter *32 <length :
+        blocks .append (hashlib .sha256 (key +counter .to_bytes (4 ,"big")).digest ())
+        counter +=1
+    return b"".join (blocks )[:length ]
+
+
+def _xor (data :bytes ,key :bytes )->bytes :
+
+    stream =_keystream (key ,len (data ))
+    return (int .from_bytes (data ,"big")^int .from_bytes (stream ,"big")).to_bytes (len (data ),"big")
+
+
+def seal_question (question_data :dict ,key :str )->str :
+
+    raw_key =base64 .urlsafe_b64decode (key )
+    plain =zlib .compress (json .dumps (question_data ,separators =(",",":")).encode ("utf-8"),9 )
+    check =hashlib .sha256 (raw_key +plain ).digest ()[:_CHECK_SIZE ]
+    return base64 .b64encode (_xor (check +plain ,raw_key )).decode ("ascii")
+
+
+def open_question (blob :str ,key :str )->dict :
+
+    try :
+        raw_key =base64 .urlsafe_b64decode (key )
+        sealed =_xor (base64 .b64decode (blob ),raw_key )
+    except (ValueError ,TypeError )as e :
+        raise ProtocolError ("Невалиден запечатан въпрос")from e
+    check ,plain =sealed [:_CHECK_SIZE ],sealed [_CHECK_SIZE :]
+    if hashlib .sha256 (raw_key +plain ).digest ()[:_CHECK_SIZE ]!=check :
+        raise ProtocolError ("Грешен ключ за въпроса")
+    try :
+        return json .loads (zlib .decompress (plain ).decode ("utf-8"))
+    except (zlib .error ,ValueError )as e :
+        raise ProtocolError ("Невалиден запечатан въпрос")from e
+
+
+def public_question_data (question_data :dict )->dict :
+
+    return {key :value for key ,value in question_data .items ()if key !="correct_answer"}
+
+
+def question_from_data (question_data :dict )->Question :
+
+    return Question (
+    id =question_data .get ("id",0 ),
+    category =question_data .get ("category",""),
+    difficulty =question_data .get ("difficulty",1 ),
+    question_type =QuestionType (question_data .get ("question_type","multiple_choice")),
+    question_text =question_data .get ("text",""),
+    correct_answer =question_data .get ("correct_answer",""),
+    options =question_data .get ("options",[])
+    )
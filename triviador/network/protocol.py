@@ -0,0 +1,541 @@
+import json
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from triviador.core.config import COMPRESSION_THRESHOLD ,COMPRESSION_LEVEL
+
+
+CODEC_JSON ="json"
+CODEC_BINARY ="binary"
+SUPPORTED_CODECS =[CODEC_BINARY ,CODEC_JSON ]
+
+FRAME_MAGIC =0xB7
+FLAG_COMPRESSED =0x01
+
+COMPRESSION_ZLIB ="zlib-dict-1"
+SUPPORTED_COMPRESSION =[COMPRESSION_ZLIB ]
+
+FEATURE_PREFETCH ="prefetch"
+FEATURE_PING ="ping"
+FEATURE_SYNC ="sync"
+SUPPORTED_FEATURES =[FEATURE_PREFETCH ,FEATURE_PING ,FEATURE_SYNC ]
+
+ROLE_PLAYER ="player"
+ROLE_RELAY ="relay"
+ROLE_SPECTATOR ="spectator"
+
+MAX_FRAME_SIZE =1 <<20
+
+
+class ProtocolError (Exception ):
+    pass
+
+
+@dataclass
+class NetworkMessage :
+
+    type :str
+    data :dict
+    sender_id :Optional [str ]=None
+
+    def to_json (self )->str :
+        return json .dumps ({
+        "type":self .type ,
+        "data":self .data ,
+        "sender_id":self .sender_id
+        })
+
+    @classmethod
+    def from_json (cls ,json_str :str )->"NetworkMessage":
+        data =json .loads (json_str )
+        return cls (
+        type =data ["type"],
+        data =data ["data"],
+        sender_id =data .get ("sender_id")
+        )
+
+    def to_binary (self )->bytes :
+
+        return bytes (self .to_buffer ())
+
+    def to_buffer (self )->bytearray :
+
+        out =bytearray ()
+        type_id =MESSAGE_TYPE_IDS .get (self .type ,0 )
+        out .append (type_id )
+        if type_id ==0 :
+            _write_str (out ,self .type )
+        if self .sender_id is None :
+            out .append (_TAG_NONE )
+        else :
+            out .append (_TAG_STR )
+            _write_str (out ,self .sender_id )
+        _write_value (out ,self .data )
+        return out
+
+    @classmethod
+    def from_binary (cls ,payload :bytes )->"NetworkMessage":
+
+        view =memoryview (payload )
+        if len (view )==0 :
+            raise ProtocolError ("Празно съобщение")
+        type_id =view [0 ]
+        pos =1
+        if type_id ==0 :
+            msg_type ,pos =_read_str (view ,pos )
+        elif type_id in MESSAGE_TYPE_NAMES :
+            msg_type =MESSAGE_TYPE_NAMES [type_id ]
+        else :
+            raise ProtocolError (f"Непознат тип съобщение: {type_id }")
+        sender_id ,pos =_read_value (view ,pos )
+        data ,pos =_read_value (view ,pos )
+        if pos !=len (view ):
+            raise ProtocolError ("Излишни байтове след съобщението")
+        if not isinstance (data ,dict ):
+            raise ProtocolError ("Данните на съобщението не са речник")
+        return cls (type =msg_type ,data =data ,sender_id =sender_id )
+
+
+class MessageTypes :
+
+
+    JOIN_GAME ="join_game"
+    PLAYER_JOINED ="player_joined"
+    PLAYER_LEFT ="player_left"
+    GAME_START ="game_start"
+
+
+    QUESTION ="question"
+    QUESTION_PREFETCH ="question_prefetch"
+    QUESTION_REVEAL ="question_reveal"
+    ANSWER ="answer"
+    ANSWER_RESULT ="answer_result"
+    ROUND_END ="round_end"
+    GAME_END ="game_end"
+
+
+    USE_JOKER ="use_joker"
+    JOKER_RESULT ="joker_result"
+
+
+    CHAT_MESSAGE ="chat_message"
+
+
+    SYNC_STATE ="sync_state"
+    PING ="ping"
+    PONG ="pong"
+
+
+    ERROR ="error"
+
+
+MESSAGE_TYPE_IDS ={
+MessageTypes .JOIN_GAME :1 ,
+MessageTypes .PLAYER_JOINED :2 ,
+MessageTypes .PLAYER_LEFT :3 ,
+MessageTypes .GAME_START :4 ,
+MessageTypes .QUESTION :5 ,
+MessageTypes .ANSWER :6 ,
+MessageTypes .ANSWER_RESULT :7 ,
+MessageTypes .ROUND_END :8 ,
+MessageTypes .GAME_END :9 ,
+MessageTypes .USE_JOKER :10 ,
+MessageTypes .JOKER_RESULT :11 ,
+MessageTypes .CHAT_MESSAGE :12 ,
+MessageTypes .SYNC_STATE :13 ,
+MessageTypes .PING :14 ,
+MessageTypes .PONG :15 ,
+MessageTypes .ERROR :16 ,
+MessageTypes .QUESTION_PREFETCH :17 ,
+MessageTypes .QUESTION_REVEAL :18 ,
+}
+MESSAGE_TYPE_NAMES ={type_id :name for name ,type_id in MESSAGE_TYPE_IDS .items ()}
+
+
+KEY_TABLE =[
+"type","data","sender_id","name","id","ready","players","player",
+"your_id","success","message","error","codecs","codec",
+"text","options","question_type","category","difficulty",
+"question_number","total_questions","correct_answer","is_special_round",
+"game_mode","eliminated_players","answer","time","joker_type",
+"remaining_options","votes","remaining_count","suggested_value",
+"confidence","player_id","results","final_scores","player_results",
+"is_correct","points","total_score","score","is_eliminated",
+"eliminated_this_round","endless_game_over","loser_names",
+"compression","features","round","blob","key","start_in",
+"t","peer","rtt","answered_at","start_at",
+"session","version","snapshot","delta","request","connected",
+"jokers","eliminated","question","time_left","answered","rekey",
+"game_started","role","joined","left",
+]
+KEY_IDS ={key :i +1 for i ,key in enumerate (KEY_TABLE )}
+
+
+_TAG_NONE =0
+_TAG_FALSE =1
+_TAG_TRUE =2
+_TAG_INT =3
+_TAG_FLOAT =4
+_TAG_STR =5
+_TAG_LIST =6
+_TAG_DICT =7
+
+_FLOAT =struct .Struct ("!d")
+
+
+def _write_varint (out :bytearray ,value :int )->None :
+
+    while value >=0x80 :
+        out .append ((value &0x7F )|0x80 )
+        value >>=7
+    out .append (value )
+
+
+def _read_varint (view :memoryview ,pos :int )->tuple [int ,int ]:
+
+    result =0
+    shift =0
+    while True :
+        if pos >=len (view ):
+            raise ProtocolError ("Непълно число")
+        byte =view [pos ]
+        pos +=1
+        result |=(byte &0x7F )<<shift
+        if not byte &0x80 :
+            return result ,pos
+        shift +=7
+
+
+def _write_str (out :bytearray ,value :str )->None :
+
+    raw =value .encode ("utf-8")
+    _write_varint (out ,len (raw ))
+    out +=raw
+
+
+def _read_str (view :memoryview ,pos :int )->tuple [str ,int ]:
+
+    length ,pos =_read_varint (view ,pos )
+    end =pos +length
+    if end >len (view ):
+        raise ProtocolError ("Непълен низ")
+    return str (view [pos :end ],"utf-8"),end
+
+
+def _write_value (out :bytearray ,value )->None :
+
+    if value is None :
+        out .append (_TAG_NONE )
+    elif value is True :
+        out .append (_TAG_TRUE )
+    elif value is False :
+        out .append (_TAG_FALSE )
+    elif isinstance (value ,int ):
+        out .append (_TAG_INT )
+        _write_varint (out ,(value <<1 )if value >=0 else ((-value <<1 )-1 ))
+    elif isinstance (value ,float ):
+        out .append (_TAG_FLOAT )
+        out +=_FLOAT .pack (value )
+    elif isinstance (value ,str ):
+        out .append (_TAG_STR )
+        _write_str (out ,value )
+    elif isinstance (value ,(list ,tuple ,set )):
+        out .append (_TAG_LIST )
+        _write_varint (out ,len (value ))
+        for item in value :
+            _write_value (out ,item )
+    elif isinstance (value ,dict ):
+        out .append (_TAG_DICT )
+        _write_varint (out ,len (value ))
+        for key ,item in value .items ():
+            key =str (key )
+            key_id =KEY_IDS .get (key ,0 )
+            out .append (key_id )
+            if key_id ==0 :
+                _write_str (out ,key )
+            _write_value (out ,item )
+    else :
+        raise ProtocolError (f"Неподдържан тип: {type (value ).__name__ }")
+
+
+def _read_value (view :memoryview ,pos :int ):
+
+    if pos >=len (view ):
+        raise ProtocolError ("Непълна стойност")
+    tag =view [pos ]
+    pos +=1
+    if tag ==_TAG_NONE :
+        return None ,pos
+    if tag ==_TAG_FALSE :
+        return False ,pos
+    if tag ==_TAG_TRUE :
+        return True ,pos
+    if tag ==_TAG_INT :
+        raw ,pos =_read_varint (view ,pos )
+        return (raw >>1 )if not raw &1 else -((raw +1 )>>1 ),pos
+    if tag ==_TAG_FLOAT :
+        if pos +8 >len (view ):
+            raise ProtocolError ("Непълно дробно число")
+        return _FLOAT .unpack_from (view ,pos )[0 ],pos +8
+    if tag ==_TAG_STR :
+        return _read_str (view ,pos )
+    if tag ==_TAG_LIST :
+        count ,pos =_read_varint (view ,pos )
+        items =[]
+        for _ in range (count ):
+            item ,pos =_read_value (view ,pos )
+            items .append (item )
+        return items ,pos
+    if tag ==_TAG_DICT :
+        count ,pos =_read_varint (view ,pos )
+        result ={}
+        for _ in range (count ):
+            if pos >=len (view ):
+                raise ProtocolError ("Непълен ключ")
+            key_id =view [pos ]
+            pos +=1
+            if key_id ==0 :
+                key ,pos =_read_str (view ,pos )
+            elif key_id <=len (KEY_TABLE ):
+                key =KEY_TABLE [key_id -1 ]
+            else :
+                raise ProtocolError (f"Непознат ключ: {key_id }")
+            result [key ],pos =_read_value (view ,pos )
+        return result ,pos
+    raise ProtocolError (f"Непознат етикет: {tag }")
+
+
+def frame_header (flags :int ,length :int )->bytes :
+
+    out =bytearray ((FRAME_MAGIC ,flags ))
+    _write_varint (out ,length )
+    return bytes (out )
+
+
+def encode_parts (message :NetworkMessage ,codec :str =CODEC_JSON ,
+compressor :Optional ["Compressor"]=None ,stats =None )->tuple [bytes ,bytes ]:
+
+    if codec ==CODEC_BINARY :
+        payload =message .to_buffer ()
+        flags =0
+        if compressor is not None and len (payload )>=compressor .threshold :
+            start =time .perf_counter ()
+            packed =compressor .compress (payload )
+            if stats is not None :
+                stats .record_compression (len (payload ),len (packed ),time .perf_counter ()-start )
+            payload =packed
+            flags =FLAG_COMPRESSED
+        return frame_header (flags ,len (payload )),payload
+    return b"",message .to_json ().encode ("utf-8")
+
+
+def encode_message (message :NetworkMessage ,codec :str =CODEC_JSON ,
+compressor :Optional ["Compressor"]=None ,stats =None )->bytes :
+
+    header ,payload =encode_parts (message ,codec ,compressor ,stats )
+    return header +payload if header else payload
+
+
+def negotiate_codec (offered :Optional [list ])->str :
+
+    for codec in offered or []:
+        if codec in SUPPORTED_CODECS :
+            return codec
+    return CODEC_JSON
+
+
+def negotiate_compression (offered :Optional [list ],codec :str )->Optional [str ]:
+
+    if codec !=CODEC_BINARY :
+        return None
+    for method in offered or []:
+        if method in SUPPORTED_COMPRESSION :
+            return method
+    return None
+
+
+PRESET_WORDS =[
+"География","Изкуство","История","Наука","Обща култура","Спорт",
+"Коя","Кой","Кое","Колко","Кога","Къде","Как","година","години",
+"България","български","българския","столицата","на","от","във","за",
+"най-дългата","най-високият","най-голямата","първият","първата",
+"километри","метри","закръглено","света","река","планина","връх",
+"война","цар","хан","написал","нарисувал","открита","основана",
+"химичният символ","атомният номер","планета","играчи","отбор",
+"Играта е пълна","Играта вече е започнала","Нямате повече такива жокери!",
+"Жокерите не могат да се използват в специален рунд!",
+]
+
+
+_preset_dictionary :Optional [bytes ]=None
+
+
+def preset_dictionary ()->bytes :
+
+    global _preset_dictionary
+    if _preset_dictionary is not None :
+        return _preset_dictionary
+
+    out =bytearray ()
+    for word in PRESET_WORDS :
+        _write_str (out ,word )
+
+    result_row ={"player_id":"","name":"","answer":"","is_correct":False ,
+    "points":0 ,"total_score":0 }
+    templates =[
+    NetworkMessage (type =MessageTypes .ANSWER_RESULT ,data ={
+    "correct_answer":"",
+    "player_results":[result_row ,result_row ],
+    "is_special_round":False ,
+    "eliminated_this_round":[],
+    "endless_game_over":False
+    }),
+    NetworkMessage (type =MessageTypes .QUESTION ,data ={
+    "text":"",
+    "options":["","","",""],
+    "question_type":"multiple_choice",
+    "category":"",
+    "difficulty":1 ,
+    "question_number":1 ,
+    "total_questions":10 ,
+    "correct_answer":"",
+    "is_special_round":False ,
+    "game_mode":"standard",
+    "eliminated_players":[]
+    })
+    ]
+    for template in templates :
+        out +=template .to_binary ()
+
+    _preset_dictionary =bytes (out )
+    return _preset_dictionary
+
+
+_SYNC_TAIL =b"\x00\x00\xff\xff"
+
+
+class Compressor :
+
+
+    def __init__ (self ,level :int =COMPRESSION_LEVEL ,threshold :int =COMPRESSION_THRESHOLD ):
+        self .threshold =threshold
+        self ._zlib =zlib .compressobj (level ,zlib .DEFLATED ,-15 ,zdict =preset_dictionary ())
+
+    def compress (self ,payload :bytes )->bytes :
+
+        data =self ._zlib .compress (payload )+self ._zlib .flush (zlib .Z_SYNC_FLUSH )
+        if data .endswith (_SYNC_TAIL ):
+            return data [:-len (_SYNC_TAIL )]
+        return data
+
+
+class Decompressor :
+
+
+    def __init__ (self ):
+        self ._zlib =zlib .decompressobj (-15 ,zdict =preset_dictionary ())
+
+    def decompress (self ,data :bytes )->bytes :
+
+        try :
+            payload =self ._zlib .decompress (data +_SYNC_TAIL ,MAX_FRAME_SIZE )
+        except zlib .error as e :
+            raise ProtocolError ("Невалидни компресирани данни")from e
+        if self ._zlib .unconsumed_tail :
+            raise ProtocolError ("Прекалено голямо съобщение")
+        return payload
+
+
+class FrameDecoder :
+
+
+    def __init__ (self ,stats =None ):
+        self .buffer =bytearray ()
+        self .stats =stats
+        self .decompressor :Optional [Decompressor ]=None
+        self ._json_decoder =json .JSONDecoder ()
+
+    def feed (self ,data :bytes )->list [NetworkMessage ]:
+
+        self .buffer +=data
+        messages =[]
+        while self .buffer :
+            if self .buffer [0 ]==FRAME_MAGIC :
+                message =self ._next_binary ()
+            else :
+                message =self ._next_json ()
+            if message is None :
+                break
+            messages .append (message )
+        if len (self .buffer )>MAX_FRAME_SIZE :
+            raise ProtocolError ("Прекалено голямо съобщение")
+        return messages
+
+    def _next_binary (self )->Optional [NetworkMessage ]:
+
+        view =memoryview (self .buffer )
+        try :
+            if len (view )<3 :
+                return None
+            flags =view [1 ]
+            try :
+                length ,start =_read_varint (view ,2 )
+            except ProtocolError :
+                return None
+            if length >MAX_FRAME_SIZE :
+                raise ProtocolError ("Прекалено голямо съобщение")
+            end =start +length
+            if end >len (view ):
+                return None
+            payload =bytes (view [start :end ])
+        finally :
+            view .release ()
+        del self .buffer [:end ]
+        if flags &~FLAG_COMPRESSED :
+            raise ProtocolError (f"Неподдържани флагове: {flags }")
+        if flags &FLAG_COMPRESSED :
+            if self .decompressor is None :
+                self .decompressor =Decompressor ()
+            start =time .perf_counter ()
+            payload =self .decompressor .decompress (payload )
+            if self .stats is not None :
+                self .stats .record_decompression (time .perf_counter ()-start )
+        message =NetworkMessage .from_binary (payload )
+        if self .stats is not None :
+            self .stats .record_frame_in (message .type ,end )
+        return message
+
+    def _next_json (self )->Optional [NetworkMessage ]:
+
+        try :
+            text =self .buffer .decode ("utf-8")
+        except UnicodeDecodeError as e :
+            if e .start ==0 :
+                raise ProtocolError ("Невалиден UTF-8")from e
+            text =self .buffer [:e .start ].decode ("utf-8")
+        stripped =text .lstrip ()
+        if not stripped :
+            return None
+        skipped =len (text )-len (stripped )
+        try :
+            data ,end =self ._json_decoder .raw_decode (stripped )
+        except json .JSONDecodeError :
+            if len (self .buffer )>MAX_FRAME_SIZE :
+                raise ProtocolError ("Невалиден JSON")
+            return None
+        consumed =len (text [:skipped +end ].encode ("utf-8"))
+        del self .buffer [:consumed ]
+        try :
+            message =NetworkMessage (
+            type =data ["type"],
+            data =data ["data"],
+            sender_id =data .get ("sender_id")
+            )
+        except (KeyError ,TypeError )as e :
+            raise ProtocolError ("Невалидно JSON съобщение")from e
+        if self .stats is not None :
+            self .stats .record_frame_in (message .type ,consumed )
+        return message
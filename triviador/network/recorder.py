@@ -0,0 +1,201 @@
+import argparse
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator ,Optional
+
+from triviador.network.protocol import (
+NetworkMessage ,ProtocolError ,_write_varint ,_read_varint ,_write_str ,_read_str
+)
+
+
+RECORD_MAGIC =b"TRVR1"
+DIRECTION_IN =0
+DIRECTION_OUT =1
+DIRECTION_HOST =2
+ROLE_HOST =0
+ROLE_CLIENT =1
+
+
+@dataclass
+class RecordedEvent :
+
+    at :float
+    direction :int
+    conn_id :str
+    message :NetworkMessage
+
+
+class SessionRecorder :
+
+
+    def __init__ (self ,path :str ,role :int =ROLE_HOST ):
+        self .path =path
+        self .lock =threading .Lock ()
+        self .file =open (path ,"wb")
+        self .file .write (RECORD_MAGIC +bytes ((role ,)))
+        self .started =time .monotonic ()
+        self .last_us =0
+        self .events =0
+        self .closed =False
+
+    def record (self ,direction :int ,conn_id :str ,message :NetworkMessage )->None :
+
+        payload =message .to_buffer ()
+        with self .lock :
+            if self .closed :
+                return
+            now_us =int ((time .monotonic ()-self .started )*1_000_000 )
+            out =bytearray ((direction ,))
+            _write_varint (out ,max (0 ,now_us -self .last_us ))
+            _write_str (out ,conn_id )
+            _write_varint (out ,len (payload ))
+            out +=payload
+            self .file .write (out )
+            self .last_us =max (self .last_us ,now_us )
+            self .events +=1
+
+    def close (self )->None :
+
+        with self .lock :
+            if self .closed :
+                return
+            self .closed =True
+            self .file .close ()
+
+
+def read_session (path :str )->tuple [int ,list [RecordedEvent ]]:
+
+    with open (path ,"rb")as f :
+        data =f .read ()
+    if not data .startswith (RECORD_MAGIC )or len (data )<=len (RECORD_MAGIC ):
+        raise ProtocolError ("Невалиден запис на сесия")
+    role =data [len (RECORD_MAGIC )]
+    return role ,list (_iter_events (memoryview (data ),len (RECORD_MAGIC )+1 ))
+
+
+def _iter_events (view :memoryview ,pos :int )->Iterator [RecordedEvent ]:
+
+    at_us =0
+    while pos <len (view ):
+        direction =view [pos ]
+        delta ,pos =_read_varint (view ,pos +1 )
+        conn_id ,pos =_read_str (view ,pos )
+        length ,pos =_read_varint (view ,pos )
+        end =pos +length
+        if end >len (view ):
+            raise ProtocolError ("Непълен запис на сесия")
+        at_us +=delta
+        yield RecordedEvent (at_us /1_000_000 ,direction ,conn_id ,NetworkMessage .from_binary (bytes (view [pos :end ])))
+        pos =end
+
+
+class ReplayDriver :
+
+
+    def __init__ (self ,role :int ,events :list [RecordedEvent ],lobby ,speed :float =1.0 ,
+    conn_id :Optional [str ]=None ):
+        self .lobby =lobby
+        self .speed =speed
+        self .events =[event for event in events if self ._wanted (role ,event ,conn_id )]
+        self .replayed =0
+
+    def _wanted (self ,role :int ,event :RecordedEvent ,conn_id :Optional [str ])->bool :
+
+        if self .lobby .is_host :
+            return role ==ROLE_HOST and event .direction in (DIRECTION_IN ,DIRECTION_HOST )
+        if role ==ROLE_CLIENT :
+            return event .direction ==DIRECTION_IN
+        return event .direction ==DIRECTION_OUT and event .conn_id ==conn_id
+
+    def run (self )->dict :
+
+        started =time .monotonic ()
+        first =self .events [0 ].at if self .events else 0.0
+        lag =0.0
+        for event in self .events :
+            if self .speed >0 :
+                due =started +(event .at -first )/self .speed
+                delay =due -time .monotonic ()
+                if delay >0 :
+                    time .sleep (delay )
+                else :
+                    lag =max (lag ,-delay )
+            self ._deliver (event )
+            self .lobby .pump ()
+        elapsed =time .monotonic ()-started
+        return {
+        "events":self .replayed ,
+        "elapsed":elapsed ,
+        "events_per_second":self .replayed /elapsed if elapsed >0 else 0.0 ,
+        "max_lag_ms":lag *1000
+        }
+
+    def _deliver (self ,event :RecordedEvent )->None :
+
+        message =NetworkMessage (type =event .message .type ,data =event .message .data ,sender_id =event .message .sender_id )
+        if event .direction ==DIRECTION_HOST :
+            self ._apply_action (message .type ,message .data )
+        elif self .lobby .is_host :
+            message .sender_id =event .conn_id
+            self .lobby ._handle_server_message (message ,event .conn_id )
+        else :
+            self .lobby ._handle_client_message (message )
+        self .replayed +=1
+
+    def _apply_action (self ,action :str ,data :dict )->None :
+
+        from triviador.network.network import OnlinePlayer
+        from triviador.logic.rng import GameRandom
+
+        lobby =self .lobby
+        if action =="seat":
+            lobby .players [data ["id"]]=OnlinePlayer (id =data ["id"],name =data ["name"])
+        elif action =="start_game":
+            lobby .start_game (GameRandom (data ["seed"]))
+        elif action =="send_question":
+            lobby .send_question (data ["question"],set (data ["eliminated"]))
+        elif action =="prefetch_question":
+            lobby .prefetch_question (data ["round"],data ["question"])
+        elif action =="reveal_question":
+            lobby .reveal_question (data ["round"],set (data ["eliminated"]),data ["lead"])
+        elif action =="answer":
+            lobby ._process_player_answer (data ["id"],data )
+        elif action =="close_round":
+            lobby ._close_round (lobby .round_id )
+        elif action =="send_answer_results":
+            lobby .send_answer_results (data ["results"])
+        elif action =="send_round_end":
+            lobby .send_round_end (data ["results"])
+        elif action =="send_game_end":
+            lobby .send_game_end (data ["final_scores"])
+
+
+def main ()->None :
+
+    from triviador.network.network import GameLobby ,GameServer ,GameClient
+
+    parser =argparse .ArgumentParser (description ="Възпроизвеждане на записана сесия")
+    parser .add_argument ("path")
+    parser .add_argument ("--speed",type =float ,default =0.0 ,help ="1 = реално време, 0 = максимална скорост")
+    parser .add_argument ("--client",help ="идентификатор на клиент от запис на хост")
+    parser .add_argument ("--repeat",type =int ,default =1 )
+    args =parser .parse_args ()
+
+    role ,events =read_session (args .path )
+    as_host =role ==ROLE_HOST and args .client is None
+    print (f"събития: {len (events )}, роля: {'хост' if role == ROLE_HOST else 'клиент'}")
+    for _ in range (args .repeat ):
+        lobby =GameLobby (is_host =as_host )
+        if as_host :
+            lobby .server =GameServer ()
+        else :
+            lobby .client =GameClient ()
+        report =ReplayDriver (role ,events ,lobby ,args .speed ,args .client ).run ()
+        lobby .close ()
+        print (f"възпроизведени: {report ['events']}, за {report ['elapsed']:.3f} с "
+        f"({report ['events_per_second']:.0f}/с), макс. закъснение: {report ['max_lag_ms']:.1f} ms")
+
+
+if __name__ =="__main__":
+    main ()
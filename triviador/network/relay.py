@@ -0,0 +1,231 @@
+import argparse
+import threading
+import time
+
+from triviador.core.config import DEFAULT_PORT ,RELAY_PORT
+from triviador.network.network import GameServer ,GameClient
+from triviador.network.protocol import (
+NetworkMessage ,MessageTypes ,CODEC_JSON ,SUPPORTED_CODECS ,SUPPORTED_COMPRESSION ,
+FEATURE_PING ,FEATURE_SYNC ,ROLE_RELAY ,ROLE_SPECTATOR ,encode_parts ,negotiate_codec
+)
+
+
+RELAY_TYPES =(
+MessageTypes .GAME_START ,
+MessageTypes .QUESTION ,
+MessageTypes .ANSWER_RESULT ,
+MessageTypes .ROUND_END ,
+MessageTypes .GAME_END ,
+MessageTypes .PLAYER_JOINED ,
+MessageTypes .PLAYER_LEFT ,
+)
+CATCHUP_TYPES =(
+MessageTypes .GAME_START ,
+MessageTypes .QUESTION ,
+MessageTypes .ANSWER_RESULT ,
+MessageTypes .GAME_END ,
+)
+
+
+class SpectatorRelay :
+
+
+    def __init__ (self ,listen_port :int =RELAY_PORT ,name :str ="Реле"):
+        self .name =name
+        self .server =GameServer (listen_port )
+        self .upstream =GameClient ()
+        self .lock =threading .Lock ()
+        self .spectators :dict [str ,str ]={}
+        self .players :list =[]
+        self .catchup :dict [str ,NetworkMessage ]={}
+        self .connected =False
+        self .running =False
+        self .relayed =0
+        self .encodes =0
+        self .dropped =0
+
+    def start (self ,host_ip :str ,port :int =DEFAULT_PORT )->bool :
+
+        self .server .on_message =self ._handle_spectator
+        self .server .on_client_disconnected =self ._on_spectator_left
+        if not self .server .start ():
+            return False
+
+        self .upstream .on_message =self ._handle_upstream
+        self .upstream .on_disconnected =self ._on_upstream_lost
+        if not self .upstream .connect (host_ip ,port ):
+            self .server .stop ()
+            return False
+
+        self .running =True
+        self .upstream .send (NetworkMessage (
+        type =MessageTypes .JOIN_GAME ,
+        data ={
+        "name":self .name ,
+        "role":ROLE_RELAY ,
+        "codecs":SUPPORTED_CODECS ,
+        "compression":SUPPORTED_COMPRESSION ,
+        "features":[FEATURE_PING ,FEATURE_SYNC ]
+        }
+        ))
+        return True
+
+    def _handle_upstream (self ,message :NetworkMessage )->None :
+
+        if message .type ==MessageTypes .PING :
+            self .upstream .send (NetworkMessage (
+            type =MessageTypes .PONG ,
+            data ={"t":message .data .get ("t"),"peer":time .time ()}
+            ))
+            return
+
+        if message .type ==MessageTypes .PLAYER_JOINED and "your_id"in message .data :
+            self .upstream .set_codec (message .data .get ("codec",CODEC_JSON ),message .data .get ("compression"))
+            with self .lock :
+                self .players =message .data .get ("players",[])
+            self .connected =True
+            return
+
+        if message .type ==MessageTypes .SYNC_STATE :
+            self ._apply_roster (message .data .get ("delta",{}))
+            return
+
+        if message .type not in RELAY_TYPES :
+            return
+
+        data ={key :value for key ,value in message .data .items ()if key !="version"}
+        relayed =NetworkMessage (type =message .type ,data =data )
+        with self .lock :
+            if "players"in data :
+                self .players =data ["players"]
+            if message .type ==MessageTypes .QUESTION :
+                self .catchup .pop (MessageTypes .ANSWER_RESULT ,None )
+            if message .type in CATCHUP_TYPES :
+                self .catchup [message .type ]=relayed
+            self ._fan_out (relayed )
+
+    def _apply_roster (self ,delta :dict )->None :
+
+        with self .lock :
+            for p_data in delta .get ("joined",[]):
+                self .players .append (p_data )
+                self ._fan_out (NetworkMessage (type =MessageTypes .PLAYER_JOINED ,data ={"player":p_data }))
+            left =set (delta .get ("left",[]))
+            if left :
+                self .players =[p for p in self .players if p ["id"]not in left ]
+                for player_id in left :
+                    self ._fan_out (NetworkMessage (type =MessageTypes .PLAYER_LEFT ,data ={"player_id":player_id }))
+            rekey =delta .get ("rekey",{})
+            if rekey :
+                self .players =[dict (p ,id =rekey [p ["id"]])if p ["id"]in rekey else p for p in self .players ]
+                for p_data in self .players :
+                    old_id =next ((old for old ,new in rekey .items ()if new ==p_data ["id"]),None )
+                    if old_id is None :
+                        continue
+                    self ._fan_out (NetworkMessage (type =MessageTypes .PLAYER_LEFT ,data ={"player_id":old_id }))
+                    self ._fan_out (NetworkMessage (type =MessageTypes .PLAYER_JOINED ,data ={"player":p_data }))
+
+    def _fan_out (self ,message :NetworkMessage )->None :
+
+        frames :dict [str ,tuple [bytes ,bytes ]]={}
+        for client_id ,codec in list (self .spectators .items ()):
+            frame =frames .get (codec )
+            if frame is None :
+                frame =frames [codec ]=encode_parts (message ,codec )
+                self .encodes +=1
+            if not self .server .post_parts (client_id ,frame ,message .type ):
+                self .spectators .pop (client_id ,None )
+                self .server .disconnect_client (client_id )
+                self .dropped +=1
+        self .relayed +=1
+
+    def _handle_spectator (self ,message :NetworkMessage ,client_id :str )->None :
+
+        if message .type !=MessageTypes .JOIN_GAME :
+            return
+
+        codec =negotiate_codec (message .data .get ("codecs"))
+        with self .lock :
+            frames =[encode_parts (NetworkMessage (
+            type =MessageTypes .PLAYER_JOINED ,
+            data ={
+            "your_id":client_id ,
+            "players":self .players ,
+            "success":True ,
+            "codec":codec ,
+            "compression":None ,
+            "role":ROLE_SPECTATOR
+            }
+            ),CODEC_JSON )]
+            types =[MessageTypes .PLAYER_JOINED ]
+            for msg_type in CATCHUP_TYPES :
+                if msg_type in self .catchup :
+                    frames .append (encode_parts (self .catchup [msg_type ],codec ))
+                    types .append (msg_type )
+            self .server .set_codec (client_id ,codec )
+            for frame ,msg_type in zip (frames ,types ):
+                if not self .server .post_parts (client_id ,frame ,msg_type ):
+                    self .server .disconnect_client (client_id )
+                    return
+            self .spectators [client_id ]=codec
+
+    def _on_spectator_left (self ,client_id :str )->None :
+
+        with self .lock :
+            self .spectators .pop (client_id ,None )
+
+    def _on_upstream_lost (self )->None :
+
+        self .connected =False
+        self .stop ()
+
+    def get_stats (self )->dict :
+
+        with self .lock :
+            spectators =len (self .spectators )
+        return {
+        "spectators":spectators ,
+        "relayed":self .relayed ,
+        "encodes":self .encodes ,
+        "dropped":self .dropped ,
+        "upstream":self .upstream .get_stats (),
+        "downstream":self .server .get_totals ()
+        }
+
+    def stop (self )->None :
+
+        if not self .running :
+            return
+        self .running =False
+        self .upstream .disconnect ()
+        self .server .stop ()
+
+
+def main ()->None :
+
+    parser =argparse .ArgumentParser (description ="Реле за зрители")
+    parser .add_argument ("host",help ="адрес на хоста (IP[:порт])")
+    parser .add_argument ("--listen",type =int ,default =RELAY_PORT )
+    parser .add_argument ("--interval",type =float ,default =10.0 )
+    args =parser .parse_args ()
+
+    host ,_ ,port =args .host .partition (":")
+    relay =SpectatorRelay (args .listen )
+    if not relay .start (host ,int (port )if port else DEFAULT_PORT ):
+        return
+
+    print (f"Релето слуша на порт {args .listen }")
+    try :
+        while relay .running :
+            time .sleep (args .interval )
+            stats =relay .get_stats ()
+            print (f"зрители: {stats ['spectators']}, съобщения: {stats ['relayed']}, "
+            f"кодирания: {stats ['encodes']}, изпратени байтове: {stats ['downstream']['bytes_out']}")
+    except KeyboardInterrupt :
+        pass
+    finally :
+        relay .stop ()
+
+
+if __name__ =="__main__":
+    main ()
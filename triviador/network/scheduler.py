@@ -0,0 +1,139 @@
+import math
+import threading
+from typing import Callable ,Optional
+
+from triviador.core.clock import Clock ,DEFAULT_CLOCK
+from triviador.core.config import TIMER_TICK ,TIMER_SLOTS
+
+
+class TimerHandle :
+
+    __slots__ =("callback","args","slot","rounds","cancelled","wheel")
+
+    def __init__ (self ,wheel ,callback :Callable ,args :tuple ,slot :int ,rounds :int ):
+        self .wheel =wheel
+        self .callback =callback
+        self .args =args
+        self .slot =slot
+        self .rounds =rounds
+        self .cancelled =False
+
+    def cancel (self )->None :
+
+        self .wheel .cancel (self )
+
+
+class TimerWheel :
+
+
+    def __init__ (self ,tick :float =TIMER_TICK ,slots :int =TIMER_SLOTS ,clock :Clock =DEFAULT_CLOCK ):
+        self .tick =tick
+        self .clock =clock
+        self .slots :list [set [TimerHandle ]]=[set ()for _ in range (slots )]
+        self .cursor =0
+        self .pending =0
+        self .fired =0
+        self .lock =threading .Lock ()
+        self .wake =threading .Condition (self .lock )
+        self .running =False
+        self .next_tick =0.0
+
+    def start (self )->None :
+
+        with self .lock :
+            if self .running :
+                return
+            self .running =True
+            self .next_tick =self .clock ()+self .tick
+        threading .Thread (target =self ._loop ,daemon =True ).start ()
+
+    def schedule (self ,delay :float ,callback :Callable ,*args )->TimerHandle :
+
+        ticks =max (1 ,math .ceil (round (delay /self .tick ,6 )))
+        with self .lock :
+            if self .pending ==0 :
+                self .next_tick =self .clock ()+self .tick
+            ticks_from_cursor =ticks -1
+            slot =(self .cursor +ticks_from_cursor )%len (self .slots )
+            handle =TimerHandle (self ,callback ,args ,slot ,ticks_from_cursor //len (self .slots ))
+            self .slots [slot ].add (handle )
+            self .pending +=1
+            self .wake .notify ()
+        return handle
+
+    def cancel (self ,handle :TimerHandle )->None :
+
+        with self .lock :
+            if handle .cancelled :
+                return
+            handle .cancelled =True
+            if handle in self .slots [handle .slot ]:
+                self .slots [handle .slot ].discard (handle )
+                self .pending -=1
+
+    def advance (self )->list [TimerHandle ]:
+
+        with self .lock :
+            bucket =self .slots [self .cursor ]
+            due =[]
+            for handle in bucket :
+                if handle .rounds ==0 :
+                    due .append (handle )
+                else :
+                    handle .rounds -=1
+            bucket .difference_update (due )
+            for handle in due :
+                handle .cancelled =True
+            self .pending -=len (due )
+            self .cursor =(self .cursor +1 )%len (self .slots )
+        for handle in due :
+            self .fired +=1
+            try :
+                handle .callback (*handle .args )
+            except Exception as e :
+                print (f"Грешка в таймер: {e }")
+        return due
+
+    def _loop (self )->None :
+
+        while self .running :
+            with self .lock :
+                while self .running and self .pending ==0 :
+                    self .wake .wait ()
+                delay =self .next_tick -self .clock ()
+            self .clock .sleep (delay )
+            self .advance ()
+            self .next_tick +=self .tick
+
+    def catch_up (self )->int :
+
+        fired =0
+        while self .pending and self .clock ()>=self .next_tick :
+            fired +=len (self .advance ())
+            self .next_tick +=self .tick
+        return fired
+
+    def get_stats (self )->dict :
+
+        with self .lock :
+            return {"pending":self .pending ,"fired":self .fired ,"slots":len (self .slots ),"tick":self .tick }
+
+    def stop (self )->None :
+
+        with self .lock :
+            self .running =False
+            self .wake .notify ()
+
+
+_scheduler :Optional [TimerWheel ]=None
+_scheduler_lock =threading .Lock ()
+
+
+def get_scheduler ()->TimerWheel :
+
+    global _scheduler
+    with _scheduler_lock :
+        if _scheduler is None :
+            _scheduler =TimerWheel ()
+            _scheduler .start ()
+        return _scheduler
@@ -0,0 +1,365 @@
+import bisect
+import json
+import socket
+import threading
+import time
+from typing import Callable ,Optional
+
+from triviador.core.config import STATS_DUMP_INTERVAL
+
+
+HISTOGRAM_BOUNDS_MS =(0.1 ,0.25 ,0.5 ,1 ,2.5 ,5 ,10 ,25 ,50 ,100 ,250 ,500 ,1000 )
+
+
+class LatencyHistogram :
+
+
+    def __init__ (self ,bounds :tuple =HISTOGRAM_BOUNDS_MS ):
+        self .bounds =bounds
+        self .counts =[0 ]*(len (bounds )+1 )
+        self .count =0
+        self .total =0.0
+        self .max =0.0
+
+    def record (self ,seconds :float )->None :
+
+        ms =seconds *1000
+        self .counts [bisect .bisect_left (self .bounds ,ms )]+=1
+        self .count +=1
+        self .total +=ms
+        self .max =max (self .max ,ms )
+
+    def percentile (self ,p :float )->float :
+
+        if self .count ==0 :
+            return 0.0
+        rank =self .count *p /100
+        seen =0
+        for index ,bucket in enumerate (self .counts ):
+            seen +=bucket
+            if seen >=rank and bucket :
+                if index <len (self .bounds ):
+                    return min (self .bounds [index ],self .max )
+                return self .max
+        return self .max
+
+    def merge (self ,other :"LatencyHistogram")->None :
+
+        for index ,bucket in enumerate (other .counts ):
+            self .counts [index ]+=bucket
+        self .count +=other .count
+        self .total +=other .total
+        self .max =max (self .max ,other .max )
+
+    def snapshot (self )->dict :
+
+        buckets ={f"<={bound }":count for bound ,count in zip (self .bounds ,self .counts )}
+        buckets [f">{self .bounds [-1 ]}"]=self .counts [-1 ]
+        return {
+        "count":self .count ,
+        "avg_ms":self .total /self .count if self .count else 0.0 ,
+        "p50_ms":self .percentile (50 ),
+        "p90_ms":self .percentile (90 ),
+        "p99_ms":self .percentile (99 ),
+        "max_ms":self .max ,
+        "buckets":buckets
+        }
+
+
+class NetworkStats :
+
+
+    def __init__ (self ):
+        self .lock =threading .Lock ()
+        self .messages_in =0
+        self .messages_out =0
+        self .bytes_in =0
+        self .bytes_out =0
+        self .compressed_messages =0
+        self .compression_raw_bytes =0
+        self .compression_packed_bytes =0
+        self .compression_time =0.0
+        self .decompressed_messages =0
+        self .decompression_time =0.0
+        self .by_type :dict [str ,list [int ]]={}
+        self .decode_errors =0
+        self .disconnects :dict [str ,int ]={}
+        self .pending_sends =0
+        self .max_pending_sends =0
+        self .send_latency =LatencyHistogram ()
+        self .rtt =LatencyHistogram ()
+
+    def _type_row (self ,msg_type :str )->list [int ]:
+
+        row =self .by_type .get (msg_type )
+        if row is None :
+            row =self .by_type [msg_type ]=[0 ,0 ,0 ,0 ]
+        return row
+
+    def send_started (self )->None :
+
+        with self .lock :
+            self .pending_sends +=1
+            self .max_pending_sends =max (self .max_pending_sends ,self .pending_sends )
+
+    def send_finished (self )->None :
+
+        with self .lock :
+            self .pending_sends -=1
+
+    def record_sent (self ,size :int ,msg_type :Optional [str ]=None ,elapsed :Optional [float ]=None )->None :
+
+        with self .lock :
+            self .messages_out +=1
+            self .bytes_out +=size
+            if msg_type is not None :
+                row =self ._type_row (msg_type )
+                row [2 ]+=1
+                row [3 ]+=size
+            if elapsed is not None :
+                self .send_latency .record (elapsed )
+
+    def record_frame_in (self ,msg_type :str ,size :int )->None :
+
+        with self .lock :
+            row =self ._type_row (msg_type )
+            row [0 ]+=1
+            row [1 ]+=size
+
+    def record_decode_error (self )->None :
+
+        with self .lock :
+            self .decode_errors +=1
+
+    def record_disconnect (self ,reason :str )->None :
+
+        with self .lock :
+            self .disconnects [reason ]=self .disconnects .get (reason ,0 )+1
+
+    def record_rtt (self ,seconds :float )->None :
+
+        with self .lock :
+            self .rtt .record (seconds )
+
+    def record_received (self ,size :int ,messages :int )->None :
+
+        with self .lock :
+            self .messages_in +=messages
+            self .bytes_in +=size
+
+    def record_compression (self ,raw_size :int ,packed_size :int ,elapsed :float )->None :
+
+        with self .lock :
+            self .compressed_messages +=1
+            self .compression_raw_bytes +=raw_size
+            self .compression_packed_bytes +=packed_size
+            self .compression_time +=elapsed
+
+    def record_decompression (self ,elapsed :float )->None :
+
+        with self .lock :
+            self .decompressed_messages +=1
+            self .decompression_time +=elapsed
+
+    @property
+    def compression_ratio (self )->float :
+
+        if self .compression_raw_bytes ==0 :
+            return 1.0
+        return self .compression_packed_bytes /self .compression_raw_bytes
+
+    def snapshot (self )->dict :
+
+        with self .lock :
+            compress_us =(self .compression_time /self .compressed_messages *1e6
+            if self .compressed_messages else 0.0 )
+            decompress_us =(self .decompression_time /self .decompressed_messages *1e6
+            if self .decompressed_messages else 0.0 )
+            return {
+            "messages_in":self .messages_in ,
+            "messages_out":self .messages_out ,
+            "bytes_in":self .bytes_in ,
+            "bytes_out":self .bytes_out ,
+            "compressed_messages":self .compressed_messages ,
+            "compression_ratio":self .compression_ratio ,
+            "compress_us_per_message":compress_us ,
+            "decompress_us_per_message":decompress_us ,
+            "by_type":{msg_type :{"messages_in":row [0 ],"bytes_in":row [1 ],
+            "messages_out":row [2 ],"bytes_out":row [3 ]}
+            for msg_type ,row in self .by_type .items ()},
+            "decode_errors":self .decode_errors ,
+            "disconnects":dict (self .disconnects ),
+            "pending_sends":self .pending_sends ,
+            "max_pending_sends":self .max_pending_sends ,
+            "send_latency":self .send_latency .snapshot (),
+            "rtt":self .rtt .snapshot ()
+            }
+
+    def merge (self ,other :"NetworkStats")->None :
+
+        with other .lock :
+            values =(other .messages_in ,other .messages_out ,other .bytes_in ,other .bytes_out ,
+            other .compressed_messages ,other .compression_raw_bytes ,
+            other .compression_packed_bytes ,other .compression_time ,
+            other .decompressed_messages ,other .decompression_time )
+            by_type ={msg_type :list (row )for msg_type ,row in other .by_type .items ()}
+            decode_errors =other .decode_errors
+            disconnects =dict (other .disconnects )
+            max_pending =other .max_pending_sends
+            send_latency =LatencyHistogram ()
+            send_latency .merge (other .send_latency )
+            rtt =LatencyHistogram ()
+            rtt .merge (other .rtt )
+        with self .lock :
+            self .messages_in +=values [0 ]
+            self .messages_out +=values [1 ]
+            self .bytes_in +=values [2 ]
+            self .bytes_out +=values [3 ]
+            self .compressed_messages +=values [4 ]
+            self .compression_raw_bytes +=values [5 ]
+            self .compression_packed_bytes +=values [6 ]
+            self .compression_time +=values [7 ]
+            self .decompressed_messages +=values [8 ]
+            self .decompression_time +=values [9 ]
+            for msg_type ,row in by_type .items ():
+                own =self ._type_row (msg_type )
+                for index ,value in enumerate (row ):
+                    own [index ]+=value
+            self .decode_errors +=decode_errors
+            for reason ,count in disconnects .items ():
+                self .disconnects [reason ]=self .disconnects .get (reason ,0 )+count
+            self .max_pending_sends =max (self .max_pending_sends ,max_pending )
+            self .send_latency .merge (send_latency )
+            self .rtt .merge (rtt )
+
+
+class PumpStats :
+
+
+    def __init__ (self ):
+        self .lock =threading .Lock ()
+        self .events =0
+        self .pumps =0
+        self .budget_overruns =0
+        self .queue_depth =0
+        self .max_queue_depth =0
+        self .total_age =0.0
+        self .max_age =0.0
+
+    def record_pump (self ,depth :int ,overrun :bool )->None :
+
+        with self .lock :
+            self .pumps +=1
+            self .queue_depth =depth
+            self .max_queue_depth =max (self .max_queue_depth ,depth )
+            if overrun :
+                self .budget_overruns +=1
+
+    def record_dispatch (self ,age :float )->None :
+
+        with self .lock :
+            self .events +=1
+            self .total_age +=age
+            self .max_age =max (self .max_age ,age )
+
+    def snapshot (self )->dict :
+
+        with self .lock :
+            return {
+            "events":self .events ,
+            "pumps":self .pumps ,
+            "budget_overruns":self .budget_overruns ,
+            "queue_depth":self .queue_depth ,
+            "max_queue_depth":self .max_queue_depth ,
+            "avg_age_ms":self .total_age /self .events *1000 if self .events else 0.0 ,
+            "max_age_ms":self .max_age *1000
+            }
+
+
+class StatsDumper :
+
+
+    def __init__ (self ,source :Callable [[],dict ],path :str ,interval :float =STATS_DUMP_INTERVAL ):
+        self .source =source
+        self .path =path
+        self .interval =interval
+        self .running =False
+        self .stop_event =threading .Event ()
+
+    def dump_once (self )->None :
+
+        record ={"time":time .time (),"stats":self .source ()}
+        with open (self .path ,"a",encoding ="utf-8")as f :
+            f .write (json .dumps (record ,ensure_ascii =False )+"\n")
+
+    def _loop (self )->None :
+
+        while not self .stop_event .wait (self .interval ):
+            try :
+                self .dump_once ()
+            except OSError as e :
+                print (f"Грешка при запис на статистиката: {e }")
+                return
+
+    def start (self )->None :
+
+        self .running =True
+        threading .Thread (target =self ._loop ,daemon =True ).start ()
+
+    def stop (self )->None :
+
+        if self .running :
+            self .running =False
+            self .stop_event .set ()
+            try :
+                self .dump_once ()
+            except OSError :
+                pass
+
+
+class StatsSocket :
+
+
+    def __init__ (self ,source :Callable [[],dict ],port :int ):
+        self .source =source
+        self .port =port
+        self .server_socket :Optional [socket .socket ]=None
+        self .running =False
+
+    def start (self )->bool :
+
+        try :
+            self .server_socket =socket .socket (socket .AF_INET ,socket .SOCK_STREAM )
+            self .server_socket .setsockopt (socket .SOL_SOCKET ,socket .SO_REUSEADDR ,1 )
+            self .server_socket .bind (("127.0.0.1",self .port ))
+            self .server_socket .listen (2 )
+        except OSError as e :
+            print (f"Грешка при стартиране на статистиката: {e }")
+            return False
+        self .port =self .server_socket .getsockname ()[1 ]
+        self .running =True
+        threading .Thread (target =self ._serve ,daemon =True ).start ()
+        return True
+
+    def _serve (self )->None :
+
+        while self .running :
+            try :
+                client_socket ,_ =self .server_socket .accept ()
+            except OSError :
+                break
+            with client_socket :
+                record ={"time":time .time (),"stats":self .source ()}
+                try :
+                    client_socket .sendall ((json .dumps (record ,ensure_ascii =False )+"\n").encode ("utf-8"))
+                except OSError :
+                    pass
+
+    def stop (self )->None :
+
+        self .running =False
+        if self .server_socket :
+            try :
+                self .server_socket .close ()
+            except OSError :
+                pass
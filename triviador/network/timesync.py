@@ -0,0 +1,69 @@
+from typing import Optional
+
+
+class LinkEstimator :
+
+
+    ALPHA =0.125
+    BETA =0.25
+
+    def __init__ (self ):
+        self .srtt :Optional [float ]=None
+        self .rttvar =0.0
+        self .offset :Optional [float ]=None
+        self .last_rtt :Optional [float ]=None
+        self .samples =0
+
+    def add_sample (self ,sent_at :float ,peer_time :float ,received_at :float )->bool :
+
+        rtt =received_at -sent_at
+        if rtt <0 :
+            return False
+
+        offset =peer_time -(sent_at +received_at )/2
+        self .last_rtt =rtt
+        self .samples +=1
+
+        if self .srtt is None :
+            self .srtt =rtt
+            self .rttvar =rtt /2
+            self .offset =offset
+            return True
+
+        self .rttvar +=self .BETA *(abs (self .srtt -rtt )-self .rttvar )
+        self .srtt +=self .ALPHA *(rtt -self .srtt )
+
+
+        weight =self .ALPHA if rtt <=self .srtt +self .rttvar else self .ALPHA /4
+        self .offset +=weight *(offset -self .offset )
+        return True
+
+    @property
+    def synced (self )->bool :
+
+        return self .offset is not None
+
+    def to_local (self ,peer_time :float )->float :
+
+        return peer_time -(self .offset or 0.0 )
+
+    def to_peer (self ,local_time :float )->float :
+
+        return local_time +(self .offset or 0.0 )
+
+    def earliest_send (self ,received_at :float )->float :
+
+        if self .srtt is None :
+            return received_at
+        return received_at -self .srtt -4 *self .rttvar
+
+    def snapshot (self )->dict :
+
+        if self .srtt is None :
+            return {"rtt_ms":None ,"rtt_var_ms":None ,"clock_offset_ms":None ,"samples":0 }
+        return {
+        "rtt_ms":self .srtt *1000 ,
+        "rtt_var_ms":self .rttvar *1000 ,
+        "clock_offset_ms":self .offset *1000 ,
+        "samples":self .samples
+        }
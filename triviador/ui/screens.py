@@ -9,7 +9,7 @@ from triviador.core.config import (
     SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, BLACK, GRAY, LIGHT_GRAY, DARK_GRAY,
     BLUE, GREEN, RED, YELLOW, PURPLE, ORANGE,
     FONT_SMALL, FONT_MEDIUM, FONT_LARGE, FONT_XLARGE, FONT_TITLE,
-    DEFAULT_TIME_LIMIT, JOKER_5050, JOKER_AUDIENCE, DEFAULT_PORT
+    DEFAULT_TIME_LIMIT, JOKER_5050, JOKER_AUDIENCE, DEFAULT_PORT, QUESTION_START_DELAY
 )
 from triviador.ui.ui_components import (
     Button, TextInput, CheckBox, ProgressBar, Label, Panel,
@@ -52,6 +52,18 @@ class Screen(ABC):
         if self.next_screen:
             return (self.next_screen, self.screen_data)
         return None
+    
+    def _draw_rtt(self, font: pygame.font.Font, player_id: str, y: int) -> None:
+        """Рисува закъснението (RTT) до играча, ако е измерено."""
+        lobby = getattr(self, "lobby", None)
+        if not lobby:
+            return
+        rtt = lobby.get_rtt_ms(player_id)
+        if rtt is None:
+            return
+        color = GREEN if rtt < 80 else ORANGE if rtt < 200 else RED
+        text = font.render(f"{rtt:.0f} ms", True, color)
+        self.screen.blit(text, (SCREEN_WIDTH // 2 + 120, y))
 
 
 class MainMenuScreen(Screen):
@@ -929,6 +941,8 @@ class HostGameScreen(Screen):
     def _set_mode(self, mode: GameMode) -> None:
         self.game_mode = mode
         self._update_mode_buttons()
+        if self.lobby:
+            self.lobby.set_game_mode(mode.value)
     
     def _update_mode_buttons(self) -> None:
         colors = {GameMode.STANDARD: BLUE, GameMode.ENDLESS: ORANGE}
@@ -951,6 +965,7 @@ class HostGameScreen(Screen):
         if self.lobby.host_game(name):
             self.hosting = True
             self.error_message = ""
+            self.lobby.set_game_mode(self.game_mode.value)
             ip = self.lobby.get_local_ip()
             self.status_message = f"Игра създадена! IP: {ip}:{DEFAULT_PORT}"
             self.players_in_lobby = self.lobby.get_players_list()
@@ -1038,6 +1053,7 @@ class HostGameScreen(Screen):
                 marker = "👑 " if player.id == "host" else "• "
                 text = font.render(f"{marker}{player.name}", True, color)
                 self.screen.blit(text, (SCREEN_WIDTH // 2 - 80, y))
+                self._draw_rtt(font, player.id, y)
             
             # Чакаме играчи
             if len(self.players_in_lobby) < 2:
@@ -1112,8 +1128,16 @@ class JoinGameScreen(Screen):
         
         self.joined = False
         self.players_in_lobby: list[OnlinePlayer] = []
+        
+        # Открити игри в локалната мрежа
+        self.browser = None
+        self.discovered_lobbies: list = []
+        self.lobby_buttons: list[Button] = []
+        self.browse_refresh = 0.0
     
     def setup(self) -> None:
+        from triviador.network.discovery import LobbyBrowser
+        
         self.joined = False
         self.status_message = ""
         self.error_message = ""
@@ -1122,6 +1146,42 @@ class JoinGameScreen(Screen):
         if self.lobby:
             self.lobby.close()
             self.lobby = None
+        
+        self._stop_browser()
+        self.browser = LobbyBrowser()
+        if not self.browser.start():
+            self.browser = None
+    
+    def _stop_browser(self) -> None:
+        if self.browser:
+            self.browser.stop()
+            self.browser = None
+        self.discovered_lobbies = []
+        self.lobby_buttons = []
+    
+    def _refresh_lobbies(self) -> None:
+        """Обновява бутоните за откритите игри."""
+        lobbies = [lobby for lobby in self.browser.get_lobbies() if lobby.joinable][:3]
+        keys = [(lobby.address, lobby.port, lobby.players) for lobby in lobbies]
+        if keys == [(lobby.address, lobby.port, lobby.players) for lobby in self.discovered_lobbies]:
+            return
+        
+        self.discovered_lobbies = lobbies
+        self.lobby_buttons = []
+        for i, lobby in enumerate(lobbies):
+            mode = "безкраен" if lobby.mode == GameMode.ENDLESS.value else "стандартен"
+            button = Button(
+                SCREEN_WIDTH // 2 - 200, 580 + i * 45, 400, 38,
+                f"{lobby.name} ({lobby.players}/{lobby.max_players}, {mode})",
+                FONT_SMALL, GREEN,
+                callback=lambda lobby=lobby: self._join_discovered(lobby)
+            )
+            self.lobby_buttons.append(button)
+    
+    def _join_discovered(self, lobby) -> None:
+        """Присъединяване с един клик към открита игра."""
+        self.ip_input.text = f"{lobby.address}:{lobby.port}"
+        self._on_join()
     
     def _on_join(self) -> None:
         from triviador.network.network import GameLobby
@@ -1158,6 +1218,7 @@ class JoinGameScreen(Screen):
         
         if self.lobby.join_game(name, host, port):
             self.joined = True
+            self._stop_browser()
             self.status_message = f"Свързан към {host}:{port}"
             # Изчакваме малко за да получим списъка с играчи
             pygame.time.wait(500)
@@ -1179,6 +1240,7 @@ class JoinGameScreen(Screen):
         self.error_message = message
     
     def _on_back(self) -> None:
+        self._stop_browser()
         if self.lobby:
             self.lobby.close()
         self.next_screen = "main_menu"
@@ -1188,6 +1250,8 @@ class JoinGameScreen(Screen):
             self.name_input.handle_event(event)
             self.ip_input.handle_event(event)
             self.join_button.handle_event(event)
+            for button in self.lobby_buttons:
+                button.handle_event(event)
         
         self.back_button.handle_event(event)
     
@@ -1195,6 +1259,13 @@ class JoinGameScreen(Screen):
         self.name_input.update(dt)
         self.ip_input.update(dt)
         
+        # Обновяваме откритите игри няколко пъти в секунда
+        if self.browser and not self.joined:
+            self.browse_refresh -= dt
+            if self.browse_refresh <= 0:
+                self.browse_refresh = 0.25
+                self._refresh_lobbies()
+        
         # Обновяваме списъка с играчи периодично
         if self.joined and self.lobby:
             self.players_in_lobby = self.lobby.get_players_list()
@@ -1222,6 +1293,14 @@ class JoinGameScreen(Screen):
             self.ip_input.draw(self.screen)
             
             self.join_button.draw(self.screen)
+            
+            # Открити игри
+            if self.browser:
+                label = "Открити игри:" if self.lobby_buttons else "Търсене на игри в мрежата..."
+                found_label = font.render(label, True, BLACK)
+                self.screen.blit(found_label, (SCREEN_WIDTH // 2 - 200, 550))
+                for button in self.lobby_buttons:
+                    button.draw(self.screen)
         else:
             # Показваме статус
             font = pygame.font.Font(None, FONT_LARGE)
@@ -1240,6 +1319,7 @@ class JoinGameScreen(Screen):
                 marker = "👑 " if player.id == "host" else "• "
                 text = font.render(f"{marker}{player.name}", True, color)
                 self.screen.blit(text, (SCREEN_WIDTH // 2 - 80, y))
+                self._draw_rtt(font, player.id, y)
             
             # Чакаме хоста
             wait_text = font.render("Чакаме хоста да започне играта...", True, GRAY)
@@ -1282,7 +1362,6 @@ class OnlineGameScreen(Screen):
         self.game_ended = False
         self.final_scores: list = []
         self.waiting_to_start = False
-        self.start_delay = 0
         self.show_loser_reveal = False
         self.loser_names: list[str] = []
         
@@ -1333,6 +1412,8 @@ class OnlineGameScreen(Screen):
             self.lobby.on_round_end = self._on_round_end
             self.lobby.on_game_end = self._on_game_end
             self.lobby.on_joker_result = self._on_joker_result
+            self.lobby.on_state_synced = self._on_state_synced
+            self.lobby.on_round_complete = self._on_round_complete
     
     def setup(self) -> None:
         self.question_number = 0
@@ -1342,7 +1423,6 @@ class OnlineGameScreen(Screen):
         self.game_ended = False
         self.final_scores = []
         self.waiting_to_start = False
-        self.start_delay = 0
         
         if self.is_host:
             # Хостът стартира играта и изпраща първия въпрос след кратко забавяне
@@ -1353,10 +1433,14 @@ class OnlineGameScreen(Screen):
         from triviador.logic.question_manager import QuestionManager
         from pathlib import Path
         from triviador.core.config import QUESTIONS_PER_GAME
+        from triviador.logic.rng import GameRandom
         
         self.question_manager = QuestionManager()
+        # Всички случайни избори в играта идват от потоците на един seed
+        self.random = GameRandom()
         self.used_question_ids: set[int] = set()
         self.host_total_score = 0
+        self.prefetched_rounds: set[int] = set()
         
         if self.online_game_mode == GameMode.ENDLESS:
             # В безкраен режим зареждаме въпроси един по един
@@ -1367,65 +1451,93 @@ class OnlineGameScreen(Screen):
             self.total_questions = QUESTIONS_PER_GAME
             self.questions = self.question_manager.get_questions_with_increasing_difficulty(
                 count=self.total_questions,
-                categories=self.selected_categories
+                categories=self.selected_categories,
+                rng=self.random.questions
             )
         
-        self.lobby.start_game()
+        self.lobby.start_game(self.random)
+        self._prefetch_upcoming(0)
         self.waiting_to_start = True
-        self.start_delay = 1.0
+        self.lobby.call_later(QUESTION_START_DELAY, self._on_start_delay_elapsed)
     
-    def _send_next_question(self) -> None:
-        """Изпраща следващия въпрос."""
-        import random
+    def _on_start_delay_elapsed(self) -> None:
+        """Изтече забавянето преди първия въпрос (само хост)."""
+        if self.waiting_to_start:
+            self.waiting_to_start = False
+            self._send_next_question()
+    
+    def _build_question_data(self, index: int) -> dict:
+        """Създава данните за въпрос (включително дали е специален рунд)."""
         from triviador.core.config import SPECIAL_ROUND_CHANCE
         
-        if self.online_game_mode == GameMode.ENDLESS:
-            # Безкраен режим - зареждаме следващия въпрос динамично
-            question = self.question_manager.get_endless_mode_question(
-                current_score=self.host_total_score,
-                categories=self.selected_categories,
-                exclude_ids=self.used_question_ids
-            )
-            if not question:
-                self._end_game()
-                return
-            self.used_question_ids.add(question.id)
-            # Добавяме към списъка за референция
-            if self.question_number >= len(self.questions):
-                self.questions.append(question)
-            else:
-                self.questions[self.question_number] = question
-        else:
-            # Стандартен режим
-            if self.question_number >= len(self.questions):
-                self._end_game()
-                return
-        
-        # Определяме дали е специален рунд
-        self.is_special_round = random.random() < SPECIAL_ROUND_CHANCE
-        
-        question = self.questions[self.question_number]
-        question_data = {
+        question = self.questions[index]
+        return {
             "text": question.question_text,
             "options": question.options if question.options else [],
             "question_type": question.question_type.value,
             "category": question.category,
             "difficulty": question.difficulty,
-            "question_number": self.question_number + 1,
+            "question_number": index + 1,
             "total_questions": self.total_questions,
             "correct_answer": question.correct_answer,
-            "is_special_round": self.is_special_round,
+            "is_special_round": self.random.special.random() < SPECIAL_ROUND_CHANCE,
             "game_mode": self.online_game_mode.value,
             "eliminated_players": list(self.eliminated_players)
         }
+    
+    def _prefetch_upcoming(self, start: int) -> None:
+        """Изпраща предварително въпросите от индекс start нататък (само хост)."""
+        from triviador.core.config import PREFETCH_DEPTH
+        
+        if self.online_game_mode == GameMode.ENDLESS:
+            # Следващият въпрос зависи от резултата - избираме само един напред
+            if start < len(self.questions):
+                last = start
+            else:
+                question = self.question_manager.get_endless_mode_question(
+                    current_score=self.host_total_score,
+                    categories=self.selected_categories,
+                    exclude_ids=self.used_question_ids,
+                    rng=self.random.questions
+                )
+                if not question:
+                    return
+                self.used_question_ids.add(question.id)
+                self.questions.append(question)
+                last = len(self.questions) - 1
+            indices = [last]
+        else:
+            end = min(len(self.questions), start + PREFETCH_DEPTH)
+            indices = range(start, end)
+        
+        for index in indices:
+            round_number = index + 1
+            if round_number not in self.prefetched_rounds:
+                self.prefetched_rounds.add(round_number)
+                self.lobby.prefetch_question(
+                    round_number, self._build_question_data(index), self.questions[index]
+                )
+    
+    def _send_next_question(self) -> None:
+        """Разкрива следващия (вече изпратен) въпрос."""
+        if self.online_game_mode == GameMode.ENDLESS:
+            # Безкраен режим - въпросът обикновено е избран след предишния рунд
+            self._prefetch_upcoming(self.question_number)
         
-        self.lobby.send_question(question_data, self.eliminated_players)
-        self._on_question_received(question_data)
+        if self.question_number >= len(self.questions):
+            self._end_game()
+            return
+        
+        self.lobby.reveal_question(self.question_number + 1, self.eliminated_players)
+        
+        if self.online_game_mode != GameMode.ENDLESS:
+            self._prefetch_upcoming(self.question_number + 1)
     
     def _on_question_received(self, question_data: dict) -> None:
         """Получен е нов въпрос."""
         self.current_question = question_data
-        self.time_left = DEFAULT_TIME_LIMIT
+        # При възстановена сесия хостът изпраща оставащото време
+        self.time_left = question_data.get("time_left", DEFAULT_TIME_LIMIT)
         self.answer_submitted = False
         self.waiting_for_results = False
         self.show_results = False
@@ -1458,6 +1570,21 @@ class OnlineGameScreen(Screen):
         self._setup_question_ui()
         self._setup_joker_buttons()
     
+    def _on_state_synced(self, snapshot: dict) -> None:
+        """Възстановява състоянието след повторно свързване."""
+        jokers = snapshot.get("jokers")
+        if jokers:
+            self.my_jokers = dict(jokers)
+        
+        self.eliminated_players = set(snapshot.get("eliminated", []))
+        my_name = self.lobby.my_name if self.lobby else ""
+        self.am_eliminated = my_name in self.eliminated_players
+        
+        # Вече сме отговорили преди прекъсването - чакаме резултатите
+        if snapshot.get("answered"):
+            self.answer_submitted = True
+            self.waiting_for_results = True
+    
     def _setup_question_ui(self) -> None:
         """Настройва UI за въпроса."""
         if not self.current_question:
@@ -1553,37 +1680,24 @@ class OnlineGameScreen(Screen):
             from triviador.network.network import NetworkMessage, MessageTypes
             self.lobby.client.send(NetworkMessage(
                 type=MessageTypes.USE_JOKER,
-                data={"joker_type": joker_type, "is_special_round": self.is_special_round}
+                data={"joker_type": joker_type}
             ))
     
     def _apply_joker_locally(self, joker_type: str) -> None:
-        """Прилага жокер локално (за хоста или след получаване на резултат)."""
-        from triviador.logic.joker_system import JokerSystem
-        from triviador.core.models import Question, QuestionType
+        """Прилага жокер на хоста от предварително изчисления резултат за рунда."""
+        # Резултатът е готов в кеша на лобито; специален рунд няма резултати
+        result = self.lobby.joker_result(joker_type)
+        if result is None or not self.current_question:
+            return
         
         self.my_jokers[joker_type] = self.my_jokers.get(joker_type, 0) - 1
         self._update_joker_buttons()
         
-        if not self.current_question:
-            return
-        
-        q = self.current_question
-        question = Question(
-            id=0,
-            category=q.get("category", ""),
-            difficulty=q.get("difficulty", 1),
-            question_type=QuestionType(q.get("question_type", "multiple_choice")),
-            question_text=q.get("text", ""),
-            correct_answer=q.get("correct_answer", ""),
-            options=q.get("options", [])
-        )
-        
+        question_type = QuestionType(self.current_question.get("question_type", "multiple_choice"))
         if joker_type == JOKER_5050:
-            result = JokerSystem.apply_5050(question)
-            self._handle_joker_5050_result(result, question.question_type)
+            self._handle_joker_5050_result(result["remaining_options"], question_type)
         elif joker_type == JOKER_AUDIENCE:
-            result = JokerSystem.apply_audience_help(question)
-            self._handle_joker_audience_result(result, question.question_type)
+            self._handle_joker_audience_result(result["votes"], question_type)
     
     def _on_joker_result(self, data: dict) -> None:
         """Получен е резултат от жокер (за клиенти)."""
@@ -1816,12 +1930,8 @@ class OnlineGameScreen(Screen):
         if self.numeric_input:
             self.numeric_input.update(dt)
         
-        # Забавяне преди първия въпрос (само хост)
+        # Забавяне преди първия въпрос (само хост) - таймерът е в lobby-то
         if self.waiting_to_start:
-            self.start_delay -= dt
-            if self.start_delay <= 0:
-                self.waiting_to_start = False
-                self._send_next_question()
             return
         
         # Таймер
@@ -1832,15 +1942,26 @@ class OnlineGameScreen(Screen):
             if self.time_left <= 0:
                 # Времето изтече
                 self._submit_answer("")
+    
+    def _on_round_complete(self, round_id: int) -> None:
+        """Рундът е приключен от lobby-то - всички отговориха или срокът изтече (само хост)."""
+        if not self.is_host or self.show_results:
+            return
+        
+        if not self.answer_submitted:
+            # Срокът изтече преди хостът да отговори
+            self.answer_submitted = True
+            for btn in self.answer_buttons + self.joker_buttons:
+                btn.enabled = False
+            if self.submit_button:
+                self.submit_button.enabled = False
         
-        # Проверка дали всички са отговорили (само хост)
-        if self.is_host and self.waiting_for_results and self.lobby:
-            if self.lobby.all_answers_received:
-                self._calculate_and_send_results()
+        self._calculate_and_send_results()
     
     def _calculate_and_send_results(self) -> None:
         """Изчислява и изпраща резултатите (само хост)."""
-        from triviador.core.config import BASE_POINTS, TIME_BONUS_MULTIPLIER, DIFFICULTY_MULTIPLIER, NUMERIC_TOLERANCE, SPECIAL_ROUND_MULTIPLIER
+        from triviador.core.config import NUMERIC_TOLERANCE
+        from triviador.logic.scoring import score_points
         
         if not self.current_question:
             return
@@ -1850,12 +1971,12 @@ class OnlineGameScreen(Screen):
         difficulty = self.current_question.get("difficulty", 1)
         is_special = self.current_question.get("is_special_round", False)
         
-        player_results = []
+        players = self.lobby.get_players_list()
+        correctness = []
         
-        for player in self.lobby.get_players_list():
+        for player in players:
             answer = player.current_answer or ""
             is_correct = False
-            points = 0
             
             if q_type == "numeric":
                 try:
@@ -1867,24 +1988,23 @@ class OnlineGameScreen(Screen):
                     is_correct = False
             else:
                 is_correct = answer.strip().lower() == str(correct_answer).strip().lower()
-            
-            if is_correct:
-                points = BASE_POINTS
-                remaining_time = DEFAULT_TIME_LIMIT - player.answer_time
-                if remaining_time > 0:
-                    time_bonus = int(remaining_time * TIME_BONUS_MULTIPLIER)
-                    points += time_bonus
-                difficulty_bonus = int(points * (difficulty - 1) * (DIFFICULTY_MULTIPLIER - 1))
-                points += difficulty_bonus
-            
-            if is_special and is_correct:
-                points = int(points * SPECIAL_ROUND_MULTIPLIER)
-            
+            correctness.append(is_correct)
+        
+        # Всички точки за рунда се изчисляват наведнъж от общото ядро
+        all_points = score_points(
+            correctness,
+            [DEFAULT_TIME_LIMIT - player.answer_time for player in players],
+            [difficulty] * len(players),
+            [is_special] * len(players),
+        )
+        
+        player_results = []
+        for player, is_correct, points in zip(players, correctness, all_points):
             player.score += points
             player_results.append({
                 "player_id": player.id,
                 "name": player.name,
-                "answer": answer,
+                "answer": player.current_answer or "",
                 "is_correct": is_correct,
                 "points": points,
                 "total_score": player.score
@@ -1931,6 +2051,10 @@ class OnlineGameScreen(Screen):
         
         self.lobby.send_answer_results(results)
         self._on_answer_result(results)
+        
+        # Безкраен режим - избираме и изпращаме следващия въпрос още сега
+        if self.online_game_mode == GameMode.ENDLESS and not results.get("endless_game_over"):
+            self._prefetch_upcoming(self.question_number + 1)
     
     def draw(self) -> None:
         self.screen.fill(LIGHT_GRAY)